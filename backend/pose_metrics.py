@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import compress
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.skeleton_adapter import JOINT_NAMES
+
+# Metric kind -> number of joints it reads
+METRIC_KINDS: Dict[str, int] = {
+    # Angle in degrees at the middle joint (0 when a limb segment has no length)
+    "angle": 3,
+    # Euclidean distance between the two joints
+    "distance": 2,
+    # z of the midpoint of the first two joints minus z of the third
+    "midpoint_depth_offset": 3,
+}
+
+# Template fields (camelCase or snake_case, like targetRangesDeg) that add metrics
+_TEMPLATE_FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("metricAngles", "metric_angles", "angle"),
+    ("metricDistances", "metric_distances", "distance"),
+)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    kind: str
+    joints: Tuple[str, ...]
+
+    def __post_init__(self) -> None:
+        expected = METRIC_KINDS.get(self.kind)
+        if expected is None:
+            raise ValueError(f"Metric '{self.name}' has unknown kind '{self.kind}'")
+        if len(self.joints) != expected:
+            raise ValueError(f"Metric '{self.name}' ({self.kind}) needs {expected} joints, got {len(self.joints)}")
+
+
+def _angle(name: str, a: str, b: str, c: str) -> MetricSpec:
+    return MetricSpec(name, "angle", (a, b, c))
+
+
+def _distance(name: str, a: str, b: str) -> MetricSpec:
+    return MetricSpec(name, "distance", (a, b))
+
+
+# Metrics every exercise gets, in the order they are reported
+DEFAULT_METRICS: Tuple[MetricSpec, ...] = (
+    _angle("left_knee_angle_deg", "left_hip", "left_knee", "left_ankle"),
+    _angle("right_knee_angle_deg", "right_hip", "right_knee", "right_ankle"),
+    _angle("left_hip_angle_deg", "left_shoulder", "left_hip", "left_knee"),
+    _angle("right_hip_angle_deg", "right_shoulder", "right_hip", "right_knee"),
+    _angle("left_elbow_angle_deg", "left_shoulder", "left_elbow", "left_wrist"),
+    _angle("right_elbow_angle_deg", "right_shoulder", "right_elbow", "right_wrist"),
+    MetricSpec("torso_forward_offset_m", "midpoint_depth_offset", ("left_shoulder", "right_shoulder", "root")),
+    _distance("shoulder_width_m", "left_shoulder", "right_shoulder"),
+    _distance("hip_width_m", "left_hip", "right_hip"),
+    _distance("stance_width_m", "left_ankle", "right_ankle"),
+    _angle("left_ankle_angle_deg", "left_knee", "left_ankle", "left_foot_index"),
+    _angle("right_ankle_angle_deg", "right_knee", "right_ankle", "right_foot_index"),
+    _distance("left_upper_arm_length_m", "left_shoulder", "left_elbow"),
+    _distance("right_upper_arm_length_m", "right_shoulder", "right_elbow"),
+    _distance("left_forearm_length_m", "left_elbow", "left_wrist"),
+    _distance("right_forearm_length_m", "right_elbow", "right_wrist"),
+    _distance("left_thigh_length_m", "left_hip", "left_knee"),
+    _distance("right_thigh_length_m", "right_hip", "right_knee"),
+    _distance("left_shin_length_m", "left_knee", "left_ankle"),
+    _distance("right_shin_length_m", "right_knee", "right_ankle"),
+    _distance("left_side_body_length_m", "left_shoulder", "left_hip"),
+    _distance("right_side_body_length_m", "right_shoulder", "right_hip"),
+    _distance("left_foot_length_m", "left_heel", "left_foot_index"),
+    _distance("right_foot_length_m", "right_heel", "right_foot_index"),
+    _distance("head_to_neck_m", "nose", "neck"),
+)
+
+
+class MetricTable:
+    """
+    A list of MetricSpecs compiled into joint index arrays.
+
+    Every metric reads three joints (p0, p1, p2): angles are measured at
+    p1 between p0 and p2, distances run from p0 to p1, and midpoint depth
+    offsets compare the midpoint of p0 and p2 with p1. evaluate() computes
+    all metrics of one frame, or of a whole batch of frames, in a single
+    vectorized pass. `joints` is the row order of the positions passed in
+    (the ArraySkeletonFrame slots by default).
+    """
+
+    def __init__(self, specs: Iterable[MetricSpec], joints: Sequence[str] = JOINT_NAMES) -> None:
+        self.specs: Tuple[MetricSpec, ...] = tuple(specs)
+        self.joints: Tuple[str, ...] = tuple(joints)
+        self.names: Tuple[str, ...] = tuple(spec.name for spec in self.specs)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Metric names must be unique")
+
+        index = {name: position for position, name in enumerate(self.joints)}
+        gather: List[Tuple[int, int, int]] = []
+        for spec in self.specs:
+            missing = [joint for joint in spec.joints if joint not in index]
+            if missing:
+                raise ValueError(f"Metric '{spec.name}' uses unknown joint(s): {', '.join(missing)}")
+            if spec.kind == "angle":
+                p0, p1, p2 = spec.joints
+            elif spec.kind == "distance":
+                p0, p1 = spec.joints
+                p2 = p1
+            else:
+                p0, p2, p1 = spec.joints
+            gather.append((index[p1], index[p0], index[p2]))
+        # (3, M): row 0 holds every metric's p1, rows 1-2 its p0 and p2
+        self._gather = np.asarray(gather, dtype=np.intp).reshape(-1, 3).T.copy()
+        kinds = np.asarray([spec.kind for spec in self.specs], dtype=object)
+        self._is_angle = kinds == "angle"
+        self._is_distance = kinds == "distance"
+
+    def for_joints(self, joints: Sequence[str]) -> "MetricTable":
+        """The same metrics compiled for positions stored in another joint order."""
+        return MetricTable(self.specs, joints)
+
+    def with_specs(self, specs: Iterable[MetricSpec]) -> "MetricTable":
+        """Add metrics; a spec named like an existing one replaces it in place."""
+        merged = {spec.name: spec for spec in self.specs}
+        merged.update((spec.name, spec) for spec in specs)
+        return MetricTable(merged.values(), self.joints)
+
+    def evaluate(self, xyz: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Metric values and validity for positions (..., J, 3) with mask (..., J).
+
+        Returns two (..., M) arrays; a metric is valid when all its joints
+        are. Values of invalid metrics are unspecified.
+        """
+        # Coordinate axis first, so x/y/z of the gathered points are cheap views
+        coords = xyz.T if xyz.ndim == 2 else np.moveaxis(xyz, -1, 0)
+        points = coords[..., self._gather]
+        # p0 - p1 and p2 - p1, stacked: (3, ..., 2, M)
+        rays = points[..., 1:, :] - points[..., :1, :]
+        squared = rays * rays
+        norms = np.sqrt(squared[0] + squared[1] + squared[2])
+        products = rays[..., 0, :] * rays[..., 1, :]
+        dot = products[0] + products[1] + products[2]
+        u_norm, v_norm = norms[..., 0, :], norms[..., 1, :]
+        # Zero-length segments give angle 0; the guard only keeps the division finite
+        cosine = np.maximum(np.minimum(dot / np.maximum(u_norm * v_norm, 1e-300), 1.0), -1.0)
+        short = norms < 1e-6
+        angle = np.where(short[..., 0, :] | short[..., 1, :], 0.0, np.degrees(np.arccos(cosine)))
+        depth = points[2]
+        offset = ((depth[..., 1, :] + depth[..., 2, :]) / 2.0) - depth[..., 0, :]
+        values = np.where(self._is_angle, angle, np.where(self._is_distance, u_norm, offset))
+        joint_mask = mask[..., self._gather]
+        valid = joint_mask[..., 0, :] & joint_mask[..., 1, :] & joint_mask[..., 2, :]
+        return values, valid
+
+    def frame_metrics(self, xyz: np.ndarray, mask: np.ndarray) -> Dict[str, float]:
+        """Metrics of one frame's (J, 3) positions, in table order, skipping the invalid ones."""
+        values, valid = self.evaluate(xyz, mask)
+        return dict(compress(zip(self.names, values.tolist()), valid.tolist()))
+
+    def evaluate_batch(self, xyz: np.ndarray, mask: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Metric name -> (N,) values for (N, J, 3) positions; NaN where a joint is missing."""
+        xyz = np.asarray(xyz, dtype=np.float64)
+        if mask is None:
+            mask = ~np.isnan(xyz).any(axis=-1)
+        # Missing joints are NaN, which the arithmetic just carries through
+        with np.errstate(invalid="ignore"):
+            values, valid = self.evaluate(xyz, mask)
+        values = np.where(valid, values, np.nan)
+        return {name: values[..., column] for column, name in enumerate(self.names)}
+
+
+DEFAULT_METRIC_TABLE = MetricTable(DEFAULT_METRICS)
+
+
+def template_metric_specs(template: Mapping[str, object]) -> List[MetricSpec]:
+    """
+    Extra metrics declared by an exercise template, e.g.
+
+        "metricAngles": {"left_shoulder_abduction_deg": ["left_hip", "left_shoulder", "left_elbow"]},
+        "metricDistances": {"wrist_gap_m": ["left_wrist", "right_wrist"]}
+    """
+    specs: List[MetricSpec] = []
+    for camel_key, snake_key, kind in _TEMPLATE_FIELDS:
+        entries = template.get(camel_key) or template.get(snake_key) or {}
+        if not isinstance(entries, Mapping):
+            raise ValueError(f"'{camel_key}' must map metric names to joint lists")
+        for name, joints in entries.items():
+            if not isinstance(joints, (list, tuple)):
+                raise ValueError(f"Metric '{name}' must list its joints")
+            specs.append(MetricSpec(str(name), kind, tuple(str(joint) for joint in joints)))
+    return specs
+
+
+def metric_table_for_template(
+    template: Optional[Mapping[str, object]],
+    base: MetricTable = DEFAULT_METRIC_TABLE,
+) -> MetricTable:
+    """`base` plus the template's own metrics; `base` itself when it declares none."""
+    specs = template_metric_specs(template) if template else []
+    return base.with_specs(specs) if specs else base
+
+
+def session_metrics(session, table: MetricTable = DEFAULT_METRIC_TABLE) -> Dict[str, np.ndarray]:
+    """Replay a table over a session read back by read_session_chunks (its joints_3d channel)."""
+    if tuple(session.joints) != table.joints:
+        table = table.for_joints(session.joints)
+    return table.evaluate_batch(session.channels["joints_3d"])
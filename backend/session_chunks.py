@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.skeleton_adapter import JOINT_NAMES, AnySkeletonFrame, ArraySkeletonFrame
+
+SESSION_CHUNK_FORMAT = "columnar-v1"
+
+# Fixed column order of the per-joint channels in every chunk (the ArraySkeletonFrame slots)
+SESSION_JOINTS: Tuple[str, ...] = JOINT_NAMES
+
+# Per-joint channel -> (SkeletonFrame attribute, components per joint)
+_JOINT_CHANNELS: Dict[str, Tuple[str, int]] = {
+    "joints_3d": ("joints_3d", 3),
+    "keypoints_2d": ("keypoints_2d", 2),
+    "camera_points_3d": ("camera_points_3d", 3),
+    "point_depths_m": ("point_depths_m", 1),
+}
+# Per-joint channel -> (ArraySkeletonFrame values, mask)
+_ARRAY_CHANNELS: Dict[str, Tuple[str, str]] = {
+    "joints_3d": ("joints_xyz", "joints_mask"),
+    "keypoints_2d": ("keypoints_xy", "keypoints_mask"),
+    "camera_points_3d": ("camera_xyz", "camera_mask"),
+    "point_depths_m": ("depths_m", "depths_mask"),
+}
+_VECTOR_CHANNELS: Dict[str, int] = {
+    "camera_position": 3,
+    "camera_intrinsics": 4,
+}
+_SCALAR_CHANNELS = ("arm_head_distance_m", "arm_head_quality")
+_LABEL_CHANNELS = ("feedback", "arm_head_state")
+
+
+def _chunk_key(frame: AnySkeletonFrame) -> Tuple[object, ...]:
+    # Values constant within a chunk; a change starts a new chunk
+    return (
+        frame.exercise,
+        frame.source,
+        frame.depth_mode,
+        frame.camera_resolution,
+        frame.video_width,
+        frame.video_height,
+    )
+
+
+def _pack(array: np.ndarray) -> Dict[str, object]:
+    # Raw little-endian bytes are stored by Mongo as BinData
+    array = np.ascontiguousarray(array)
+    return {
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "data": array.tobytes(),
+    }
+
+
+def _unpack(channel: Mapping[str, object]) -> np.ndarray:
+    data = channel["data"]
+    return np.frombuffer(bytes(data), dtype=np.dtype(str(channel["dtype"]))).reshape(channel["shape"])
+
+
+def _encode_labels(labels: Sequence[Optional[str]]) -> Dict[str, object]:
+    values: List[str] = []
+    index: Dict[str, int] = {}
+    codes = np.full(len(labels), -1, dtype=np.int16)
+    for row, label in enumerate(labels):
+        if label is None:
+            continue
+        code = index.get(label)
+        if code is None:
+            code = index[label] = len(values)
+            values.append(label)
+        codes[row] = code
+    return {"values": values, "codes": _pack(codes)}
+
+
+def _decode_labels(encoded: Mapping[str, object]) -> List[Optional[str]]:
+    values = list(encoded["values"])
+    return [values[code] if code >= 0 else None for code in _unpack(encoded["codes"]).tolist()]
+
+
+class SessionChunkBuilder:
+    """
+    Accumulates logged frames into columnar session chunks.
+
+    A chunk covers up to chunk_seconds of one session. Per-joint channels
+    use the fixed SESSION_JOINTS order and NaN for joints missing from a
+    frame; all_joints_3d and metrics keep a per-chunk name list instead,
+    since their keys vary by device and exercise. Every channel is a packed
+    float32 array, so a chunk is one small document rather than one nested
+    document per frame.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        chunk_seconds: float = 5.0,
+        max_frames: int = 1024,
+        joints: Sequence[str] = SESSION_JOINTS,
+    ) -> None:
+        self.session_id = session_id
+        self.chunk_seconds = max(0.0, float(chunk_seconds))
+        self.max_frames = max(1, int(max_frames))
+        self.joints = tuple(joints)
+        self.chunk_index = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._key: Optional[Tuple[object, ...]] = None
+        self._timestamps: List[float] = []
+        self._joint_rows: Dict[str, List[np.ndarray]] = {name: [] for name in _JOINT_CHANNELS}
+        self._vector_rows: Dict[str, List[np.ndarray]] = {name: [] for name in _VECTOR_CHANNELS}
+        self._scalars: Dict[str, List[float]] = {name: [] for name in _SCALAR_CHANNELS}
+        self._labels: Dict[str, List[Optional[str]]] = {name: [] for name in _LABEL_CHANNELS}
+        self._all_joints: List[Mapping[str, Tuple[float, float, float]]] = []
+        self._metrics: List[Mapping[str, float]] = []
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def add(self, frame: AnySkeletonFrame, metrics: Mapping[str, float], feedback: str) -> Optional[Dict[str, object]]:
+        """Append one frame; returns the previous chunk's document when this frame starts a new chunk."""
+        finished = None
+        key = _chunk_key(frame)
+        if self._timestamps and (
+            key != self._key
+            or len(self._timestamps) >= self.max_frames
+            or (frame.timestamp - self._timestamps[0]) >= self.chunk_seconds
+        ):
+            finished = self.finish()
+        self._key = key
+
+        self._timestamps.append(float(frame.timestamp))
+        slot_arrays = isinstance(frame, ArraySkeletonFrame) and self.joints == JOINT_NAMES
+        for channel, (attribute, width) in _JOINT_CHANNELS.items():
+            if slot_arrays:
+                # Chunk columns are the frame's joint slots: copy whole arrays
+                values_name, mask_name = _ARRAY_CHANNELS[channel]
+                values = getattr(frame, values_name).reshape(len(self.joints), width)
+                row = np.where(getattr(frame, mask_name)[:, None], values, np.nan).astype(np.float32)
+            else:
+                values = getattr(frame, attribute)
+                row = np.full((len(self.joints), width), np.nan, dtype=np.float32)
+                for column, joint_name in enumerate(self.joints):
+                    value = values.get(joint_name)
+                    if value is not None:
+                        row[column] = value
+            self._joint_rows[channel].append(row)
+        for channel, width in _VECTOR_CHANNELS.items():
+            value = getattr(frame, channel)
+            self._vector_rows[channel].append(
+                np.asarray(value, dtype=np.float32) if value is not None else np.full(width, np.nan, dtype=np.float32)
+            )
+        for channel in _SCALAR_CHANNELS:
+            value = getattr(frame, channel)
+            self._scalars[channel].append(float(value) if value is not None else np.nan)
+        self._labels["feedback"].append(feedback)
+        self._labels["arm_head_state"].append(frame.arm_head_state)
+        self._all_joints.append(frame.all_joints_3d)
+        self._metrics.append(metrics)
+        return finished
+
+    def finish(self) -> Optional[Dict[str, object]]:
+        """Document for the frames collected so far (None if empty); the next frame starts a new chunk."""
+        if not self._timestamps:
+            return None
+        exercise, source, depth_mode, camera_resolution, video_width, video_height = self._key
+        frame_count = len(self._timestamps)
+
+        all_joint_names = list(dict.fromkeys(name for joints in self._all_joints for name in joints))
+        all_joints = np.full((frame_count, len(all_joint_names), 3), np.nan, dtype=np.float32)
+        all_joint_columns = {name: column for column, name in enumerate(all_joint_names)}
+        for row, joints in enumerate(self._all_joints):
+            for name, coords in joints.items():
+                all_joints[row, all_joint_columns[name]] = coords
+
+        metric_names = list(dict.fromkeys(name for metrics in self._metrics for name in metrics))
+        metric_values = np.full((frame_count, len(metric_names)), np.nan, dtype=np.float32)
+        metric_columns = {name: column for column, name in enumerate(metric_names)}
+        for row, metrics in enumerate(self._metrics):
+            for name, value in metrics.items():
+                metric_values[row, metric_columns[name]] = value
+
+        channels: Dict[str, Dict[str, object]] = {
+            "timestamp": _pack(np.asarray(self._timestamps, dtype=np.float64)),
+            "all_joints_3d": _pack(all_joints),
+            "metrics": _pack(metric_values),
+        }
+        for channel, rows in self._joint_rows.items():
+            stacked = np.stack(rows)
+            channels[channel] = _pack(stacked[..., 0] if _JOINT_CHANNELS[channel][1] == 1 else stacked)
+        for channel, rows in self._vector_rows.items():
+            channels[channel] = _pack(np.stack(rows))
+        for channel, values in self._scalars.items():
+            channels[channel] = _pack(np.asarray(values, dtype=np.float32))
+
+        document = {
+            "format": SESSION_CHUNK_FORMAT,
+            "session_id": self.session_id,
+            "chunk_index": self.chunk_index,
+            "exercise": exercise,
+            "source": source,
+            "depth_mode": depth_mode,
+            "camera_width": camera_resolution[0] if camera_resolution else None,
+            "camera_height": camera_resolution[1] if camera_resolution else None,
+            "video_width": video_width,
+            "video_height": video_height,
+            "start_ts": self._timestamps[0],
+            "end_ts": self._timestamps[-1],
+            "frame_count": frame_count,
+            "joints": list(self.joints),
+            "all_joint_names": all_joint_names,
+            "metric_names": metric_names,
+            "channels": channels,
+            "labels": {channel: _encode_labels(labels) for channel, labels in self._labels.items()},
+        }
+        self.chunk_index += 1
+        self._reset()
+        return document
+
+
+class SessionChunkEncoder:
+    """SessionLogWriter encoder turning (frame, metrics, feedback) entries into chunk documents."""
+
+    def __init__(self, session_id: str, chunk_seconds: float = 5.0) -> None:
+        self.builder = SessionChunkBuilder(session_id, chunk_seconds=chunk_seconds)
+
+    def __call__(self, entry: Tuple[AnySkeletonFrame, Mapping[str, float], str]) -> Optional[Dict[str, object]]:
+        frame, metrics, feedback = entry
+        return self.builder.add(frame, metrics, feedback)
+
+    def finish(self) -> Optional[Dict[str, object]]:
+        return self.builder.finish()
+
+    def items_in(self, document: Mapping[str, object]) -> int:
+        """Entries a chunk document holds, so the writer counts them once it is stored."""
+        return int(document["frame_count"])
+
+
+@dataclass
+class SessionArrays:
+    """A session read back from its chunks; missing values are NaN (None for labels)."""
+
+    session_id: str
+    joints: Tuple[str, ...]
+    timestamps: np.ndarray
+    exercise: List[str] = field(default_factory=list)
+    channels: Dict[str, np.ndarray] = field(default_factory=dict)
+    all_joint_names: List[str] = field(default_factory=list)
+    metric_names: List[str] = field(default_factory=list)
+    labels: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+
+    def joint(self, name: str, channel: str = "joints_3d") -> np.ndarray:
+        if channel == "all_joints_3d":
+            return self.channels[channel][:, self.all_joint_names.index(name)]
+        return self.channels[channel][:, self.joints.index(name)]
+
+    def metric(self, name: str) -> np.ndarray:
+        return self.channels["metrics"][:, self.metric_names.index(name)]
+
+
+def _merge_named(blocks: List[np.ndarray], names: List[List[str]]) -> Tuple[List[str], np.ndarray]:
+    # Chunks may name different columns: align them on the union of names
+    merged = list(dict.fromkeys(name for chunk_names in names for name in chunk_names))
+    columns = {name: column for column, name in enumerate(merged)}
+    total = sum(block.shape[0] for block in blocks)
+    tail = blocks[0].shape[2:] if blocks else ()
+    out = np.full((total, len(merged)) + tuple(tail), np.nan, dtype=np.float32)
+    start = 0
+    for block, chunk_names in zip(blocks, names):
+        if chunk_names:
+            out[start : start + block.shape[0], [columns[name] for name in chunk_names]] = block
+        start += block.shape[0]
+    return merged, out
+
+
+def read_session_chunks(documents: Iterable[Mapping[str, object]]) -> SessionArrays:
+    """Concatenate one session's chunk documents (any order) into NumPy arrays."""
+    chunks = sorted(documents, key=lambda doc: int(doc["chunk_index"]))
+    if not chunks:
+        raise ValueError("No session chunks to read")
+    for doc in chunks:
+        if doc.get("format") != SESSION_CHUNK_FORMAT:
+            raise ValueError(f"Unsupported session chunk format: {doc.get('format')!r}")
+    joints = tuple(chunks[0]["joints"])
+    if any(tuple(doc["joints"]) != joints for doc in chunks):
+        raise ValueError("Session chunks use different joint orders")
+
+    unpacked = [{name: _unpack(channel) for name, channel in doc["channels"].items()} for doc in chunks]
+    channels: Dict[str, np.ndarray] = {}
+    for name in unpacked[0]:
+        if name in {"timestamp", "all_joints_3d", "metrics"}:
+            continue
+        channels[name] = np.concatenate([chunk[name] for chunk in unpacked])
+    all_joint_names, channels["all_joints_3d"] = _merge_named(
+        [chunk["all_joints_3d"] for chunk in unpacked], [list(doc["all_joint_names"]) for doc in chunks]
+    )
+    metric_names, channels["metrics"] = _merge_named(
+        [chunk["metrics"] for chunk in unpacked], [list(doc["metric_names"]) for doc in chunks]
+    )
+    labels = {
+        name: [label for doc in chunks for label in _decode_labels(doc["labels"][name])]
+        for name in _LABEL_CHANNELS
+    }
+    return SessionArrays(
+        session_id=str(chunks[0]["session_id"]),
+        joints=joints,
+        timestamps=np.concatenate([chunk["timestamp"] for chunk in unpacked]),
+        exercise=[str(doc["exercise"]) for doc in chunks for _ in range(int(doc["frame_count"]))],
+        channels=channels,
+        all_joint_names=all_joint_names,
+        metric_names=metric_names,
+        labels=labels,
+    )
+
+
+def load_session(collection, session_id: str) -> SessionArrays:
+    """Read one session's chunks from a Mongo collection."""
+    return read_session_chunks(collection.find({"session_id": session_id, "format": SESSION_CHUNK_FORMAT}))
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+OVERFLOW_POLICIES = ("drop", "sample")
+
+
+@dataclass
+class SessionWriterStats:
+    submitted: int = 0
+    written: int = 0
+    documents: int = 0
+    dropped: int = 0
+    sampled_out: int = 0
+    failed: int = 0
+    batches: int = 0
+    last_flush_ms: float = 0.0
+    avg_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+    def record_flush(self, elapsed_ms: float, alpha: float = 0.2) -> None:
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.avg_flush_ms = elapsed_ms if self.batches == 1 else (alpha * elapsed_ms) + ((1.0 - alpha) * self.avg_flush_ms)
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+
+class SessionLogWriter:
+    """
+    Background writer for session log records.
+
+    submit() only appends to a bounded buffer; a writer thread encodes the
+    queued items and stores them with insert_many once batch_size items are
+    waiting or flush_interval_sec has passed since the oldest one arrived.
+    An encoder may aggregate several items into one document: it returns
+    None until a document is ready, reports how many items a document holds
+    through items_in(), and its finish() is stored on close. Items count as
+    written only once the document holding them is stored.
+    When the buffer is full new items are dropped. With overflow="sample",
+    once the buffer is half full only every sample_every-th item is kept,
+    so a slow database thins the log out evenly instead of cutting it off.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        encode: Optional[Callable[[Any], Dict[str, object]]] = None,
+        batch_size: int = 64,
+        flush_interval_sec: float = 1.0,
+        max_queue: int = 1024,
+        overflow: str = "sample",
+        sample_every: int = 4,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.collection = collection
+        # Runs on the writer thread, keeping record serialization off the caller's path
+        self.encode = encode
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_sec = max(0.0, float(flush_interval_sec))
+        self.max_queue = max(self.batch_size, int(max_queue))
+        self.overflow = overflow
+        self.sample_every = max(1, int(sample_every))
+        self.stats = SessionWriterStats()
+
+        self._buffer: Deque[Any] = deque()
+        self._oldest_at: Optional[float] = None
+        self._overflow_seen = 0
+        self._closed = False
+        self._flush_requested = False
+        self._in_flight = 0
+        # Items an aggregating encoder holds in documents not yet returned (writer thread only)
+        self._held = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> bool:
+        """Queue one item for writing without blocking. False if it was dropped or sampled out."""
+        with self._cond:
+            self.stats.submitted += 1
+            if self._closed:
+                self.stats.dropped += 1
+                return False
+            queued = len(self._buffer)
+            if queued >= self.max_queue:
+                self.stats.dropped += 1
+                return False
+            if self.overflow == "sample" and queued >= self.max_queue // 2:
+                self._overflow_seen += 1
+                if self._overflow_seen % self.sample_every:
+                    self.stats.sampled_out += 1
+                    return False
+            else:
+                self._overflow_seen = 0
+            self._buffer.append(item)
+            if len(self._buffer) == 1:
+                # Writer is idle: wake it to start the flush timer
+                self._oldest_at = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout_sec: Optional[float] = None) -> bool:
+        """Write everything queued so far; True once the buffer is empty and no batch is in flight."""
+        deadline = None if timeout_sec is None else time.monotonic() + timeout_sec
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._buffer or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0.0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout_sec: float = 5.0) -> None:
+        """Flush what is queued and stop the writer thread; later submits are dropped."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout_sec)
+        if self._thread.is_alive():
+            print(f"[MongoDB] Session writer still busy after {timeout_sec:.1f}s; {self.pending()} record(s) unwritten.")
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._buffer) + self._in_flight
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._buffer)
+        return {
+            "queue": queued,
+            "submitted": self.stats.submitted,
+            "written": self.stats.written,
+            "documents": self.stats.documents,
+            "dropped": self.stats.dropped,
+            "sampled_out": self.stats.sampled_out,
+            "failed": self.stats.failed,
+            "batches": self.stats.batches,
+            "last_flush_ms": round(self.stats.last_flush_ms, 2),
+            "avg_flush_ms": round(self.stats.avg_flush_ms, 2),
+            "max_flush_ms": round(self.stats.max_flush_ms, 2),
+        }
+
+    def format_stats(self) -> str:
+        return (
+            f"session_log q={self.pending()} written={self.stats.written} dropped={self.stats.dropped} "
+            f"sampled_out={self.stats.sampled_out} failed={self.stats.failed} "
+            f"flush avg={self.stats.avg_flush_ms:.1f}ms max={self.stats.max_flush_ms:.1f}ms"
+        )
+
+    def _next_batch(self) -> Optional[List[Any]]:
+        with self._cond:
+            while True:
+                if self._buffer:
+                    due = self._oldest_at + self.flush_interval_sec
+                    now = time.monotonic()
+                    if (
+                        len(self._buffer) >= self.batch_size
+                        or now >= due
+                        or self._flush_requested
+                        or self._closed
+                    ):
+                        break
+                    self._cond.wait(due - now)
+                elif self._closed:
+                    return None
+                else:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._oldest_at = time.monotonic() if self._buffer else None
+            self._in_flight = count
+            return batch
+
+    def _items_in(self, record: Dict[str, object]) -> int:
+        items_in = getattr(self.encode, "items_in", None)
+        return items_in(record) if items_in is not None else 1
+
+    def _write(self, batch: List[Any]) -> Tuple[int, int]:
+        """Encode and insert one batch; returns (written, failed) item counts."""
+        records = []
+        encoded = 0
+        failed = 0
+        for item in batch:
+            try:
+                record = self.encode(item) if self.encode is not None else item
+            except Exception as error:
+                print(f"[MongoDB] Could not encode session record: {error}")
+                failed += 1
+                continue
+            encoded += 1
+            # Aggregating encoders (e.g. session chunks) return None until a document is complete
+            if record is not None:
+                records.append(record)
+        # Documents may also hold items of earlier batches; the rest wait in the encoder
+        covered = sum(self._items_in(record) for record in records)
+        self._held += encoded - covered
+        if self._insert(records):
+            return covered, failed
+        return 0, failed + covered
+
+    def _insert(self, records: List[Dict[str, object]]) -> bool:
+        if not records:
+            return True
+        started = time.perf_counter()
+        try:
+            self.collection.insert_many(records, ordered=False)
+            ok = True
+        except Exception as error:
+            print(f"[MongoDB] Session log write failed ({len(records)} record(s)): {error}")
+            ok = False
+        self.stats.record_flush((time.perf_counter() - started) * 1000.0)
+        if ok:
+            self.stats.documents += len(records)
+        return ok
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            written, failed = self._write(batch)
+            with self._cond:
+                self.stats.written += written
+                self.stats.failed += failed
+                self._in_flight = 0
+                self._cond.notify_all()
+        finish = getattr(self.encode, "finish", None)
+        if finish is None:
+            return
+        # Store whatever an aggregating encoder still holds
+        written = failed = 0
+        try:
+            record = finish()
+        except Exception as error:
+            print(f"[MongoDB] Could not encode session record: {error}")
+            record = None
+            failed = self._held
+        if record is not None:
+            covered = self._items_in(record)
+            if self._insert([record]):
+                written = covered
+            else:
+                failed = covered
+        self._held = 0
+        with self._cond:
+            self.stats.written += written
+            self.stats.failed += failed
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import base64
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 import cv2
 import numpy as np
@@ -34,6 +34,29 @@ MEDIAPIPE_INDEX_BY_JOINT: Dict[str, int] = {
     "right_foot_index": 32,
 }
 
+# Official names of the MediaPipe Pose landmarks MEDIAPIPE_INDEX_BY_JOINT leaves out.
+_MEDIAPIPE_FACE_NAMES: Dict[int, str] = {
+    1: "left_eye_inner",
+    2: "left_eye",
+    3: "left_eye_outer",
+    4: "right_eye_inner",
+    5: "right_eye",
+    6: "right_eye_outer",
+    7: "left_ear",
+    8: "right_ear",
+    9: "mouth_left",
+    10: "mouth_right",
+}
+_MEDIAPIPE_NAME_BY_INDEX = {index: name for name, index in MEDIAPIPE_INDEX_BY_JOINT.items()}
+
+# Fixed joint slots of ArraySkeletonFrame: the 33 MediaPipe Pose landmarks at their
+# MediaPipe indices, then derived midpoints and the extra joints the iOS app sends.
+JOINT_NAMES: Tuple[str, ...] = tuple(
+    _MEDIAPIPE_NAME_BY_INDEX.get(index) or _MEDIAPIPE_FACE_NAMES[index] for index in range(33)
+) + ("root", "neck", "head", "left_hand", "right_hand")
+JOINT_INDEX: Dict[str, int] = {name: index for index, name in enumerate(JOINT_NAMES)}
+NUM_JOINTS = len(JOINT_NAMES)
+
 
 @dataclass(frozen=True)
 class SkeletonFrame:
@@ -341,9 +364,9 @@ def adapt_ios_payload(
     decode_video_frame: bool = True,
 ) -> SkeletonFrame:
     required_fields = ("device", "timestamp", "exercise", "joints")
-    for field in required_fields:
-        if field not in payload:
-            raise ValueError(f"Missing required field '{field}'")
+    for required in required_fields:
+        if required not in payload:
+            raise ValueError(f"Missing required field '{required}'")
 
     joints_obj = payload["joints"]
     if not isinstance(joints_obj, Mapping):
@@ -485,7 +508,7 @@ def adapt_mediapipe_pose_landmarks(
     )
 
 
-def to_pipeline_payload(frame: SkeletonFrame) -> Dict[str, object]:
+def to_pipeline_payload(frame: AnySkeletonFrame) -> Dict[str, object]:
     return {
         "device": frame.source,
         "timestamp": frame.timestamp,
@@ -519,3 +542,383 @@ def to_pipeline_payload(frame: SkeletonFrame) -> Dict[str, object]:
         "video_width": frame.video_width,
         "video_height": frame.video_height,
     }
+
+
+JointValue = Union[Tuple[float, ...], float]
+
+
+class JointView(Mapping[str, JointValue]):
+    """
+    Read-only dict view of one ArraySkeletonFrame channel, so code written
+    for SkeletonFrame's dict fields keeps working. Values come back as
+    tuples of floats (plain floats for 1-D channels), in slot order.
+    """
+
+    __slots__ = ("_values", "_mask", "_extras")
+
+    def __init__(self, values: np.ndarray, mask: np.ndarray, extras: Optional[Mapping[str, JointValue]] = None) -> None:
+        self._values = values
+        self._mask = mask
+        self._extras = extras or {}
+
+    def _value(self, index: int) -> JointValue:
+        value = self._values[index]
+        return float(value) if self._values.ndim == 1 else tuple(value.tolist())
+
+    def __getitem__(self, name: str) -> JointValue:
+        index = JOINT_INDEX.get(name)
+        if index is not None:
+            if self._mask[index]:
+                return self._value(index)
+            raise KeyError(name)
+        return self._extras[name]
+
+    def __contains__(self, name: object) -> bool:
+        index = JOINT_INDEX.get(name)  # type: ignore[arg-type]
+        if index is not None:
+            return bool(self._mask[index])
+        return name in self._extras
+
+    def __iter__(self) -> Iterator[str]:
+        for index in np.flatnonzero(self._mask).tolist():
+            yield JOINT_NAMES[index]
+        yield from self._extras
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._mask)) + len(self._extras)
+
+    def __bool__(self) -> bool:
+        return bool(self._mask.any()) or bool(self._extras)
+
+    def to_dict(self) -> Dict[str, JointValue]:
+        """Plain dict copy, converted in one pass (faster than dict(view))."""
+        rows = self._values.tolist()
+        if self._values.ndim == 1:
+            output = {JOINT_NAMES[index]: rows[index] for index in np.flatnonzero(self._mask).tolist()}
+        else:
+            output = {JOINT_NAMES[index]: tuple(rows[index]) for index in np.flatnonzero(self._mask).tolist()}
+        output.update(self._extras)
+        return output
+
+
+@dataclass(frozen=True)
+class ArraySkeletonFrame:
+    """
+    SkeletonFrame with its per-joint channels stored as fixed-shape arrays.
+
+    Row i of every channel is joint JOINT_NAMES[i] (MediaPipe joints sit at
+    their MEDIAPIPE_INDEX_BY_JOINT index) and the matching mask says which
+    rows hold data; rows outside the mask are unspecified. joints_3d, keypoints_2d, point_depths_m and
+    camera_points_3d are JointView dict views for legacy callers. Joints
+    outside JOINT_NAMES are kept in `extras` and show up in those views,
+    but array-based stages ignore them.
+    """
+
+    source: str
+    timestamp: float
+    exercise: str
+    depth_mode: Optional[str]
+    joints_xyz: np.ndarray  # (NUM_JOINTS, 3)
+    joints_mask: np.ndarray  # (NUM_JOINTS,) bool
+    keypoints_xy: np.ndarray  # (NUM_JOINTS, 2)
+    keypoints_mask: np.ndarray
+    depths_m: np.ndarray  # (NUM_JOINTS,)
+    depths_mask: np.ndarray
+    camera_xyz: np.ndarray  # (NUM_JOINTS, 3)
+    camera_mask: np.ndarray
+    all_joints_3d: Dict[str, Tuple[float, float, float]]
+    camera_position: Optional[Tuple[float, float, float]]
+    camera_intrinsics: Optional[Tuple[float, float, float, float]]
+    camera_resolution: Optional[Tuple[int, int]]
+    arm_head_distance_m: Optional[float]
+    arm_head_state: Optional[str]
+    arm_head_quality: Optional[float]
+    arm_head_source: Optional[str]
+    video_frame_bgr: Optional[np.ndarray]
+    video_width: Optional[int]
+    video_height: Optional[int]
+    # Channel name -> {joint name: value} for joints without a slot
+    extras: Dict[str, Dict[str, JointValue]] = field(default_factory=dict)
+
+    @property
+    def joints_3d(self) -> JointView:
+        return JointView(self.joints_xyz, self.joints_mask, self.extras.get("joints_3d"))
+
+    @property
+    def keypoints_2d(self) -> JointView:
+        return JointView(self.keypoints_xy, self.keypoints_mask, self.extras.get("keypoints_2d"))
+
+    @property
+    def point_depths_m(self) -> JointView:
+        return JointView(self.depths_m, self.depths_mask, self.extras.get("point_depths_m"))
+
+    @property
+    def camera_points_3d(self) -> JointView:
+        return JointView(self.camera_xyz, self.camera_mask, self.extras.get("camera_points_3d"))
+
+    @property
+    def mediapipe_pose_like(self) -> List[Optional[Dict[str, float]]]:
+        pose_like: List[Optional[Dict[str, float]]] = [None] * 33
+        for mp_index in MEDIAPIPE_INDEX_BY_JOINT.values():
+            if self.joints_mask[mp_index] and self.keypoints_mask[mp_index]:
+                x, y = self.keypoints_xy[mp_index].tolist()
+                pose_like[mp_index] = {
+                    "x": x,
+                    "y": y,
+                    "z": float(self.joints_xyz[mp_index, 2]),
+                    "visibility": 1.0,
+                }
+        return pose_like
+
+    @classmethod
+    def from_skeleton_frame(cls, frame: SkeletonFrame) -> "ArraySkeletonFrame":
+        extras: Dict[str, Dict[str, JointValue]] = {}
+        joints_xyz, joints_mask = _pack_channel(frame.joints_3d, 3, extras, "joints_3d")
+        keypoints_xy, keypoints_mask = _pack_channel(frame.keypoints_2d, 2, extras, "keypoints_2d")
+        depths_m, depths_mask = _pack_channel(frame.point_depths_m, 1, extras, "point_depths_m")
+        camera_xyz, camera_mask = _pack_channel(frame.camera_points_3d, 3, extras, "camera_points_3d")
+        return cls(
+            source=frame.source,
+            timestamp=frame.timestamp,
+            exercise=frame.exercise,
+            depth_mode=frame.depth_mode,
+            joints_xyz=joints_xyz,
+            joints_mask=joints_mask,
+            keypoints_xy=keypoints_xy,
+            keypoints_mask=keypoints_mask,
+            depths_m=depths_m,
+            depths_mask=depths_mask,
+            camera_xyz=camera_xyz,
+            camera_mask=camera_mask,
+            all_joints_3d=dict(frame.all_joints_3d),
+            camera_position=frame.camera_position,
+            camera_intrinsics=frame.camera_intrinsics,
+            camera_resolution=frame.camera_resolution,
+            arm_head_distance_m=frame.arm_head_distance_m,
+            arm_head_state=frame.arm_head_state,
+            arm_head_quality=frame.arm_head_quality,
+            arm_head_source=frame.arm_head_source,
+            video_frame_bgr=frame.video_frame_bgr,
+            video_width=frame.video_width,
+            video_height=frame.video_height,
+            extras=extras,
+        )
+
+    def with_channels(self, **changes: object) -> "ArraySkeletonFrame":
+        """Copy with some fields swapped; dataclasses.replace minus its per-call field walk."""
+        frame = object.__new__(ArraySkeletonFrame)
+        frame.__dict__.update(self.__dict__, **changes)
+        return frame
+
+    def to_skeleton_frame(self) -> SkeletonFrame:
+        joints_3d = dict(self.joints_3d)
+        keypoints_2d = dict(self.keypoints_2d)
+        return SkeletonFrame(
+            source=self.source,
+            timestamp=self.timestamp,
+            exercise=self.exercise,
+            depth_mode=self.depth_mode,
+            joints_3d=joints_3d,
+            all_joints_3d=dict(self.all_joints_3d),
+            keypoints_2d=keypoints_2d,
+            point_depths_m=dict(self.point_depths_m),
+            camera_position=self.camera_position,
+            camera_intrinsics=self.camera_intrinsics,
+            camera_resolution=self.camera_resolution,
+            camera_points_3d=dict(self.camera_points_3d),
+            arm_head_distance_m=self.arm_head_distance_m,
+            arm_head_state=self.arm_head_state,
+            arm_head_quality=self.arm_head_quality,
+            arm_head_source=self.arm_head_source,
+            video_frame_bgr=self.video_frame_bgr,
+            video_width=self.video_width,
+            video_height=self.video_height,
+            mediapipe_pose_like=_build_mediapipe_pose_like(joints_3d, keypoints_2d),
+        )
+
+
+AnySkeletonFrame = Union[SkeletonFrame, ArraySkeletonFrame]
+
+
+def as_array_frame(frame: AnySkeletonFrame) -> ArraySkeletonFrame:
+    if isinstance(frame, ArraySkeletonFrame):
+        return frame
+    return ArraySkeletonFrame.from_skeleton_frame(frame)
+
+
+def _empty_channel(width: int) -> Tuple[np.ndarray, np.ndarray]:
+    shape = (NUM_JOINTS,) if width == 1 else (NUM_JOINTS, width)
+    return np.zeros(shape, dtype=np.float64), np.zeros(NUM_JOINTS, dtype=bool)
+
+
+def _pack_channel(
+    values: Mapping[str, JointValue],
+    width: int,
+    extras: Dict[str, Dict[str, JointValue]],
+    channel: str,
+) -> Tuple[np.ndarray, np.ndarray]:
+    array, mask = _empty_channel(width)
+    indices: List[int] = []
+    rows: List[JointValue] = []
+    for name, value in values.items():
+        index = JOINT_INDEX.get(name)
+        if index is None:
+            extras.setdefault(channel, {})[name] = value
+            continue
+        indices.append(index)
+        rows.append(value)
+    if indices:
+        array[indices] = rows
+        mask[indices] = True
+    return array, mask
+
+
+def _midpoint_joints(xyz: np.ndarray, mask: np.ndarray) -> None:
+    # root / neck from the hips / shoulders, unless the payload sent them
+    for target, left, right in (("root", "left_hip", "right_hip"), ("neck", "left_shoulder", "right_shoulder")):
+        t, l, r = JOINT_INDEX[target], JOINT_INDEX[left], JOINT_INDEX[right]
+        if not mask[t] and mask[l] and mask[r]:
+            xyz[t] = (xyz[l] + xyz[r]) / 2.0
+            mask[t] = True
+
+
+def project_to_normalized_2d(
+    xyz: np.ndarray,
+    mask: np.ndarray,
+    extras: Optional[Mapping[str, Tuple[float, float, float]]] = None,
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, Tuple[float, float]]]:
+    """Array form of _project_to_normalized_2d: joints scaled into their own x/y bounding box."""
+    extras = extras or {}
+    if not mask.any() and not extras:
+        return _empty_channel(2) + ({},)
+    xy = xyz[mask, :2]
+    if extras:
+        xy = np.concatenate([xy, np.asarray([coords[:2] for coords in extras.values()], dtype=np.float64)])
+    low = xy.min(axis=0)
+    size = np.maximum(xy.max(axis=0) - low, 1e-6)
+    keypoints = (xyz[:, :2] - low) / size
+    (min_x, min_y), (width, height) = low.tolist(), size.tolist()
+    projected_extras = {
+        name: ((coords[0] - min_x) / width, (coords[1] - min_y) / height) for name, coords in extras.items()
+    }
+    return keypoints, mask.copy(), projected_extras
+
+
+def reconstruct_camera_xyz(
+    keypoints_xy: np.ndarray,
+    keypoints_mask: np.ndarray,
+    depths_m: np.ndarray,
+    depths_mask: np.ndarray,
+    camera_intrinsics: Optional[Tuple[float, float, float, float]],
+    camera_resolution: Optional[Tuple[int, int]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Array form of reconstruct_camera_points_3d: back-project every joint with a keypoint and a depth."""
+    valid = keypoints_mask & depths_mask
+    if not valid.any():
+        return _empty_channel(3)
+    camera_xyz = np.empty((NUM_JOINTS, 3))
+    if camera_intrinsics is not None and camera_resolution is not None:
+        fx, fy, cx, cy = camera_intrinsics
+        width, height = camera_resolution
+        uv = keypoints_xy * (float(max(width - 1, 1)), float(max(height - 1, 1)))
+        camera_xyz[:, :2] = ((uv - (cx, cy)) * depths_m[:, None]) / (fx, fy)
+    else:
+        camera_xyz[:, :2] = keypoints_xy
+    camera_xyz[:, 2] = depths_m
+    return camera_xyz, valid
+
+
+def adapt_ios_payload_arrays(
+    payload: Mapping[str, object],
+    decode_video_frame: bool = True,
+) -> ArraySkeletonFrame:
+    """adapt_ios_payload, building the joint channels straight into arrays."""
+    required_fields = ("device", "timestamp", "exercise", "joints")
+    for field_name in required_fields:
+        if field_name not in payload:
+            raise ValueError(f"Missing required field '{field_name}'")
+
+    joints_obj = payload["joints"]
+    if not isinstance(joints_obj, Mapping):
+        raise ValueError("'joints' must be an object")
+
+    extras: Dict[str, Dict[str, JointValue]] = {}
+    joints_xyz, joints_mask = _empty_channel(3)
+    extra_joints: Dict[str, Tuple[float, float, float]] = {}
+    all_joints_3d = _parse_all_joints(payload.get("all_joints"))
+    indices: List[int] = []
+    rows: List[Tuple[float, float, float]] = []
+    for joint_name, raw_xyz in joints_obj.items():
+        name = str(joint_name)
+        xyz = _as_xyz(raw_xyz, name)
+        all_joints_3d.setdefault(name, xyz)
+        index = JOINT_INDEX.get(name)
+        if index is None:
+            extra_joints[name] = xyz
+        else:
+            indices.append(index)
+            rows.append(xyz)
+    if indices:
+        joints_xyz[indices] = rows
+        joints_mask[indices] = True
+    _midpoint_joints(joints_xyz, joints_mask)
+    if extra_joints:
+        extras["joints_3d"] = dict(extra_joints)
+
+    keypoints_xy, keypoints_mask, extra_keypoints = project_to_normalized_2d(joints_xyz, joints_mask, extra_joints)
+    payload_keypoints, payload_keypoints_mask = _pack_channel(_parse_keypoints_2d(payload), 2, extras, "keypoints_2d")
+    if payload_keypoints_mask.any():
+        keypoints_xy[payload_keypoints_mask] = payload_keypoints[payload_keypoints_mask]
+        keypoints_mask |= payload_keypoints_mask
+    extra_keypoints.update(extras.pop("keypoints_2d", {}))
+    if extra_keypoints:
+        extras["keypoints_2d"] = extra_keypoints
+
+    point_depths_m = _parse_point_depths_m(payload)
+    depths_m, depths_mask = _pack_channel(point_depths_m, 1, extras, "point_depths_m")
+    camera_intrinsics = _parse_camera_intrinsics(payload)
+    camera_resolution = _parse_camera_resolution(payload)
+    camera_xyz, camera_mask = reconstruct_camera_xyz(
+        keypoints_xy, keypoints_mask, depths_m, depths_mask, camera_intrinsics, camera_resolution
+    )
+    if "point_depths_m" in extras:
+        extra_points = _reconstruct_camera_points_3d(
+            keypoints_2d=extra_keypoints,
+            point_depths_m=extras["point_depths_m"],
+            camera_intrinsics=camera_intrinsics,
+            camera_resolution=camera_resolution,
+        )
+        if extra_points:
+            extras["camera_points_3d"] = dict(extra_points)
+
+    if decode_video_frame:
+        video_frame_bgr, video_width, video_height = _decode_video_frame(payload)
+    else:
+        video_frame_bgr, video_width, video_height = None, None, None
+
+    return ArraySkeletonFrame(
+        source=str(payload["device"]),
+        timestamp=float(payload["timestamp"]),
+        exercise=str(payload["exercise"]),
+        depth_mode=str(payload.get("depth_mode")) if payload.get("depth_mode") is not None else None,
+        joints_xyz=joints_xyz,
+        joints_mask=joints_mask,
+        keypoints_xy=keypoints_xy,
+        keypoints_mask=keypoints_mask,
+        depths_m=depths_m,
+        depths_mask=depths_mask,
+        camera_xyz=camera_xyz,
+        camera_mask=camera_mask,
+        all_joints_3d=all_joints_3d,
+        camera_position=_parse_camera_position(payload),
+        camera_intrinsics=camera_intrinsics,
+        camera_resolution=camera_resolution,
+        arm_head_distance_m=_parse_arm_head_distance_m(payload),
+        arm_head_state=_parse_arm_head_state(payload),
+        arm_head_quality=_parse_arm_head_quality(payload),
+        arm_head_source=_parse_arm_head_source(payload),
+        video_frame_bgr=video_frame_bgr,
+        video_width=video_width,
+        video_height=video_height,
+        extras=extras,
+    )
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# A stage function returns the item for the next stage, or None to stop the item here.
+StageFn = Callable[[Any], Any]
+
+
+@dataclass
+class StageStats:
+    processed: int = 0
+    dropped: int = 0
+    errors: int = 0
+    last_ms: float = 0.0
+    avg_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, elapsed_ms: float, alpha: float = 0.1) -> None:
+        self.processed += 1
+        self.last_ms = elapsed_ms
+        self.avg_ms = elapsed_ms if self.processed == 1 else (alpha * elapsed_ms) + ((1.0 - alpha) * self.avg_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+class PipelineStage:
+    """
+    One stage of a streaming pipeline: a bounded queue drained by a task that
+    runs `fn` on each item, in the stage's own single-thread executor (so
+    items are handled in order and stage state is only touched by one
+    thread) or, with on_loop=True, directly on the event loop.
+
+    offer() never waits: when the queue is full the oldest item is dropped,
+    so the newest frame wins. A stage built with drop_when_full=False makes
+    submit() wait for room instead, pushing backpressure onto whoever
+    feeds it. Each stage's results go to its downstream stage, if any.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: StageFn,
+        maxsize: int = 1,
+        downstream: Optional["PipelineStage"] = None,
+        drop_when_full: bool = True,
+        on_loop: bool = False,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.downstream = downstream
+        # Input policy when the queue is full: drop the oldest item, or make the feeder wait
+        self.drop_when_full = drop_when_full
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, int(maxsize)))
+        self.stats = StageStats()
+        self._executor = None if on_loop else ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stage-{name}")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "PipelineStage":
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"stage-{self.name}")
+        return self
+
+    def offer(self, item: Any) -> bool:
+        """Enqueue without waiting, dropping the oldest queued item if full. False if one was dropped."""
+        dropped = False
+        while self.queue.full():
+            with contextlib.suppress(asyncio.QueueEmpty):
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.stats.dropped += 1
+                dropped = True
+        self.queue.put_nowait(item)
+        return not dropped
+
+    async def submit(self, item: Any) -> None:
+        """Enqueue following this stage's input policy (offer, or wait for room)."""
+        if self.drop_when_full:
+            self.offer(item)
+        else:
+            await self.queue.put(item)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            try:
+                started = time.perf_counter()
+                try:
+                    if self._executor is None:
+                        result = self.fn(item)
+                    else:
+                        result = await loop.run_in_executor(self._executor, self.fn, item)
+                except Exception as error:
+                    self.stats.errors += 1
+                    print(f"[pipeline] stage {self.name} failed: {error}")
+                    continue
+                self.stats.record((time.perf_counter() - started) * 1000.0)
+                if self.downstream is not None and result is not None:
+                    await self.downstream.submit(result)
+            finally:
+                self.queue.task_done()
+
+    async def stop(self, drain_timeout_sec: float = 0.0) -> None:
+        """Stop the stage; with a timeout, first let already queued items finish."""
+        if self._task is None:
+            return
+        if drain_timeout_sec > 0.0:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.queue.join(), drain_timeout_sec)
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if self._executor is not None:
+            # Waits for an item still running in the executor thread
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue": self.queue.qsize(),
+            "processed": self.stats.processed,
+            "dropped": self.stats.dropped,
+            "errors": self.stats.errors,
+            "last_ms": round(self.stats.last_ms, 2),
+            "avg_ms": round(self.stats.avg_ms, 2),
+            "max_ms": round(self.stats.max_ms, 2),
+        }
+
+
+def format_stage_stats(stages: List[PipelineStage]) -> str:
+    return " | ".join(
+        f"{stage.name} q={stage.queue.qsize()} avg={stage.stats.avg_ms:.1f}ms "
+        f"max={stage.stats.max_ms:.1f}ms done={stage.stats.processed} drop={stage.stats.dropped}"
+        for stage in stages
+    )
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Benchmark session log storage: one document per frame vs columnar chunks.
+
+Replays a reference exercise recording as iOS LiDAR frames and reports, for
+both SESSION_LOG_FORMAT layouts, the stored BSON size per frame and the
+encode throughput (record building plus BSON encoding). With --mongo-uri
+and pymongo installed it also times insert_many into a scratch collection.
+
+    python benchmarks/bench_session_storage.py [--frames 3000] [--mongo-uri mongodb://localhost:27017]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.session_chunks import SessionChunkBuilder, read_session_chunks
+from backend.skeleton_adapter import MEDIAPIPE_INDEX_BY_JOINT, adapt_ios_payload, to_pipeline_payload
+
+try:
+    import bson
+except Exception:  # pragma: no cover - ships with pymongo
+    bson = None
+
+REFERENCE = Path(__file__).resolve().parent.parent / "skeleton_data" / "ex1_reference.json"
+# ARKit body skeletons report 91 joints
+ARKIT_JOINTS = 91
+
+
+def _bson_size(value) -> int:
+    """Encoded BSON size of a document, for when the bson package is unavailable."""
+
+    def element(key: str, item) -> int:
+        return 1 + len(key.encode()) + 1 + payload(item)
+
+    def payload(item) -> int:
+        if item is None or isinstance(item, bool):
+            return 0 if item is None else 1
+        if isinstance(item, int):
+            return 4 if -(2**31) <= item < 2**31 else 8
+        if isinstance(item, float):
+            return 8
+        if isinstance(item, str):
+            return 4 + len(item.encode()) + 1
+        if isinstance(item, (bytes, bytearray)):
+            return 4 + 1 + len(item)
+        if isinstance(item, dict):
+            return 4 + sum(element(str(k), v) for k, v in item.items()) + 1
+        if isinstance(item, (list, tuple)):
+            return 4 + sum(element(str(i), v) for i, v in enumerate(item)) + 1
+        raise TypeError(f"Unsupported type {type(item).__name__}")
+
+    return payload(value)
+
+
+def _encode(doc) -> int:
+    if bson is not None:
+        return len(bson.encode(doc))
+    return _bson_size(doc)
+
+
+def _frames(count: int):
+    reference = json.loads(REFERENCE.read_text())
+    landmarks = [frame["landmarks"] for frame in reference["frames"]]
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        lms = landmarks[i % len(landmarks)]
+        joints = {name: [lms[idx]["x"], lms[idx]["y"], lms[idx]["z"] + 2.0] for name, idx in MEDIAPIPE_INDEX_BY_JOINT.items()}
+        payload = {
+            "device": "ios_lidar",
+            "timestamp": i / 30.0,
+            "exercise": reference["exercise"],
+            "joints": joints,
+            "all_joints": {f"joint_{k}": rng.uniform(-1, 1, 3).tolist() for k in range(ARKIT_JOINTS)},
+            "keypoints_2d": {name: [lms[idx]["x"], lms[idx]["y"]] for name, idx in MEDIAPIPE_INDEX_BY_JOINT.items()},
+            "point_depths_m": {name: 2.0 + lms[idx]["z"] for name, idx in MEDIAPIPE_INDEX_BY_JOINT.items()},
+            "camera_intrinsics": [1400.0, 1400.0, 960.0, 720.0],
+            "camera_width": 1920,
+            "camera_height": 1440,
+            "camera_position": [0.0, 1.2, 0.0],
+        }
+        frame = adapt_ios_payload(payload, decode_video_frame=False)
+        metrics = {f"metric_{k}": float(rng.uniform(0, 180)) for k in range(40)}
+        frames.append((frame, metrics, "Good form"))
+    return frames
+
+
+def _document_layout(frames):
+    return [
+        {
+            "timestamp": frame.timestamp,
+            "exercise": frame.exercise,
+            "source": frame.source,
+            "metrics": metrics,
+            "feedback": feedback,
+            "skeleton": to_pipeline_payload(frame),
+        }
+        for frame, metrics, feedback in frames
+    ]
+
+
+def _chunk_layout(frames, chunk_seconds: float):
+    builder = SessionChunkBuilder("bench", chunk_seconds=chunk_seconds)
+    docs = [doc for entry in frames if (doc := builder.add(*entry)) is not None]
+    last = builder.finish()
+    return docs + ([last] if last is not None else [])
+
+
+def _measure(build, frames):
+    started = time.perf_counter()
+    docs = build(frames)
+    total = sum(_encode(doc) for doc in docs)
+    elapsed = time.perf_counter() - started
+    return docs, total, elapsed
+
+
+def _insert(uri: str, docs) -> float:
+    from pymongo import MongoClient
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=1500)
+    collection = client["bench_session_storage"]["sessions"]
+    collection.drop()
+    started = time.perf_counter()
+    for start in range(0, len(docs), 64):
+        collection.insert_many(docs[start : start + 64], ordered=False)
+    elapsed = time.perf_counter() - started
+    client.drop_database("bench_session_storage")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--chunk-seconds", type=float, default=5.0)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    frames = _frames(args.frames)
+    if bson is None:
+        print("bson not installed: sizes from a pure-Python estimator, which also slows the encode rates")
+    layouts = {
+        "documents": _document_layout,
+        "chunks": lambda f: _chunk_layout(f, args.chunk_seconds),
+    }
+    results = {}
+    for name, build in layouts.items():
+        docs, total, elapsed = _measure(build, frames)
+        results[name] = total
+        line = (
+            f"{name:>9}: {len(docs):5d} docs  {total / 1e6:7.2f} MB  {total / len(frames):7.0f} B/frame  "
+            f"encode {len(frames) / elapsed:8.0f} frames/s"
+        )
+        if args.mongo_uri:
+            line += f"  insert {len(frames) / _insert(args.mongo_uri, docs):8.0f} frames/s"
+        print(line)
+    print(f"chunks are {results['documents'] / results['chunks']:.1f}x smaller")
+
+    chunks = _chunk_layout(frames, args.chunk_seconds)
+    started = time.perf_counter()
+    session = read_session_chunks(chunks)
+    print(f"read back {len(session.timestamps)} frames into arrays in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -79,6 +79,8 @@ ENABLE_MEDIAPIPE_FUSION = _bool_env("ENABLE_MEDIAPIPE_FUSION", True)
 USE_IOS_VIDEO_FOR_MEDIAPIPE = _bool_env("USE_IOS_VIDEO_FOR_MEDIAPIPE", True)
 WARN_IF_IOS_VIDEO_MISSING = _bool_env("WARN_IF_IOS_VIDEO_MISSING", True)
 IOS_DROP_PAYLOADS_IF_BUSY = _bool_env("IOS_DROP_PAYLOADS_IF_BUSY", True)
+# Frames queued between iOS pipeline stages (decode -> fusion -> metrics -> present)
+IOS_PIPELINE_QUEUE_SIZE = max(int(os.getenv("IOS_PIPELINE_QUEUE_SIZE", "1")), 1)
 IOS_DISABLE_JOINT_STABILIZATION = _bool_env("IOS_DISABLE_JOINT_STABILIZATION", True)
 MEDIAPIPE_POSE_TASK_MODEL = os.getenv(
     "MEDIAPIPE_POSE_TASK_MODEL",
@@ -118,3 +120,18 @@ MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "pt_app")
 SESSIONS_COLLECTION = os.getenv("SESSIONS_COLLECTION", "sessions")
 EXERCISE_TEMPLATES_COLLECTION = os.getenv("EXERCISE_TEMPLATES_COLLECTION", "exerciseTemplates")
 LOG_EVERY_N_FRAMES = max(int(os.getenv("LOG_EVERY_N_FRAMES", "10")), 1)
+# Background session log writer: records are batched into insert_many calls
+SESSION_LOG_BATCH_SIZE = max(int(os.getenv("SESSION_LOG_BATCH_SIZE", "64")), 1)
+SESSION_LOG_FLUSH_INTERVAL_SEC = max(_float_env("SESSION_LOG_FLUSH_INTERVAL_SEC", 1.0), 0.0)
+SESSION_LOG_QUEUE_SIZE = max(int(os.getenv("SESSION_LOG_QUEUE_SIZE", "1024")), 1)
+# When the writer falls behind: "sample" keeps every Nth record once half full, "drop" only drops when full
+SESSION_LOG_OVERFLOW = os.getenv("SESSION_LOG_OVERFLOW", "sample").strip().lower()
+if SESSION_LOG_OVERFLOW not in {"sample", "drop"}:
+    SESSION_LOG_OVERFLOW = "sample"
+SESSION_LOG_SAMPLE_EVERY = max(int(os.getenv("SESSION_LOG_SAMPLE_EVERY", "4")), 1)
+SESSION_LOG_CLOSE_TIMEOUT_SEC = max(_float_env("SESSION_LOG_CLOSE_TIMEOUT_SEC", 5.0), 0.0)
+# "chunks": one columnar document per SESSION_CHUNK_SECONDS (see backend/session_chunks.py); "documents": one per logged frame
+SESSION_LOG_FORMAT = os.getenv("SESSION_LOG_FORMAT", "chunks").strip().lower()
+if SESSION_LOG_FORMAT not in {"chunks", "documents"}:
+    SESSION_LOG_FORMAT = "chunks"
+SESSION_CHUNK_SECONDS = max(_float_env("SESSION_CHUNK_SECONDS", 5.0), 0.5)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Microbenchmark CoachV2Engine.infer against the previous per-landmark loop version.
+
+Replays the bundled skeleton reference clips (ex1/ex2/ex4/ex6), with a little
+noise so some joints diverge and coaching messages are produced, through both
+implementations on fresh engines, checks the outputs agree and reports
+per-call latency.
+
+    python benchmarks/bench_coach_infer.py [--repeats 3]
+"""
+
+import argparse
+import math
+import statistics
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from coach_engine import CoachV2Engine
+from pt_coach.common import (
+    ALIGNMENT_LANDMARKS,
+    PART_BY_INDEX,
+    SIDE_BY_INDEX,
+    feature_vector,
+    knee_angles_deg,
+    landmarks_list_to_np,
+    load_reference_json,
+    moving_average,
+    normalize_to_body_frame,
+    procrustes_align_2d,
+)
+from train_reference import _exercise_key_from_filename
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "coach_models"
+SKELETON_DIR = Path(__file__).resolve().parents[2] / "skeleton_data"
+CLIPS = ["ex1_reference.json", "ex2_reference.json", "ex4_reference.json", "ex6_reference.json"]
+
+
+def legacy_infer(engine: CoachV2Engine, landmarks_xyzw: np.ndarray, timestamp_sec: float) -> dict:
+    """CoachV2Engine.infer as it was before vectorization (Python loops over landmarks)."""
+    norm, frame_info = normalize_to_body_frame(landmarks_xyzw)
+    feat_scaled = engine._scale_feature(feature_vector(norm, engine.feature_landmarks))
+    ref_idx, dist = engine._match_frame(feat_scaled)
+    ref = engine.ref_norm[ref_idx]
+
+    engine.quality_hist.append(engine._quality_from_distance(dist))
+    quality_smooth = moving_average(list(engine.quality_hist), 8)
+    _, _, knee_avg = knee_angles_deg(norm)
+    engine._update_reps(knee_avg)
+
+    align_indices = [i for i in ALIGNMENT_LANDMARKS if float(landmarks_xyzw[i, 3]) > 0.5]
+    if len(align_indices) >= 4:
+        _, rot, proc_scale, proc_trans = procrustes_align_2d(norm[align_indices, :2], ref[align_indices, :2])
+        ref_aligned = np.zeros_like(ref[:, :2])
+        for i in range(33):
+            ref_aligned[i] = proc_scale * (ref[i, :2] @ rot.T) + proc_trans
+    else:
+        ref_aligned = ref[:, :2].copy()
+
+    pelvis = frame_info["pelvis"]
+    x_axis = frame_info["x_axis"]
+    y_axis = frame_info["y_axis"]
+    hip_width = float(frame_info["scale"][0])
+    ref_image = np.zeros((33, 2), dtype=np.float32)
+    for i in range(33):
+        ref_image[i] = pelvis + (ref_aligned[i, 0] * x_axis + ref_aligned[i, 1] * y_axis) * hip_width
+
+    divergences = []
+    coaching_messages = []
+    total_div_sq = 0.0
+    n_visible = 0
+    for idx in engine.correction_landmarks:
+        if float(landmarks_xyzw[idx, 3]) < 0.5:
+            continue
+        delta = norm[idx, :2] - ref_aligned[idx]
+        div_dist = float(np.linalg.norm(delta))
+        total_div_sq += div_dist ** 2
+        n_visible += 1
+        side = SIDE_BY_INDEX.get(idx, "")
+        part = PART_BY_INDEX.get(idx, "")
+        divergences.append({
+            "side": side,
+            "part": part,
+            "delta_x": round(float(delta[0]), 4),
+            "delta_y": round(float(delta[1]), 4),
+            "distance": round(div_dist, 4),
+        })
+        if div_dist > engine.coach_threshold:
+            direction = engine._direction_text(float(delta[0]), float(delta[1]))
+            magnitude = "slightly" if div_dist < 0.20 else ("" if div_dist < 0.35 else "more")
+            msg = f"Move your {side} {part} {direction}"
+            if magnitude:
+                msg += f" {magnitude}"
+            coaching_messages.append({"type": "correction", "text": msg.strip().replace("  ", " ") + "."})
+
+    rms_div = math.sqrt(total_div_sq / max(1, n_visible))
+    # The previous version kept ~10 s of (timestamp_sec, rms) tuples and formatted the last 60
+    rms_history = engine.__dict__.setdefault("legacy_rms_history", deque(maxlen=300))
+    rms_history.append((float(timestamp_sec), float(rms_div)))
+    for i, cm in enumerate(coaching_messages):
+        cm["_div"] = divergences[i]["distance"] if i < len(divergences) else 0
+    coaching_messages.sort(key=lambda c: c.get("_div", 0), reverse=True)
+    for cm in coaching_messages:
+        cm.pop("_div", None)
+
+    return {
+        "rms_divergence": round(float(rms_div), 4),
+        "quality": round(float(quality_smooth), 3),
+        "divergences": divergences,
+        "coaching_messages": coaching_messages,
+        "rms_history": [{"timeSec": round(t, 2), "rms": round(r, 4)} for t, r in list(rms_history)[-60:]],
+        "ref_landmarks": [
+            {"x": round(float(ref_image[i, 0]), 5), "y": round(float(ref_image[i, 1]), 5)} for i in range(33)
+        ],
+    }
+
+
+def _load_frames(clip: Path) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    frames = []
+    for f in load_reference_json(clip)["frames"]:
+        lms = landmarks_list_to_np(f["landmarks"])
+        lms[:, :2] += rng.normal(0.0, 0.01, size=(33, 2)).astype(np.float32)
+        frames.append(lms)
+    return frames
+
+
+def _max_abs_diff(a: dict, b: dict) -> float:
+    """Largest numeric difference between two infer outputs (coaching order excluded)."""
+    diffs = [abs(a["rms_divergence"] - b["rms_divergence"]), abs(a["quality"] - b["quality"])]
+    for da, db in zip(a["divergences"], b["divergences"]):
+        diffs += [abs(da[k] - db[k]) for k in ("delta_x", "delta_y", "distance")]
+    for ra, rb in zip(a["ref_landmarks"], b["ref_landmarks"]):
+        diffs += [abs(ra["x"] - rb["x"]), abs(ra["y"] - rb["y"])]
+    assert len(a["divergences"]) == len(b["divergences"])
+    assert sorted(m["text"] for m in a["coaching_messages"]) == sorted(m["text"] for m in b["coaching_messages"])
+    return max(diffs)
+
+
+def _time_us(fn, engine_path: Path, frames: list[np.ndarray]) -> list[float]:
+    engine = CoachV2Engine(engine_path, temporal=False)
+    times = []
+    for i, lms in enumerate(frames):
+        start = time.perf_counter()
+        fn(engine, lms, i / 30.0)
+        times.append((time.perf_counter() - start) * 1e6)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'clip':<20} {'exercise':<16} {'frames':>6} {'before us':>10} {'after us':>9} {'speedup':>8} {'max diff':>9}")
+    for name in CLIPS:
+        clip = SKELETON_DIR / name
+        key = _exercise_key_from_filename(name)
+        model_path = MODELS_DIR / f"{key}_reference_model.npz"
+        frames = _load_frames(clip)
+
+        old_engine = CoachV2Engine(model_path, temporal=False)
+        new_engine = CoachV2Engine(model_path, temporal=False)
+        max_diff = 0.0
+        for i, lms in enumerate(frames):
+            max_diff = max(max_diff, _max_abs_diff(legacy_infer(old_engine, lms, i / 30.0), new_engine.infer(lms, i / 30.0)))
+
+        before, after = [], []
+        for _ in range(args.repeats):
+            before += _time_us(legacy_infer, model_path, frames)
+            after += _time_us(CoachV2Engine.infer, model_path, frames)
+        b, a = statistics.median(before), statistics.median(after)
+        print(f"{name:<20} {key:<16} {len(frames):>6} {b:>10.1f} {a:>9.1f} {b / a:>7.2f}x {max_diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
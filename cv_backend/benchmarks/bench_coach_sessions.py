@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark coach session setup: per-session model load vs the shared registry.
+
+For every bundled exercise model, reports the time to create one session's
+CoachV2Engine and the process RSS growth after opening many sessions, both
+for the old path (each session loads its own .npz/.meta.json) and for
+CoachModelRegistry sessions over memory-mapped shared arrays.
+
+    python benchmarks/bench_coach_sessions.py [--sessions 200]
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from coach_engine import CoachV2Engine
+from coach_registry import CoachModelRegistry
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "coach_models"
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return float("nan")
+
+
+# Sessions stay alive for the whole run so freed memory can't hide RSS growth
+_live: list = []
+
+
+def _measure(create, n: int) -> tuple[float, float]:
+    """(median setup us, RSS growth MB) for n live sessions."""
+    gc.collect()
+    rss0 = _rss_mb()
+    sessions = _live
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        sessions.append(create())
+        times.append((time.perf_counter() - start) * 1e6)
+    gc.collect()
+    return statistics.median(times), _rss_mb() - rss0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = {p.name.replace("_reference_model.npz", ""): p for p in sorted(MODELS_DIR.glob("*_reference_model.npz"))}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        registry = CoachModelRegistry(cache_dir)
+        registry.register(paths)
+        start = time.perf_counter()
+        registry.preload()
+        print(f"registry preload ({len(paths)} models, incl. unpack): {(time.perf_counter() - start) * 1e3:.1f} ms\n")
+
+        print(f"{'exercise':<16} {'per-session load us':>20} {'registry us':>12} {'RSS +MB load':>13} {'RSS +MB registry':>17}")
+        for key, path in paths.items():
+            load_us, load_mb = _measure(lambda: CoachV2Engine(path), args.sessions)
+            reg_us, reg_mb = _measure(lambda: registry.session(key), args.sessions)
+            print(f"{key:<16} {load_us:>20.1f} {reg_us:>12.1f} {load_mb:>13.1f} {reg_mb:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Benchmark full vs reduced (IMREAD_REDUCED_*) JPEG decode for incoming frames.
+
+Reports per-frame decode time and decoded image size (the per-frame peak
+allocation) for common client resolutions, using the same factor selection
+the WebSocket handlers use.
+
+    python benchmarks/bench_decode.py [--iters 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_context import FrameContext, jpeg_size, reduced_decode_factor
+
+RESOLUTIONS = [(480, 360), (640, 480), (1280, 720), (1920, 1080)]
+SESSIONS = {
+    "pose": {"min_side": 256, "min_width": 0},
+    "pose,face": {"min_side": 360, "min_width": 0},
+    "pose,face+pain": {"min_side": 360, "min_width": 640},
+}
+
+
+def _synthetic_jpeg(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 4)
+    cv2.rectangle(img, (width // 3, height // 6), (2 * width // 3, 5 * height // 6), (90, 140, 200), -1)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def _time_decode(data: bytes, min_side: int, min_width: int, iters: int) -> tuple[float, FrameContext]:
+    frame = FrameContext.from_jpeg(data, min_side, min_width)
+    start = time.perf_counter()
+    for _ in range(iters):
+        FrameContext.from_jpeg(data, min_side, min_width).rgb
+    return (time.perf_counter() - start) * 1000.0 / iters, frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iters", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'source':>10} {'session':>15} {'factor':>6} {'decoded':>10} {'ms/frame':>9} {'MB/frame':>9} {'speedup':>8}")
+    for width, height in RESOLUTIONS:
+        data = _synthetic_jpeg(width, height)
+        assert jpeg_size(data) == (width, height)
+        full_ms, full = _time_decode(data, 0, 0, args.iters)
+        full_mb = (full.bgr.nbytes + full.rgb.nbytes) / 1e6
+        print(f"{width}x{height:<5} {'full':>15} {1:>6} {full.width}x{full.height:<5} {full_ms:>9.2f} {full_mb:>9.2f} {'1.00x':>8}")
+        for name, floors in SESSIONS.items():
+            factor = reduced_decode_factor(width, height, **floors)
+            ms, frame = _time_decode(data, floors["min_side"], floors["min_width"], args.iters)
+            mb = (frame.bgr.nbytes + frame.rgb.nbytes) / 1e6
+            print(
+                f"{'':>10} {name:>15} {factor:>6} {frame.width}x{frame.height:<5} "
+                f"{ms:>9.2f} {mb:>9.2f} {full_ms / ms:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Throughput of the pain CNN: eager checkpoint vs frozen TorchScript vs int8 TorchScript.
+
+Runs the steady-state per-prediction work (tower on one target crop plus the
+fusion head against the cached reference embeddings) on fixed inputs, for
+each variant and torch thread count, with `--workers` threads predicting
+concurrently the way PainService's pool does. Exports go to a temp dir.
+
+    python benchmarks/bench_pain_model.py [--refs 3] [--threads 1 2 4] [--workers 1 2] [--seconds 3]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pain_detector import _DEFAULT_CHECKPOINT, _DEFAULT_NUM_OUTPUTS, load_checkpoint
+from pain_export import ensure_exported, set_thread_budget
+
+
+def _predictions_per_sec(net, refs: int, workers: int, seconds: float) -> float:
+    gen = torch.Generator().manual_seed(0)
+    target = torch.rand(1, 1, 160, 160, generator=gen)
+    with torch.inference_mode():
+        ref_embs = net.embed(torch.rand(refs, 1, 160, 160, generator=gen))
+        for _ in range(3):  # warm-up (TorchScript profiling runs)
+            net.head(net.embed(target), ref_embs)
+
+    counts = [0] * workers
+    stop = time.perf_counter() + seconds
+
+    def run(i):
+        with torch.inference_mode():
+            while time.perf_counter() < stop:
+                net.head(net.embed(target), ref_embs)
+                counts[i] += 1
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", default=_DEFAULT_CHECKPOINT)
+    parser.add_argument("--refs", type=int, default=3)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = str(Path(tmp) / "model.pt")
+        shutil.copy(args.checkpoint, ckpt)
+        variants = {
+            "eager": load_checkpoint(ckpt, _DEFAULT_NUM_OUTPUTS),
+            "torchscript": torch.jit.load(ensure_exported(ckpt, _DEFAULT_NUM_OUTPUTS)),
+            "torchscript-int8": torch.jit.load(ensure_exported(ckpt, _DEFAULT_NUM_OUTPUTS, quantized=True)),
+        }
+
+        print(f"refs={args.refs}  predictions/s (higher is better)")
+        print(f"{'variant':<17} {'workers':>7} {'threads':>7} {'pred/s':>8}")
+        for workers in args.workers:
+            for budget in args.threads:
+                threads = set_thread_budget(budget * workers, workers)
+                for name, net in variants.items():
+                    rate = _predictions_per_sec(net, args.refs, workers, args.seconds)
+                    print(f"{name:<17} {workers:>7} {threads:>7} {rate:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
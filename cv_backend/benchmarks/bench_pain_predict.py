@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Microbenchmark MLPainEngine's reference comparison against the previous per-reference loop.
+
+Builds a synthetic face frame with matching 478-point landmarks, aligns it
+once, then scores it against 1..N neutral references both ways: one
+ConvNetOrdinalLateFusion forward pass per [target, ref] pair (before), and
+the engine's current path (after): the tower on the target only, then one
+batched fusion-head pass over the reference embeddings cached at calibration.
+Checks the PSPI scores agree and reports per-prediction model time.
+
+    python benchmarks/bench_pain_predict.py [--refs 1 3 5 8] [--repeats 50]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pain_detector import (
+    _DEFAULT_CHECKPOINT,
+    _DEFAULT_NUM_OUTPUTS,
+    _PAIN_MODELS_DIR,
+    MP_TO_68,
+    MLPainEngine,
+)
+
+WIDTH, HEIGHT = 480, 360
+
+
+def synthetic_face(seed: int) -> tuple[np.ndarray, list]:
+    """A BGR frame with a drawn face and 478 normalized landmarks placed on it."""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8), (0, 0), 3)
+    cv2.ellipse(img, (240, 175), (70, 90), 0, 0, 360, (180, 160, 150), -1)
+    cv2.circle(img, (215, 150), 8, (30, 30, 30), -1)
+    cv2.circle(img, (265, 150), 8, (30, 30, 30), -1)
+    cv2.ellipse(img, (240, 215), (25, 8), 0, 0, 360, (60, 40, 120), -1)
+
+    std = np.load(Path(_PAIN_MODELS_DIR) / "standard_face_68.npy").astype(np.float32)
+    std = (std - std.min(0)) / (std.max(0) - std.min(0))
+    pts = std * np.array([120, 150]) + np.array([180, 100]) + rng.normal(0, 1.0, (68, 2))
+    lms = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(478)]
+    for k, i in enumerate(MP_TO_68):
+        lms[i] = SimpleNamespace(x=float(pts[k, 0] / WIDTH), y=float(pts[k, 1] / HEIGHT), z=0.0)
+    return img, lms
+
+
+def legacy_scores(engine: MLPainEngine, target: torch.Tensor) -> float:
+    """MLPainEngine.predict's model stage as it was: one forward pass per reference."""
+    scores = []
+    with torch.no_grad():
+        for ref in engine.ref_tensors:
+            out = engine.model(torch.cat([target, ref], dim=1)).detach().cpu().numpy()
+            scores.append(np.clip(out[0, -3:], 0, None))
+    return float(np.array(scores).mean())
+
+
+def cached_scores(engine: MLPainEngine, target: torch.Tensor) -> float:
+    out = engine.head(engine.embed(target))
+    return float(np.clip(out[:, -3:], 0, None).mean())
+
+
+def _time_ms(fn, engine: MLPainEngine, target: torch.Tensor, repeats: int) -> float:
+    fn(engine, target)  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(engine, target)
+        times.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--refs", type=int, nargs="+", default=[1, 3, 5, 8])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--checkpoint", default=_DEFAULT_CHECKPOINT)
+    args = parser.parse_args()
+
+    engine = MLPainEngine(args.checkpoint, _DEFAULT_NUM_OUTPUTS)
+    frame, lms = synthetic_face(0)
+    target = engine._prep(frame, lms)
+    refs = [synthetic_face(seed) for seed in range(1, max(args.refs) + 1)]
+
+    print(f"torch threads: {torch.get_num_threads()}")
+    print(f"{'refs':>4} {'before ms':>10} {'after ms':>9} {'speedup':>8} {'max diff':>9}")
+    for n in args.refs:
+        engine.clear_references()
+        for ref_frame, ref_lms in refs[:n]:
+            engine.add_reference(ref_frame, ref_lms)
+        diff = abs(legacy_scores(engine, target) - cached_scores(engine, target))
+        b = _time_ms(legacy_scores, engine, target, args.repeats)
+        a = _time_ms(cached_scores, engine, target, args.repeats)
+        print(f"{n:>4} {b:>10.2f} {a:>9.2f} {b / a:>7.2f}x {diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
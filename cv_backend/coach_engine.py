@@ -14,6 +14,8 @@ from typing import Any
 
 import numpy as np
 
+from phase_matcher import PhaseMatcher
+from ref_index import brute_force_nearest, load_or_build
 from pt_coach.common import (
     ALIGNMENT_LANDMARKS,
     FEATURE_LANDMARKS,
@@ -28,28 +30,97 @@ from pt_coach.common import (
 )
 
 
-class CoachV2Engine:
-    """Simple divergence-based coaching engine.
+class CoachModel:
+    """Immutable reference data for one exercise, shared by every session.
 
-    Match frame -> measure divergence -> coach if above threshold.
-    No cv2 or visualization code -- purely returns structured dicts.
+    Holds the reference arrays, metadata, nearest-reference index and the
+    per-model lookup tables. Nothing here is mutated after construction, so
+    one instance (see coach_registry) can back any number of engines.
     """
 
-    def __init__(self, model_npz_path: str | Path):
-        model_npz_path = Path(model_npz_path)
-        metadata_json_path = model_npz_path.with_suffix("").with_suffix(".meta.json")
-
-        model = np.load(model_npz_path)
-        self.ref_norm = model["ref_norm"]              # (N, 33, 3)
-        self.ref_features_scaled = model["ref_features_scaled"]  # (N, D)
-        self.feat_mean = model["feat_mean"]
-        self.feat_std = model["feat_std"]
+    def __init__(self, arrays, meta: dict[str, Any]):
+        self.ref_norm = arrays["ref_norm"]              # (N, 33, 3)
+        self.ref_features_scaled = arrays["ref_features_scaled"]  # (N, D)
+        self.feat_mean = np.asarray(arrays["feat_mean"])
+        self.feat_std = np.asarray(arrays["feat_std"])
+        # Exact nearest-reference index (persisted by train_reference.train); None -> brute force
+        self.ref_index = load_or_build(self.ref_features_scaled, arrays)
 
-        meta = json.loads(metadata_json_path.read_text(encoding="utf-8"))
         self.meta = meta
         self.feature_landmarks = [int(i) for i in meta["feature_landmarks"]]
         self.correction_landmarks = [int(i) for i in meta["correction_landmarks"]]
         self.dist_cal = meta["distance_calibration"]
+        self.ref_fps = float(meta.get("reference_fps", 15.0))
+        self.ref_loops = bool(meta.get("reference_loops", False))
+
+        # Index arrays and labels precomputed for the vectorized per-frame path
+        self.align_idx = np.array(ALIGNMENT_LANDMARKS, dtype=np.intp)
+        self.corr_idx = np.array(self.correction_landmarks, dtype=np.intp)
+        self.corr_sides = [SIDE_BY_INDEX.get(i, "") for i in self.correction_landmarks]
+        self.corr_parts = [PART_BY_INDEX.get(i, "") for i in self.correction_landmarks]
+
+    @classmethod
+    def load(cls, model_npz_path: str | Path) -> "CoachModel":
+        """Read a model .npz and its .meta.json into memory."""
+        model_npz_path = Path(model_npz_path)
+        metadata_json_path = model_npz_path.with_suffix("").with_suffix(".meta.json")
+        with np.load(model_npz_path) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        meta = json.loads(metadata_json_path.read_text(encoding="utf-8"))
+        return cls(arrays, meta)
+
+    def match(self, feat_scaled: np.ndarray) -> tuple[int, float]:
+        """Nearest-neighbor match by euclidean distance in scaled feature space.
+
+        Uses the KD-tree index when the model has one, brute force otherwise;
+        both return the same frame.
+
+        Returns (ref_index, distance).
+        """
+        if self.ref_index is not None:
+            return self.ref_index.query(feat_scaled)
+        return brute_force_nearest(self.ref_features_scaled, feat_scaled)
+
+
+class CoachV2Engine:
+    """Simple divergence-based coaching engine.
+
+    Match frame -> measure divergence -> coach if above threshold.
+    No cv2 or visualization code -- purely returns structured dicts.
+
+    An engine is one session's state (smoothing, rep counting, phase tracking)
+    on top of a shared CoachModel; pass a CoachModel from coach_registry to
+    skip loading the model files.
+    """
+
+    def __init__(self, model: CoachModel | str | Path, temporal: bool = True):
+        if not isinstance(model, CoachModel):
+            model = CoachModel.load(model)
+        self.model = model
+        self.ref_norm = model.ref_norm
+        self.ref_features_scaled = model.ref_features_scaled
+        self.feat_mean = model.feat_mean
+        self.feat_std = model.feat_std
+        self.ref_index = model.ref_index
+        self.meta = meta = model.meta
+        self.feature_landmarks = model.feature_landmarks
+        self.correction_landmarks = model.correction_landmarks
+        self.dist_cal = model.dist_cal
+
+        # Phase tracking: match within a band around the user's position in the
+        # reference clip instead of against every frame. temporal=False keeps
+        # independent per-frame matching.
+        self.matcher = (
+            PhaseMatcher(
+                self.ref_features_scaled,
+                self._match_frame,
+                loss_distance=float(self.dist_cal["p90"]),
+                ref_fps=model.ref_fps,
+                loop=model.ref_loops,
+            )
+            if temporal
+            else None
+        )
 
         # Coaching threshold: divergence (in body-frame units) above which we coach.
         # 0.04 per joint is roughly ~1-2cm for an average person.
@@ -58,9 +129,9 @@ class CoachV2Engine:
         # Quality smoothing
         self.quality_hist: deque[float] = deque(maxlen=12)
 
-        # RMS history for graphing improvement over time
-        # Store (timestamp_sec, rms_divergence) tuples
-        self.rms_history: deque[tuple[float, float]] = deque(maxlen=300)  # ~10 sec @ 30fps
+        # RMS history for graphing improvement over time: the last 60
+        # {timeSec, rms} entries, kept in the form infer() returns them
+        self.rms_history: deque[dict[str, float]] = deque(maxlen=60)
 
         # Rep counting via knee angle state machine
         self.rep_count = 0
@@ -77,13 +148,8 @@ class CoachV2Engine:
         return (feat - self.feat_mean) / self.feat_std
 
     def _match_frame(self, feat_scaled: np.ndarray) -> tuple[int, float]:
-        """Nearest-neighbor match by euclidean distance in scaled feature space.
-
-        Returns (ref_index, distance).
-        """
-        d = np.linalg.norm(self.ref_features_scaled - feat_scaled[None, :], axis=1)
-        idx = int(np.argmin(d))
-        return idx, float(d[idx])
+        """Nearest-neighbor match (see CoachModel.match). Returns (ref_index, distance)."""
+        return self.model.match(feat_scaled)
 
     def _quality_from_distance(self, d: float) -> float:
         """Map distance to 0-1 using calibration p50/p90 values."""
@@ -134,7 +200,10 @@ class CoachV2Engine:
         feat = feature_vector(norm, self.feature_landmarks)
         feat_scaled = self._scale_feature(feat)
 
-        ref_idx, dist = self._match_frame(feat_scaled)
+        if self.matcher is not None:
+            ref_idx, dist = self.matcher.update(feat_scaled, timestamp_sec)
+        else:
+            ref_idx, dist = self._match_frame(feat_scaled)
         ref = self.ref_norm[ref_idx]
 
         quality = self._quality_from_distance(dist)
@@ -144,99 +213,61 @@ class CoachV2Engine:
         left_knee, right_knee, knee_avg = knee_angles_deg(norm)
         self._update_reps(knee_avg)
 
+        visible = landmarks_xyzw[:, 3] > 0.5
+
         # --- Procrustes alignment: rotate+scale the reference to best match the user ---
-        align_indices = [i for i in ALIGNMENT_LANDMARKS if float(landmarks_xyzw[i, 3]) > 0.5]
-        if len(align_indices) >= 4:
-            user_align = norm[align_indices, :2]
-            ref_align = ref[align_indices, :2]
-            _, rot, proc_scale, proc_trans = procrustes_align_2d(user_align, ref_align)
-
-            # Apply Procrustes transform to ALL 33 reference landmarks
-            ref_aligned = np.zeros_like(ref[:, :2])
-            for i in range(33):
-                ref_aligned[i] = proc_scale * (ref[i, :2] @ rot.T) + proc_trans
+        align_idx = self.model.align_idx[visible[self.model.align_idx]]
+        if align_idx.size >= 4:
+            _, rot, proc_scale, proc_trans = procrustes_align_2d(norm[align_idx, :2], ref[align_idx, :2])
+            # Apply Procrustes transform to all 33 reference landmarks at once
+            ref_aligned = (proc_scale * (ref[:, :2] @ rot.T) + proc_trans).astype(ref.dtype)
         else:
             # Not enough visible landmarks -- fall back to raw body-frame comparison
-            ref_aligned = ref[:, :2].copy()
+            ref_aligned = ref[:, :2]
 
         # Convert aligned reference from body-frame back to image space (0-1 normalized)
-        pelvis = frame_info["pelvis"]
-        x_axis = frame_info["x_axis"]
-        y_axis = frame_info["y_axis"]
+        axes = np.stack([frame_info["x_axis"], frame_info["y_axis"]])  # (2, 2) rows = body axes
         hip_width = float(frame_info["scale"][0])
-        ref_image = np.zeros((33, 2), dtype=np.float32)
-        for i in range(33):
-            ref_image[i] = pelvis + (ref_aligned[i, 0] * x_axis + ref_aligned[i, 1] * y_axis) * hip_width
+        ref_image = (frame_info["pelvis"] + (ref_aligned @ axes) * hip_width).astype(np.float32)
+
+        # Per-joint divergence over the visible exercise-specific correction landmarks
+        corr_mask = landmarks_xyzw[self.model.corr_idx, 3] >= 0.5
+        corr_idx = self.model.corr_idx[corr_mask]
+        delta = norm[corr_idx, :2] - ref_aligned[corr_idx]
+        div_dist = np.linalg.norm(delta, axis=1)
+        n_visible = int(corr_idx.size)
+        rms_div = math.sqrt(float(np.sum(div_dist.astype(np.float64) ** 2)) / max(1, n_visible))
+
+        sides = [s for s, m in zip(self.model.corr_sides, corr_mask) if m]
+        parts = [p for p, m in zip(self.model.corr_parts, corr_mask) if m]
+        delta_r = np.round(delta.astype(np.float64), 4).tolist()
+        dist_r = np.round(div_dist.astype(np.float64), 4).tolist()
+        divergences: list[dict[str, Any]] = [
+            {"side": side, "part": part, "delta_x": dx, "delta_y": dy, "distance": d}
+            for side, part, (dx, dy), d in zip(sides, parts, delta_r, dist_r)
+        ]
 
-        # Compute per-joint divergence using exercise-specific correction landmarks
-        divergences: list[dict[str, Any]] = []
+        # Coach only above threshold (0.04 per joint), worst joint first
         coaching_messages: list[dict[str, Any]] = []
-        total_div_sq = 0.0
-        n_visible = 0
-
-        for idx in self.correction_landmarks:
-            vis = float(landmarks_xyzw[idx, 3])
-            if vis < 0.5:
-                continue
-
-            # Divergence after Procrustes alignment
-            user_xy = norm[idx, :2]
-            aligned_ref_xy = ref_aligned[idx]
-            delta = user_xy - aligned_ref_xy
-            div_dist = float(np.linalg.norm(delta))
-            total_div_sq += div_dist ** 2
-            n_visible += 1
-
-            side = SIDE_BY_INDEX.get(idx, "")
-            part = PART_BY_INDEX.get(idx, "")
-
-            div_entry = {
-                "side": side,
-                "part": part,
-                "delta_x": round(float(delta[0]), 4),
-                "delta_y": round(float(delta[1]), 4),
-                "distance": round(div_dist, 4),
-            }
-            divergences.append(div_entry)
-
-            # Coach only above threshold (0.04 per joint)
-            if div_dist > self.coach_threshold:
-                direction = self._direction_text(float(delta[0]), float(delta[1]))
-                magnitude = "slightly" if div_dist < 0.20 else ("" if div_dist < 0.35 else "more")
-                msg = f"Move your {side} {part} {direction}"
-                if magnitude:
-                    msg += f" {magnitude}"
-                msg = msg.strip().replace("  ", " ") + "."
-
-                coaching_messages.append({
-                    "type": "correction",
-                    "text": msg,
-                })
-
-        rms_div = math.sqrt(total_div_sq / max(1, n_visible))
-
-        # Track RMS over time
-        self.rms_history.append((float(timestamp_sec), float(rms_div)))
-
-        # Sort coaching by divergence implicitly (we process in correction_landmarks order,
-        # but the worst-first ordering is useful for the frontend)
-        # Re-attach divergence info for sorting
-        for i, cm in enumerate(coaching_messages):
-            cm["_div"] = divergences[i]["distance"] if i < len(divergences) else 0
-        coaching_messages.sort(key=lambda c: c.get("_div", 0), reverse=True)
-        for cm in coaching_messages:
-            cm.pop("_div", None)
-
-        # Last 60 RMS history points for frontend sparkline
-        rms_hist_list = [
-            {"timeSec": round(t, 2), "rms": round(r, 4)}
-            for t, r in list(self.rms_history)[-60:]
-        ]
+        over = np.flatnonzero(div_dist > self.coach_threshold)
+        for j in over[np.argsort(-div_dist[over], kind="stable")]:
+            d = float(div_dist[j])
+            direction = self._direction_text(float(delta[j, 0]), float(delta[j, 1]))
+            magnitude = "slightly" if d < 0.20 else ("" if d < 0.35 else "more")
+            msg = f"Move your {sides[j]} {parts[j]} {direction}"
+            if magnitude:
+                msg += f" {magnitude}"
+            coaching_messages.append({
+                "type": "correction",
+                "text": msg.strip().replace("  ", " ") + ".",
+            })
+
+        # Track RMS over time; the last 60 points (already rounded) feed the frontend sparkline
+        self.rms_history.append({"timeSec": round(float(timestamp_sec), 2), "rms": round(float(rms_div), 4)})
 
         # Build ref_landmarks in image space for frontend overlay
         ref_lm_list = [
-            {"x": round(float(ref_image[i, 0]), 5), "y": round(float(ref_image[i, 1]), 5)}
-            for i in range(33)
+            {"x": x, "y": y} for x, y in np.round(ref_image.astype(np.float64), 5).tolist()
         ]
 
         return {
@@ -244,6 +275,6 @@ class CoachV2Engine:
             "quality": round(float(quality_smooth), 3),
             "divergences": divergences,
             "coaching_messages": coaching_messages,
-            "rms_history": rms_hist_list,
+            "rms_history": list(self.rms_history),
             "ref_landmarks": ref_lm_list,
         }
@@ -0,0 +1,126 @@
+"""
+Process-wide registry of coach reference models.
+
+Each exercise's model is loaded once per process and shared by every
+/ws/exercise session; a session only gets a CoachV2Engine holding its own
+mutable state (smoothing, rep counter, phase tracker) on top of the shared
+CoachModel, so session setup does no file I/O.
+
+The reference arrays are saved compressed by train_reference, which forces a
+full decompress into private memory on every load. The registry unpacks each
+.npz once into plain .npy files in a cache directory and memory-maps them
+read-only: every uvicorn worker maps the same files, so the arrays live once
+in the OS page cache rather than once per process. The cache is keyed on the
+.npz size and mtime and rebuilt when the model is retrained.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from coach_engine import CoachModel, CoachV2Engine
+
+logger = logging.getLogger(__name__)
+
+_STAMP_FILE = "source.json"
+
+
+def _source_stamp(npz_path: Path) -> dict:
+    st = npz_path.stat()
+    return {"npz": str(npz_path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _unpack(npz_path: Path, out_dir: Path) -> None:
+    """Write every array of npz_path to out_dir/<name>.npy (atomically per file)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with np.load(npz_path) as npz:
+        for stale in out_dir.glob("*.npy"):
+            if stale.stem not in npz.files:
+                stale.unlink(missing_ok=True)
+        for name in npz.files:
+            tmp = out_dir / f".{name}.{os.getpid()}.npy"
+            np.save(tmp, np.ascontiguousarray(npz[name]))
+            os.replace(tmp, out_dir / f"{name}.npy")
+    # Written last: a complete stamp means a complete cache
+    tmp = out_dir / f".{_STAMP_FILE}.{os.getpid()}"
+    tmp.write_text(json.dumps(_source_stamp(npz_path)), encoding="utf-8")
+    os.replace(tmp, out_dir / _STAMP_FILE)
+
+
+def _cache_is_current(npz_path: Path, out_dir: Path) -> bool:
+    try:
+        stamp = json.loads((out_dir / _STAMP_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return stamp == _source_stamp(npz_path)
+
+
+def load_mapped_arrays(npz_path: Path, cache_dir: Path) -> dict[str, np.ndarray]:
+    """Arrays of a model .npz, memory-mapped from an uncompressed cache."""
+    out_dir = cache_dir / npz_path.stem
+    if not _cache_is_current(npz_path, out_dir):
+        logger.info("Unpacking %s -> %s", npz_path.name, out_dir)
+        _unpack(npz_path, out_dir)
+    return {p.stem: np.load(p, mmap_mode="r") for p in sorted(out_dir.glob("*.npy")) if not p.name.startswith(".")}
+
+
+class CoachModelRegistry:
+    """Loads each exercise's CoachModel once and hands out per-session engines."""
+
+    def __init__(self, cache_dir: str | Path | None = None):
+        # cache_dir=None keeps models fully in memory (no mmap cache)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._paths: dict[str, Path] = {}
+        self._models: dict[str, CoachModel] = {}
+        self._lock = threading.Lock()
+
+    def register(self, model_paths: dict[str, Path]) -> None:
+        """Set exercise_key -> model .npz paths (as returned by ensure_models_exist)."""
+        with self._lock:
+            for key, path in model_paths.items():
+                if self._paths.get(key) != Path(path):
+                    self._models.pop(key, None)
+                self._paths[key] = Path(path)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._paths
+
+    def keys(self) -> list[str]:
+        return list(self._paths)
+
+    def _load(self, path: Path) -> CoachModel:
+        if self.cache_dir is None:
+            return CoachModel.load(path)
+        try:
+            arrays = load_mapped_arrays(path, self.cache_dir)
+        except OSError as e:
+            logger.warning("Model cache unavailable for %s (%s); loading into memory", path.name, e)
+            return CoachModel.load(path)
+        meta = json.loads(path.with_suffix("").with_suffix(".meta.json").read_text(encoding="utf-8"))
+        return CoachModel(arrays, meta)
+
+    def get(self, key: str) -> CoachModel:
+        """Shared model for an exercise, loading it on first use."""
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(self._paths[key])
+                self._models[key] = model
+            return model
+
+    def preload(self) -> None:
+        for key in self.keys():
+            self.get(key)
+
+    def session(self, key: str, temporal: bool = True) -> CoachV2Engine:
+        """Fresh per-session engine backed by the shared model."""
+        return CoachV2Engine(self.get(key), temporal=temporal)
@@ -0,0 +1,125 @@
+"""
+Per-frame image context shared by every stage of a WebSocket frame.
+
+The JPEG is decoded once (to OpenCV's native BGR); colour conversions and
+downscaled variants are derived lazily the first time a stage asks for them
+and cached for the rest of the frame, so pose/face inference, pain alignment
+and any later consumer never repeat the same conversion.
+
+Large frames are decoded straight to 1/2, 1/4 or 1/8 size (libjpeg's DCT
+scaling via IMREAD_REDUCED_COLOR_*) when the consumers of the frame don't
+need the extra pixels; see reduced_decode_factor.
+"""
+
+import base64
+
+import cv2
+import numpy as np
+
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Start-of-frame markers that carry the image dimensions (excludes DHT/JPG/DAC).
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data: bytes) -> tuple[int, int] | None:
+    """Read (width, height) from a JPEG's SOF header without decoding it."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def reduced_decode_factor(width: int, height: int, min_side: int = 0, min_width: int = 0) -> int:
+    """Largest DCT scale factor (8, 4, 2 or 1) that keeps the decoded frame's
+    short side >= min_side and its width >= min_width."""
+    for factor in (8, 4, 2):
+        if min(width, height) // factor >= min_side and width // factor >= min_width:
+            return factor
+    return 1
+
+
+class FrameContext:
+    """Decoded frame plus lazily cached derived images."""
+
+    def __init__(self, bgr: np.ndarray, scale: int = 1):
+        self.bgr = bgr
+        # Decode reduction factor: source pixels per decoded pixel
+        self.scale = scale
+        self._cache: dict = {}
+
+    @classmethod
+    def from_jpeg(cls, data: bytes, min_side: int = 0, min_width: int = 0) -> "FrameContext":
+        """Decode a JPEG, reduced as far as min_side/min_width allow.
+
+        With the defaults (no floors given) this always decodes at full size.
+        """
+        if not data:
+            raise ValueError("Empty frame data")
+        factor = 1
+        if min_side or min_width:
+            size = jpeg_size(data)
+            if size is not None:
+                factor = reduced_decode_factor(size[0], size[1], min_side, min_width)
+        bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), _REDUCED_FLAGS[factor])
+        if bgr is None:
+            raise ValueError("Failed to decode JPEG frame")
+        return cls(bgr, factor)
+
+    @classmethod
+    def from_base64(cls, data: str, min_side: int = 0, min_width: int = 0) -> "FrameContext":
+        if not data:
+            raise ValueError("Empty frame data")
+        return cls.from_jpeg(base64.b64decode(data), min_side, min_width)
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    def cached(self, key, build):
+        """Return cache[key], calling build() the first time it is requested."""
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        return self.cached("rgb", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    def resized(self, width: int, color: str = "bgr") -> np.ndarray:
+        """Frame scaled to `width` (aspect preserved, INTER_AREA) in 'bgr' or 'rgb'."""
+        base = self.rgb if color == "rgb" else self.bgr
+        if width == self.width:
+            return base
+        height = int(self.height * width / self.width)
+        return self.cached(
+            ("resized", color, width),
+            lambda: cv2.resize(base, (width, height), interpolation=cv2.INTER_AREA),
+        )
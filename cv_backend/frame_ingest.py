@@ -0,0 +1,68 @@
+"""
+Latest-frame-wins ingestion for the CV WebSockets.
+
+A reader task drains the socket as fast as frames arrive and keeps only the
+newest undecoded message. The session's processing loop always takes that
+latest frame, so when inference falls behind the browser's send rate older
+frames are dropped instead of queueing in the socket buffer, and end-to-end
+lag stays bounded by roughly one processing interval.
+"""
+
+import asyncio
+import contextlib
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+
+class LatestFrameReader:
+    """Background reader that holds at most one pending frame message."""
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._latest: dict | None = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._read())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _read(self):
+        try:
+            while True:
+                msg = await self._websocket.receive()
+                if msg.get("type") == "websocket.disconnect":
+                    break
+                self.received += 1
+                if self._latest is not None:
+                    self.dropped += 1
+                self._latest = msg
+                self._ready.set()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self._closed = True
+            self._ready.set()
+
+    async def next(self) -> dict | None:
+        """Wait for and return the newest frame message, or None once the client is gone."""
+        while self._latest is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        msg, self._latest = self._latest, None
+        self.processed += 1
+        return msg
+
+    def counters(self) -> dict:
+        return {"received": self.received, "processed": self.processed, "dropped": self.dropped}
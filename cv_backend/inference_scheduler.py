@@ -0,0 +1,177 @@
+"""
+Cross-session micro-batching scheduler for MediaPipe landmark inference.
+
+Frames submitted by every live WebSocket session go into one queue. A
+collector task waits for the first frame, keeps collecting for a short
+window, then fans the batch out over a pool of worker threads. Each worker
+owns its own landmarker instances (created by the factories passed in), so
+concurrent calls never contend on a single MediaPipe graph. Sessions holding
+a VIDEO-mode lease from landmarker_pool run on their own set instead, still
+batched and fanned out by the same workers. Results are returned to the
+awaiting session through a per-frame future.
+"""
+
+import asyncio
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    image: Any
+    detectors: tuple[str, ...]
+    future: asyncio.Future
+    lease: Any = None
+    timestamp_ms: int = 0
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class InferenceScheduler:
+    """Collects frames from all sessions and runs them on per-worker landmarkers."""
+
+    def __init__(
+        self,
+        factories: dict[str, Callable[[], Any]],
+        num_workers: int = 3,
+        window_ms: float = 4.0,
+        max_batch: int = 16,
+    ):
+        self.factories = factories
+        self.num_workers = max(1, num_workers)
+        self.window_sec = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+
+        self._local = threading.local()
+        self._instances: list[Any] = []
+        self._instances_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_workers,
+            thread_name_prefix="landmarker",
+            initializer=self._init_worker,
+        )
+        self._queue: asyncio.Queue | None = None
+        self._collector: asyncio.Task | None = None
+        self._in_flight = 0
+
+        # Stats
+        self._batches = 0
+        self._frames = 0
+        self._last_batch_size = 0
+        self._max_batch_seen = 0
+        self._waits_ms: collections.deque[float] = collections.deque(maxlen=512)
+
+    # -- worker side -------------------------------------------------------
+
+    def _init_worker(self):
+        """Create this worker thread's private landmarker set."""
+        self._local.landmarkers = {name: factory() for name, factory in self.factories.items()}
+        with self._instances_lock:
+            self._instances.extend(self._local.landmarkers.values())
+
+    def _run_detector(self, name: str, job: _Job):
+        if job.lease is not None:
+            return job.lease.detect(name, job.image, job.timestamp_ms)
+        return self._local.landmarkers[name].detect(job.image)
+
+    def warm_up(self):
+        """Start every worker thread now so models load at startup, not on the first frame."""
+        barrier = threading.Barrier(self.num_workers)
+        futures = [self._executor.submit(barrier.wait) for _ in range(self.num_workers)]
+        for f in futures:
+            f.result()
+        logger.info("Inference scheduler ready (%d workers, window=%.1fms)", self.num_workers, self.window_sec * 1000)
+
+    # -- event-loop side ---------------------------------------------------
+
+    def _ensure_started(self):
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def detect(self, image, detectors, lease=None) -> dict:
+        """Queue one frame for the selected detectors and await its results.
+
+        With a lease (a landmarker_pool.LandmarkerSet) the frame runs in VIDEO
+        mode on the session's own landmarkers instead of the worker's.
+        """
+        self._ensure_started()
+        job = _Job(
+            image,
+            tuple(d for d in self.factories if d in detectors),
+            asyncio.get_running_loop().create_future(),
+            lease=lease,
+            timestamp_ms=lease.next_timestamp() if lease is not None else 0,
+        )
+        self._queue.put_nowait(job)
+        return await job.future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self.window_sec > 0 and self.max_batch > 1:
+                await asyncio.sleep(self.window_sec)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list[_Job]):
+        now = time.perf_counter()
+        self._batches += 1
+        self._frames += len(batch)
+        self._last_batch_size = len(batch)
+        self._max_batch_seen = max(self._max_batch_seen, len(batch))
+        loop = asyncio.get_running_loop()
+        for job in batch:
+            self._waits_ms.append((now - job.enqueued_at) * 1000.0)
+            if job.future.done():  # session went away while queued
+                continue
+            self._in_flight += 1
+            loop.create_task(self._run_job(job))
+
+    async def _run_job(self, job: _Job):
+        loop = asyncio.get_running_loop()
+        try:
+            outputs = await asyncio.gather(
+                *(loop.run_in_executor(self._executor, self._run_detector, name, job) for name in job.detectors)
+            )
+            if not job.future.done():
+                job.future.set_result(dict(zip(job.detectors, outputs)))
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        waits = np.array(self._waits_ms, dtype=np.float32)
+        return {
+            "workers": self.num_workers,
+            "window_ms": round(self.window_sec * 1000.0, 2),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "batches": self._batches,
+            "frames": self._frames,
+            "last_batch_size": self._last_batch_size,
+            "max_batch_size": self._max_batch_seen,
+            "mean_batch_size": round(self._frames / self._batches, 2) if self._batches else 0.0,
+            "wait_ms_mean": round(float(waits.mean()), 2) if waits.size else 0.0,
+            "wait_ms_p95": round(float(np.percentile(waits, 95)), 2) if waits.size else 0.0,
+        }
+
+    def close(self):
+        if self._collector is not None:
+            self._collector.cancel()
+        self._executor.shutdown(wait=True)
+        with self._instances_lock:
+            for landmarker in self._instances:
+                landmarker.close()
+            self._instances.clear()
@@ -0,0 +1,187 @@
+"""
+Binary landmark wire format for /ws/track and /ws/exercise responses.
+
+Opt-in via query param ``?format=binary``; JSON stays the default. Each
+response is one binary WebSocket message, little-endian:
+
+    header (24 bytes)
+        4s  magic          b"GMLM"
+        H   version        1
+        H   header_size    24
+        H   num_poses      H pose_points
+        H   num_hands      H hand_points
+        H   num_faces      H face_points
+        I   extra_len      bytes of trailing UTF-8 JSON (0 if none)
+    float32[num_poses, pose_points, 4]   x, y, z, visibility
+    float32[num_hands, hand_points, 3]   x, y, z
+    float32[num_hands]                   handedness: 0 = Left, 1 = Right, NaN = unknown
+    float32[num_faces, face_points, 3]   x, y, z
+    UTF-8 JSON object                    non-landmark fields (exercise, pain, coaching, ...)
+
+Every array starts on a 4-byte boundary, so browsers can wrap each section
+in a Float32Array without copying. Errors are still sent as JSON text
+messages, so clients can tell them apart by message type.
+
+Sessions keep one LandmarkBuffers: the frame's results are copied out of
+the MediaPipe objects once, into arrays laid out exactly as above, and the
+packet, the JSON payload and the exercise detectors all read those.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"GMLM"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHH6HI")
+HEADER_SIZE = _HEADER.size
+
+HANDEDNESS_CODES = {"Left": 0.0, "Right": 1.0}
+
+
+def _fill_groups(buf: np.ndarray, groups) -> tuple[int, int]:
+    """Copy MediaPipe landmark groups into buf[:groups, :points] in one pass.
+
+    Returns (groups, points) filled, points being the longest group's
+    length; the tail of a shorter group is NaN. A fourth column receives
+    visibility (1.0 where the model reports none). Coordinates go straight
+    into buf, so no per-landmark objects are allocated.
+    """
+    if not groups:
+        return 0, 0
+    n = min(len(groups), buf.shape[0])
+    capacity, width = buf.shape[1], buf.shape[2]
+    points = min(max(len(groups[g]) for g in range(n)), capacity)
+    # Flat float32 view of buf (C-contiguous, allocated by LandmarkBuffers)
+    flat = memoryview(buf).cast("B").cast("f")
+    for g in range(n):
+        group = groups[g]
+        start = g * capacity * width
+        stop = start + min(len(group), points) * width
+        if width == 4:
+            for k, lm in zip(range(start, stop, 4), group):
+                flat[k] = lm.x
+                flat[k + 1] = lm.y
+                flat[k + 2] = lm.z
+                flat[k + 3] = 1.0 if lm.visibility is None else lm.visibility
+        else:
+            for k, lm in zip(range(start, stop, 3), group):
+                flat[k] = lm.x
+                flat[k + 1] = lm.y
+                flat[k + 2] = lm.z
+        if len(group) < points:
+            buf[g, len(group) : points] = np.nan
+    return n, points
+
+
+class LandmarkBuffers:
+    """Per-session float32 landmark arrays, refilled in place from each frame's results.
+
+    fill() reads every landmark object of a frame's MediaPipe results once;
+    pose (poses, 33, 4), hands (hands, 21, 3), handedness (hands,) and face
+    (faces, 478, 3) are then views of buffers allocated with the session,
+    shared by the binary packet, the JSON payload and the detectors. A
+    view is overwritten by the next fill(), so copy anything kept longer.
+    """
+
+    def __init__(
+        self,
+        max_poses: int = 1,
+        max_hands: int = 2,
+        max_faces: int = 1,
+        pose_points: int = 33,
+        hand_points: int = 21,
+        face_points: int = 478,
+    ):
+        self._pose = np.zeros((max_poses, pose_points, 4), dtype=np.float32)
+        self._hands = np.zeros((max_hands, hand_points, 3), dtype=np.float32)
+        self._handedness = np.full(max_hands, np.nan, dtype=np.float32)
+        self._face = np.zeros((max_faces, face_points, 3), dtype=np.float32)
+        self._pose_n = self._hands_n = self._face_n = (0, 0)
+
+    def fill(self, pose_result=None, hand_result=None, face_result=None) -> "LandmarkBuffers":
+        """Load one frame's raw MediaPipe results (any may be None)."""
+        self._pose_n = _fill_groups(self._pose, pose_result.pose_landmarks if pose_result else None)
+        self._hands_n = _fill_groups(self._hands, hand_result.hand_landmarks if hand_result else None)
+        self._face_n = _fill_groups(self._face, face_result.face_landmarks if face_result else None)
+        self._handedness[:] = np.nan
+        if hand_result is not None and hand_result.handedness:
+            for i, h in enumerate(hand_result.handedness[: self._hands_n[0]]):
+                if h:
+                    self._handedness[i] = HANDEDNESS_CODES.get(h[0].category_name, np.nan)
+        return self
+
+    @property
+    def pose(self) -> np.ndarray:
+        return self._pose[: self._pose_n[0], : self._pose_n[1]]
+
+    @property
+    def hands(self) -> np.ndarray:
+        return self._hands[: self._hands_n[0], : self._hands_n[1]]
+
+    @property
+    def handedness(self) -> np.ndarray:
+        return self._handedness[: self._hands_n[0]]
+
+    @property
+    def face(self) -> np.ndarray:
+        return self._face[: self._face_n[0], : self._face_n[1]]
+
+    def pack(self, extra: dict | None = None) -> bytes:
+        """This frame's landmarks (plus extra fields) as one binary message."""
+        return pack_arrays(self.pose, self.hands, self.handedness, self.face, extra)
+
+
+def pack_arrays(pose, hands, handedness, face, extra: dict | None = None) -> bytes:
+    """Serialize landmark arrays (shapes as in the layout above) into one binary message."""
+    extra_bytes = json.dumps(extra, separators=(",", ":")).encode("utf-8") if extra else b""
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        HEADER_SIZE,
+        pose.shape[0], pose.shape[1],
+        hands.shape[0], hands.shape[1],
+        face.shape[0], face.shape[1],
+        len(extra_bytes),
+    )
+    return b"".join(
+        (header, pose.tobytes(), hands.tobytes(), handedness.tobytes(), face.tobytes(), extra_bytes)
+    )
+
+
+def pack_results(pose_result, hand_result, face_result, extra: dict | None = None) -> bytes:
+    """Serialize raw MediaPipe results (any may be None) into one binary message."""
+    return LandmarkBuffers().fill(pose_result, hand_result, face_result).pack(extra)
+
+
+def unpack(data: bytes) -> dict:
+    """Decode a packet back into arrays. Used by tests and Python clients."""
+    (
+        magic, version, header_size,
+        num_poses, pose_points,
+        num_hands, hand_points,
+        num_faces, face_points,
+        extra_len,
+    ) = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a landmark packet")
+    if version != VERSION:
+        raise ValueError(f"Unsupported landmark packet version {version}")
+
+    offset = header_size
+
+    def take(shape):
+        nonlocal offset
+        count = int(np.prod(shape))
+        arr = np.frombuffer(data, dtype=np.float32, count=count, offset=offset).reshape(shape)
+        offset += count * 4
+        return arr
+
+    pose = take((num_poses, pose_points, 4))
+    hands = take((num_hands, hand_points, 3))
+    handedness = take((num_hands,))
+    face = take((num_faces, face_points, 3))
+    extra = json.loads(data[offset:offset + extra_len].decode("utf-8")) if extra_len else {}
+    return {"pose": pose, "hands": hands, "handedness": handedness, "face": face, "extra": extra}
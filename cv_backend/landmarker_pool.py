@@ -0,0 +1,101 @@
+"""
+Per-session VIDEO-mode landmarker pool.
+
+In IMAGE mode every frame runs full person/face/hand detection. VIDEO mode
+keeps per-graph tracking state and only falls back to detection when the
+tracker loses the subject, which is much cheaper for the steady single-person
+streams we serve. Tracking state means a landmarker can't be shared between
+sessions, so each WebSocket leases a dedicated set for its lifetime and hands
+it back on disconnect. A returned set is closed rather than kept warm for the
+next session, which would otherwise start out tracking the previous
+session's subject; the pool only holds the factories. The number of leased
+sets is capped, and sessions beyond the cap fall back to the shared
+IMAGE-mode workers.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LandmarkerSet:
+    """VIDEO-mode landmarkers for one session, created lazily per detector."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, factories: dict[str, Callable[[], Any]]):
+        self.id = next(self._ids)
+        self._factories = factories
+        self._landmarkers: dict[str, Any] = {}
+        self._last_ts_ms = 0
+
+    def next_timestamp(self) -> int:
+        """Strictly increasing wall-clock timestamp (ms), as detect_for_video requires."""
+        self._last_ts_ms = max(self._last_ts_ms + 1, int(time.monotonic() * 1000))
+        return self._last_ts_ms
+
+    def detect(self, name: str, image, timestamp_ms: int):
+        landmarker = self._landmarkers.get(name)
+        if landmarker is None:
+            landmarker = self._factories[name]()
+            self._landmarkers[name] = landmarker
+        return landmarker.detect_for_video(image, timestamp_ms)
+
+    def close(self):
+        for landmarker in self._landmarkers.values():
+            landmarker.close()
+        self._landmarkers.clear()
+
+
+class LandmarkerPool:
+    """Leases fresh LandmarkerSets to sessions, with a global cap."""
+
+    def __init__(self, factories: dict[str, Callable[[], Any]], max_sets: int = 8):
+        self.factories = factories
+        self.max_sets = max(0, max_sets)
+        self._lock = threading.Lock()
+        self._leased: dict[int, LandmarkerSet] = {}
+
+        # Stats
+        self._created = 0
+        self._fallbacks = 0
+
+    def acquire(self) -> LandmarkerSet | None:
+        """Lease a new set, or return None if the pool is at its cap."""
+        with self._lock:
+            if len(self._leased) >= self.max_sets:
+                self._fallbacks += 1
+                return None
+            lease = LandmarkerSet(self.factories)
+            self._created += 1
+            self._leased[lease.id] = lease
+            return lease
+
+    def release(self, lease: LandmarkerSet | None):
+        """Close a leased set, dropping its tracking state, and free its slot."""
+        if lease is None:
+            return
+        with self._lock:
+            if self._leased.pop(lease.id, None) is None:
+                return
+        lease.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_sets": self.max_sets,
+                "leased": len(self._leased),
+                "created": self._created,
+                "fallbacks": self._fallbacks,
+            }
+
+    def close(self):
+        with self._lock:
+            sets = list(self._leased.values())
+            self._leased.clear()
+        for lease in sets:
+            lease.close()
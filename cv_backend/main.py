@@ -4,25 +4,33 @@ Receives base64-encoded JPEG frames, returns JSON landmark coordinates.
 
 Supports detector selection via query param: /ws/track?detect=pose,hands,face
 Runs selected detectors in parallel threads for maximum throughput.
+
+Responses are JSON by default; pass ?format=binary for the packed float32
+layout described in landmark_packet.py. Each session processes only the newest
+pending frame (see frame_ingest.py); every response carries "frames" counters
+for received, processed and dropped frames.
 """
 
-import asyncio
-import base64
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
-import cv2
 import mediapipe as mp
 import numpy as np
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 
 from rep_counter import RepCounter, SixSevenDetector
-from ml_pain_detector import MLPainDetector
+from ml_pain_detector import ALIGN_WIDTH
+from pain_service import PainService
 from coach_engine import CoachV2Engine
+from coach_registry import CoachModelRegistry
 from train_reference import ensure_models_exist
-from pt_coach.common import landmarks_list_to_np
+from frame_context import FrameContext
+from frame_ingest import LatestFrameReader
+from inference_scheduler import InferenceScheduler
+from landmarker_pool import LandmarkerPool, LandmarkerSet
+from landmark_packet import LandmarkBuffers
 
 from mediapipe.tasks.python import BaseOptions
 from mediapipe.tasks.python.vision import (
@@ -47,8 +55,10 @@ _skel_dev = Path(__file__).parent.parent / "web" / "public" / "skeleton_data"
 _skel_docker = Path(__file__).parent / "skeleton_data"
 SKELETON_DATA_DIR = _skel_dev if _skel_dev.exists() else _skel_docker
 COACH_MODELS_DIR = Path(__file__).parent / "coach_models"
+# Uncompressed, memory-mapped copies of the coach models, shared by all workers
+COACH_CACHE_DIR = Path(os.getenv("CV_COACH_CACHE_DIR", str(COACH_MODELS_DIR / ".cache")))
 
-coach_model_paths: dict[str, Path] = {}
+coach_registry = CoachModelRegistry(COACH_CACHE_DIR)
 
 POSE_LABELS = {
     0: "nose",
@@ -63,41 +73,70 @@ POSE_LABELS = {
 
 app = FastAPI(title="GatorMotion CV API")
 
-# Thread pool for parallel detection (MediaPipe releases GIL during inference)
-_executor = ThreadPoolExecutor(max_workers=3)
-
-# Landmarkers loaded at startup
-pose_landmarker: PoseLandmarker | None = None
-hand_landmarker: HandLandmarker | None = None
-face_landmarker: FaceLandmarker | None = None
+# Cross-session inference scheduling. Each worker thread owns its own landmarker
+# set (MediaPipe releases the GIL during inference), so sessions never contend
+# on a single graph. Tunable per container via env.
+INFERENCE_WORKERS = int(os.getenv("CV_INFERENCE_WORKERS", "3"))
+BATCH_WINDOW_MS = float(os.getenv("CV_BATCH_WINDOW_MS", "4"))
+MAX_BATCH_SIZE = int(os.getenv("CV_MAX_BATCH_SIZE", "16"))
+
+# Per-session VIDEO-mode landmarker leases (tracking instead of full detection).
+# Sessions beyond the cap use the shared IMAGE-mode workers above.
+MAX_SESSION_LANDMARKERS = int(os.getenv("CV_MAX_SESSION_LANDMARKERS", "8"))
+
+# Pain inference: one shared model, served off the event loop by a thread pool.
+# Per session: rate cap and the share of a core its updates may use.
+PAIN_WORKERS = int(os.getenv("CV_PAIN_WORKERS", "2"))
+PAIN_MAX_HZ = float(os.getenv("CV_PAIN_MAX_HZ", "10"))
+PAIN_DUTY = float(os.getenv("CV_PAIN_DUTY", "0.5"))
+# torch CPU threads for this process, split across the pain workers
+PAIN_THREADS = int(os.getenv("CV_PAIN_THREADS", str(os.cpu_count() or 1)))
+# Run the exported (frozen TorchScript) pain model; optionally its int8 variant
+PAIN_TORCHSCRIPT = os.getenv("CV_PAIN_TORCHSCRIPT", "1") == "1"
+PAIN_INT8 = os.getenv("CV_PAIN_INT8", "0") == "1"
+
+pain_service = PainService(
+    num_workers=PAIN_WORKERS,
+    max_hz=PAIN_MAX_HZ,
+    duty=PAIN_DUTY,
+    thread_budget=PAIN_THREADS,
+    scripted=PAIN_TORCHSCRIPT,
+    quantized=PAIN_INT8,
+)
 
+scheduler: InferenceScheduler | None = None
+landmarker_pool: LandmarkerPool | None = None
 
-@app.on_event("startup")
-def load_models():
-    global pose_landmarker, hand_landmarker, face_landmarker, coach_model_paths
 
-    pose_landmarker = PoseLandmarker.create_from_options(
+def _create_pose_landmarker(running_mode: RunningMode = RunningMode.IMAGE) -> PoseLandmarker:
+    return PoseLandmarker.create_from_options(
         PoseLandmarkerOptions(
             base_options=BaseOptions(model_asset_path=POSE_MODEL),
-            running_mode=RunningMode.IMAGE,
+            running_mode=running_mode,
             num_poses=1,
             min_pose_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
         )
     )
 
-    hand_landmarker = HandLandmarker.create_from_options(
+
+def _create_hand_landmarker(running_mode: RunningMode = RunningMode.IMAGE) -> HandLandmarker:
+    return HandLandmarker.create_from_options(
         HandLandmarkerOptions(
             base_options=BaseOptions(model_asset_path=HAND_MODEL),
-            running_mode=RunningMode.IMAGE,
+            running_mode=running_mode,
             num_hands=2,
             min_hand_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
         )
     )
 
-    face_landmarker = FaceLandmarker.create_from_options(
+
+def _create_face_landmarker(running_mode: RunningMode = RunningMode.IMAGE) -> FaceLandmarker:
+    return FaceLandmarker.create_from_options(
         FaceLandmarkerOptions(
             base_options=BaseOptions(model_asset_path=FACE_MODEL),
-            running_mode=RunningMode.IMAGE,
+            running_mode=running_mode,
             num_faces=1,
             min_face_detection_confidence=0.5,
             output_face_blendshapes=False,
@@ -105,185 +144,234 @@ def load_models():
         )
     )
 
+
+@app.on_event("startup")
+def load_models():
+    global scheduler, landmarker_pool
+
+    scheduler = InferenceScheduler(
+        {
+            "pose": _create_pose_landmarker,
+            "hands": _create_hand_landmarker,
+            "face": _create_face_landmarker,
+        },
+        num_workers=INFERENCE_WORKERS,
+        window_ms=BATCH_WINDOW_MS,
+        max_batch=MAX_BATCH_SIZE,
+    )
+    scheduler.warm_up()
+
+    landmarker_pool = LandmarkerPool(
+        {
+            "pose": partial(_create_pose_landmarker, RunningMode.VIDEO),
+            "hands": partial(_create_hand_landmarker, RunningMode.VIDEO),
+            "face": partial(_create_face_landmarker, RunningMode.VIDEO),
+        },
+        max_sets=MAX_SESSION_LANDMARKERS,
+    )
+
     import sys
     print(f"[coach] SKELETON_DATA_DIR={SKELETON_DATA_DIR} exists={SKELETON_DATA_DIR.exists()}", flush=True)
     print(f"[coach] COACH_MODELS_DIR={COACH_MODELS_DIR} exists={COACH_MODELS_DIR.exists()}", flush=True)
-    coach_model_paths = ensure_models_exist(SKELETON_DATA_DIR, COACH_MODELS_DIR)
-    print(f"[coach] Loaded models: {list(coach_model_paths.keys())}", flush=True)
+    coach_registry.register(ensure_models_exist(SKELETON_DATA_DIR, COACH_MODELS_DIR))
+    coach_registry.preload()
+    print(f"[coach] Loaded models: {coach_registry.keys()}", flush=True)
+    pain_service.load()
     sys.stdout.flush()
 
 
 @app.on_event("shutdown")
 def close_models():
-    if pose_landmarker:
-        pose_landmarker.close()
-    if hand_landmarker:
-        hand_landmarker.close()
-    if face_landmarker:
-        face_landmarker.close()
+    if scheduler:
+        scheduler.close()
+    if landmarker_pool:
+        landmarker_pool.close()
+    pain_service.close()
 
 
 @app.get("/health")
 def health():
     return {
         "status": "ok",
-        "models_loaded": all([pose_landmarker, hand_landmarker, face_landmarker]),
+        "models_loaded": scheduler is not None,
+        "scheduler": scheduler.stats() if scheduler else None,
+        "landmarker_pool": landmarker_pool.stats() if landmarker_pool else None,
+        "pain_service": pain_service.stats(),
     }
 
 
-def decode_frame(data: str) -> np.ndarray:
-    """Decode a base64-encoded JPEG into an RGB numpy array."""
-    if not data:
-        raise ValueError("Empty frame data")
-    raw = base64.b64decode(data)
-    arr = np.frombuffer(raw, dtype=np.uint8)
-    bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if bgr is None:
-        raise ValueError("Failed to decode JPEG frame")
-    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-
-
-def decode_frame_bytes(data: bytes) -> np.ndarray:
-    """Decode raw JPEG bytes into an RGB numpy array."""
-    if not data:
-        raise ValueError("Empty frame data")
-    arr = np.frombuffer(data, dtype=np.uint8)
-    bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if bgr is None:
-        raise ValueError("Failed to decode JPEG frame")
-    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-
-
-def extract_landmarks(result, landmark_attr: str = "pose_landmarks"):
-    """Convert MediaPipe landmark results to plain dicts."""
-    landmarks_list = getattr(result, landmark_attr, None)
-    if not landmarks_list:
-        return []
+# Smallest decoded short side each detector needs. The pose model's input is
+# 256x256 and the person fills most of the frame; hands and face are landmarked
+# from a sub-crop of the frame, so they keep more headroom.
+DETECTOR_MIN_SIDE = {"pose": 256, "hands": 360, "face": 360}
+
+
+def decode_min_side(detectors: set[str]) -> int:
+    return max((DETECTOR_MIN_SIDE.get(d, 0) for d in detectors), default=0)
+
+
+def decode_frame(data: str, min_side: int = 0, min_width: int = 0) -> FrameContext:
+    """Decode a base64-encoded JPEG into a per-frame image context.
+
+    Decodes at reduced resolution when the source is large enough to keep the
+    short side >= min_side and the width >= min_width.
+    """
+    return FrameContext.from_base64(data, min_side, min_width)
+
+
+def decode_frame_bytes(data: bytes, min_side: int = 0, min_width: int = 0) -> FrameContext:
+    """Decode raw JPEG bytes into a per-frame image context (see decode_frame)."""
+    return FrameContext.from_jpeg(data, min_side, min_width)
+
+
+_JSON_COLUMNS = ("x", "y", "z", "visibility")
+_HANDEDNESS_NAMES = {0.0: "Left", 1.0: "Right"}
+
+
+def landmark_dicts(groups: np.ndarray, labels: dict | None = None) -> list:
+    """Convert (groups, points, 3|4) landmark arrays to plain dicts for JSON."""
+    cols = _JSON_COLUMNS[: groups.shape[-1]]
     out = []
-    for group in landmarks_list:
-        out.append(
-            [
-                {
-                    "x": lm.x,
-                    "y": lm.y,
-                    "z": lm.z,
-                    **({"visibility": lm.visibility} if hasattr(lm, "visibility") and lm.visibility is not None else {}),
-                    **({"label": POSE_LABELS[i]} if landmark_attr == "pose_landmarks" and i in POSE_LABELS else {}),
-                }
-                for i, lm in enumerate(group)
-            ]
-        )
+    for group in groups.tolist():
+        points = [dict(zip(cols, row)) for row in group]
+        if labels:
+            for i, label in labels.items():
+                if i < len(points):
+                    points[i]["label"] = label
+        out.append(points)
     return out
 
 
-async def _process_frame(rgb: np.ndarray, detectors: set[str]) -> dict:
-    """Run selected landmark detectors in parallel and return results."""
-    loop = asyncio.get_event_loop()
+def _response_format(websocket: WebSocket) -> str:
+    """Parse ?format=json|binary; anything unrecognised falls back to JSON."""
+    fmt = websocket.query_params.get("format", "json").strip().lower()
+    return fmt if fmt in ("json", "binary") else "json"
+
+
+async def _detect(rgb: np.ndarray, detectors: set[str], lease: LandmarkerSet | None = None) -> dict:
+    """Queue a frame on the shared scheduler and return raw MediaPipe results."""
     mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+    return await scheduler.detect(mp_image, detectors, lease)
 
-    # Launch selected detectors in parallel threads
-    futures = {}
-    if "pose" in detectors:
-        futures["pose"] = loop.run_in_executor(_executor, pose_landmarker.detect, mp_image)
-    if "hands" in detectors:
-        futures["hands"] = loop.run_in_executor(_executor, hand_landmarker.detect, mp_image)
-    if "face" in detectors:
-        futures["face"] = loop.run_in_executor(_executor, face_landmarker.detect, mp_image)
-
-    results = {}
-    for key, fut in futures.items():
-        results[key] = await fut
-
-    # Build response
-    pose_result = results.get("pose")
-    hand_result = results.get("hands")
-    face_result = results.get("face")
-
-    handedness = []
-    if hand_result and hand_result.handedness:
-        for h in hand_result.handedness:
-            handedness.append(h[0].category_name if h else None)
 
+def _tracking_json(landmarks: LandmarkBuffers) -> dict:
+    """Build the JSON tracking payload from this frame's landmark arrays."""
     return {
-        "pose": extract_landmarks(pose_result, "pose_landmarks") if pose_result else [],
-        "hands": extract_landmarks(hand_result, "hand_landmarks") if hand_result else [],
-        "handedness": handedness,
-        "face": extract_landmarks(face_result, "face_landmarks") if face_result else [],
+        "pose": landmark_dicts(landmarks.pose, POSE_LABELS),
+        "hands": landmark_dicts(landmarks.hands),
+        "handedness": [_HANDEDNESS_NAMES.get(code) for code in landmarks.handedness.tolist()],
+        "face": landmark_dicts(landmarks.face),
     }
 
 
+async def _send_tracking(websocket: WebSocket, fmt: str, landmarks: LandmarkBuffers, extra: dict | None = None):
+    """Send this frame's landmarks (plus any extra fields) in the session's wire format."""
+    if fmt == "binary":
+        await websocket.send_bytes(landmarks.pack(extra))
+    else:
+        await websocket.send_json({**_tracking_json(landmarks), **(extra or {})})
+
+
 @app.websocket("/ws/track")
 async def ws_track(websocket: WebSocket):
     # Parse detector selection from query params: ?detect=pose,hands,face
     detect_param = websocket.query_params.get("detect", "pose,hands,face")
     detectors = {d.strip() for d in detect_param.split(",")}
+    fmt = _response_format(websocket)
+    min_side = decode_min_side(detectors)
 
     await websocket.accept()
+    lease = landmarker_pool.acquire()
+    landmarks = LandmarkBuffers()
+    reader = LatestFrameReader(websocket)
+    reader.start()
     try:
         while True:
-            msg = await websocket.receive()
-
-            if msg.get("type") == "websocket.disconnect":
+            # Newest pending frame; older ones are dropped if we fell behind
+            msg = await reader.next()
+            if msg is None:
                 break
 
             try:
                 if "bytes" in msg and msg["bytes"]:
-                    rgb = decode_frame_bytes(msg["bytes"])
+                    frame = decode_frame_bytes(msg["bytes"], min_side)
                 else:
-                    rgb = decode_frame(msg.get("text", ""))
+                    frame = decode_frame(msg.get("text", ""), min_side)
             except (ValueError, Exception) as e:
                 await websocket.send_json({"error": str(e)})
                 continue
 
-            response = await _process_frame(rgb, detectors)
-            await websocket.send_json(response)
+            results = await _detect(frame.rgb, detectors, lease)
+            landmarks.fill(results.get("pose"), results.get("hands"), results.get("face"))
+            await _send_tracking(websocket, fmt, landmarks, {"frames": reader.counters()})
     except WebSocketDisconnect:
         pass
+    finally:
+        await reader.stop()
+        landmarker_pool.release(lease)
 
 
 @app.websocket("/ws/exercise")
 async def ws_exercise(websocket: WebSocket):
     """
     Exercise-aware WebSocket endpoint with rep counting and pain detection.
-    Query params: ?exercise=arm_abduction&detect=pose,face
+    Query params: ?exercise=arm_abduction&detect=pose,face&format=json|binary
     """
     exercise_key = websocket.query_params.get("exercise", "arm_abduction")
     detect_param = websocket.query_params.get("detect", "pose,face")
     detectors = {d.strip() for d in detect_param.split(",")}
     # Always need pose for rep counting
     detectors.add("pose")
+    fmt = _response_format(websocket)
+    min_side = decode_min_side(detectors)
 
     rep_counter = RepCounter(exercise_key)
-    pain_detector = MLPainDetector()
+    # Pain inference runs off the event loop on the shared service; state is per session
+    pain_worker = pain_service.open_session()
     six_seven_detector = SixSevenDetector()
 
     coach_engine: CoachV2Engine | None = None
-    if exercise_key in coach_model_paths:
-        coach_engine = CoachV2Engine(coach_model_paths[exercise_key])
+    if exercise_key in coach_registry:
+        coach_engine = coach_registry.session(exercise_key)
 
     await websocket.accept()
+    lease = landmarker_pool.acquire()
+    landmarks = LandmarkBuffers()
+    reader = LatestFrameReader(websocket)
+    reader.start()
     try:
         while True:
-            msg = await websocket.receive()
-
-            # Handle disconnect messages
-            if msg.get("type") == "websocket.disconnect":
+            # Newest pending frame; older ones are dropped if we fell behind
+            msg = await reader.next()
+            if msg is None:
                 break
 
+            # Full alignment resolution only on frames the pain worker will consume
+            pain_wants_frame = pain_worker.wants_frame()
+            min_width = ALIGN_WIDTH if pain_wants_frame and pain_worker.detector.needs_pixels() else 0
             try:
                 if "bytes" in msg and msg["bytes"]:
-                    rgb = decode_frame_bytes(msg["bytes"])
+                    frame = decode_frame_bytes(msg["bytes"], min_side, min_width)
                 else:
-                    rgb = decode_frame(msg.get("text", ""))
+                    frame = decode_frame(msg.get("text", ""), min_side, min_width)
             except (ValueError, Exception) as e:
                 await websocket.send_json({"error": str(e)})
                 continue
 
-            h, w = rgb.shape[:2]
-            bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+            h, w = frame.height, frame.width
 
             # Run landmark detection
-            tracking = await _process_frame(rgb, detectors)
+            results = await _detect(frame.rgb, detectors, lease)
+            face_result = results.get("face")
+            # One pass over the result objects; everything below reads views of
+            # the session's buffers (overwritten by the next frame)
+            landmarks.fill(results.get("pose"), results.get("hands"), face_result)
+            # pose_lms: (33, 4) or None when no pose was found
+            pose_lms = landmarks.pose[0] if len(landmarks.pose) else None
+            # face_lms: (478, 3); None when face detection wasn't requested, empty when no face was found
+            face_lms = None
+            if face_result is not None:
+                face_lms = landmarks.face[0] if len(landmarks.face) else landmarks.face.reshape(0, 3)
 
             # Rep counting from pose landmarks
             exercise_status = {
@@ -293,55 +381,37 @@ async def ws_exercise(websocket: WebSocket):
                 "form_quality": "neutral",
                 "name": rep_counter.config.name,
             }
-            if tracking["pose"] and len(tracking["pose"]) > 0:
-                # Convert dicts back to objects for RepCounter
-                pose_lms = tracking["pose"][0]
-
-                class LM:
-                    def __init__(self, d):
-                        self.x = d["x"]
-                        self.y = d["y"]
-                        self.z = d.get("z", 0)
-                        self.visibility = d.get("visibility", 1.0)
-
-                lm_objects = [LM(d) for d in pose_lms]
-                exercise_status = rep_counter.update(lm_objects, w, h)
+            if pose_lms is not None:
+                exercise_status = rep_counter.update(pose_lms, w, h)
 
-            # Pain detection (ML-based with heuristic fallback)
-            flm_objects = None
-            if "face" in detectors and tracking["face"] and len(tracking["face"]) > 0:
-                face_lms = tracking["face"][0]
-
-                class FLM:
-                    def __init__(self, d):
-                        self.x = d["x"]
-                        self.y = d["y"]
-                        self.z = d.get("z", 0)
-
-                flm_objects = [FLM(d) for d in face_lms]
-
-            pain_status = pain_detector.update(bgr, flm_objects, w, h)
+            # Pain detection (ML-based with heuristic fallback). Reuses this frame's
+            # face landmarks and cached images, so the face graph runs once per frame.
+            # The response carries the latest completed result and its age.
+            if pain_wants_frame:
+                # The worker reads the face after the buffers move on to the next frame
+                pain_worker.submit(frame, None if face_lms is None else face_lms.copy(), w, h)
+            pain_status = pain_worker.latest()
 
             # 6-7 Easter egg detection from pose wrist landmarks
             six_seven_status = {"triggered": False}
-            if tracking["pose"] and len(tracking["pose"]) > 0:
-                six_seven_status = six_seven_detector.update(lm_objects, w, h)
+            if pose_lms is not None:
+                six_seven_status = six_seven_detector.update(pose_lms, w, h)
 
             # Coaching engine inference
             coaching_data = None
-            if coach_engine and tracking["pose"] and len(tracking["pose"]) > 0:
-                pose_landmarks_np = landmarks_list_to_np(tracking["pose"][0])
-                coaching_data = coach_engine.infer(pose_landmarks_np, time.time())
+            if coach_engine and pose_lms is not None:
+                coaching_data = coach_engine.infer(pose_lms, time.time())
 
-            response = {
-                **tracking,
+            await _send_tracking(websocket, fmt, landmarks, {
                 "exercise": exercise_status,
                 "pain": pain_status,
                 "six_seven": six_seven_status,
                 "coaching": coaching_data,
-            }
-            await websocket.send_json(response)
+                "frames": reader.counters(),
+            })
     except WebSocketDisconnect:
         pass
     finally:
-        pain_detector.close()
+        await reader.stop()
+        landmarker_pool.release(lease)
+        pain_service.release(pain_worker)
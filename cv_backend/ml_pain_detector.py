@@ -10,6 +10,7 @@ or checkpoint files are missing.
 import collections
 import logging
 import os
+import threading
 import time
 
 import cv2
@@ -32,6 +33,7 @@ from mediapipe.tasks.python.vision import (
     RunningMode,
 )
 
+from frame_context import FrameContext
 from rep_counter import HeuristicPainDetector
 
 logger = logging.getLogger(__name__)
@@ -71,7 +73,11 @@ MP_TO_68 = [
 ]
 # fmt: on
 
-PROCESS_EVERY = 3  # Run inference every Nth frame
+PROCESS_EVERY = 3  # Run inference at least every Nth frame while anything changes
+ALIGN_WIDTH = 640  # Frames are resized to this width before face alignment
+ALIGN_PAD = 0.1  # Margin around the landmarks cropped for alignment (fraction of face size)
+TRACK_PAD = 0.5  # Margin around the last face searched by FaceProcessor.track_68
+TRACK_EDGE = 0.05  # Landmarks this close to the search box edge (fraction) = face leaving it
 NUM_CALIBRATION_FRAMES = 3
 STAGNANT_THRESHOLD = 0.25
 STAGNANT_DURATION = 10.0  # seconds before auto-recalibrate
@@ -81,6 +87,14 @@ PSPI_WARNING = 1.0
 PSPI_STOP = 3.0
 PERSISTENCE_FRAMES = 2  # consecutive frames needed to trigger level change
 
+# Adaptive inference cadence (see InferenceCadence)
+CADENCE_MAX_EVERY = 8  # floor rate: at least one inference every N updates when stable
+CADENCE_MOTION = 0.03  # mean landmark shift since the last inference (fraction of face size)
+CADENCE_EAR_DELTA = 0.03
+CADENCE_MAR_DELTA = 0.05
+CADENCE_PSPI_RISE = 0.15  # smoothed PSPI rise between consecutive inferences
+CADENCE_PSPI_WATCH = 0.5 * PSPI_WARNING  # stay at the full rate while PSPI is this high
+
 
 # ---------------------------------------------------------------------------
 # CNN Model (inlined from EXPERIMENT_pain_detection/models/comparative_model.py)
@@ -117,9 +131,24 @@ if TORCH_AVAILABLE:
             self.fc2 = nn.Linear(fc2_size, num_outputs)
 
         def forward(self, x, return_features=False):
-            out = self.layer1(x[:, 0:1, ...])
-            out_ref = self.layer1(x[:, 1:, ...])
-            out = out - out_ref
+            return self.forward_refs(x[:, 0:1, ...], x[:, 1:, ...], return_features)
+
+        def forward_refs(self, target, refs, return_features=False):
+            """Score one target (1, 1, H, W) against a batch of references (R, 1, H, W).
+
+            The target's layer1 activations are computed once and broadcast
+            against every reference, so R comparisons cost one batched pass
+            instead of R forward() calls on stacked [target, ref] pairs.
+            """
+            return self.head(self.embed(target), self.embed(refs), return_features)
+
+        def embed(self, x):
+            """Per-image tower (layer1), shared by target and reference frames."""
+            return self.layer1(x)
+
+        def head(self, target_emb, ref_embs, return_features=False):
+            """Fuse a target embedding (1, ...) with R reference embeddings -> (R, num_outputs)."""
+            out = target_emb - ref_embs
             out = nn.functional.max_pool2d(out, kernel_size=2, stride=2)
             out = self.dout1(out)
             out = self.layer2(out)
@@ -133,48 +162,134 @@ if TORCH_AVAILABLE:
 
 
 # ---------------------------------------------------------------------------
-# FaceProcessor — MediaPipe Tasks API (VIDEO mode, separate from main.py)
+# FaceProcessor — MediaPipe Tasks API (VIDEO + IMAGE mode, separate from main.py)
 # ---------------------------------------------------------------------------
 
 
+def landmarks_to_68(face_landmarks, width, height):
+    """Map MediaPipe's 478 normalized face landmarks to a (68, 2) pixel array.
+
+    Accepts a (478, 3|4) landmark array or the landmark objects themselves.
+    """
+    if isinstance(face_landmarks, np.ndarray):
+        return (face_landmarks[MP_TO_68, :2] * np.float32([width, height])).astype(np.float32)
+    return np.array(
+        [(face_landmarks[i].x * width, face_landmarks[i].y * height) for i in MP_TO_68],
+        dtype=np.float32,
+    )
+
+
+def face_window(points: np.ndarray, width: int, height: int, pad: float) -> tuple[int, int, int, int]:
+    """Integer (x0, y0, x1, y1) box around pixel `points`, grown by `pad` x face size, clipped to the frame."""
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    m = pad * float((hi - lo).max())
+    return (
+        max(0, int(np.floor(lo[0] - m))),
+        max(0, int(np.floor(lo[1] - m))),
+        min(width, int(np.ceil(hi[0] + m))),
+        min(height, int(np.ceil(hi[1] + m))),
+    )
+
+
 class FaceProcessor:
     """Detect face + 478 landmarks via MediaPipe, return 68-pt subset."""
 
     def __init__(self, model_path: str):
+        # Full frames form one video stream, so they go to a VIDEO-mode
+        # landmarker that tracks the face between calls. Crops around the
+        # last face move and change size from call to call, so each one is
+        # searched independently by an IMAGE-mode landmarker.
+        self.landmarker = self._create(model_path, RunningMode.VIDEO)
+        self.roi_landmarker = self._create(model_path, RunningMode.IMAGE)
+        self._ts = 0
+        # Source-pixel box around the last face found by track_68
+        self._roi: tuple[int, int, int, int] | None = None
+        self.roi_hits = 0
+        self.full_searches = 0
+
+    @staticmethod
+    def _create(model_path: str, running_mode) -> FaceLandmarker:
         options = FaceLandmarkerOptions(
             base_options=BaseOptions(model_asset_path=model_path),
-            running_mode=RunningMode.VIDEO,
+            running_mode=running_mode,
             num_faces=1,
             min_face_detection_confidence=0.3,
             min_face_presence_confidence=0.3,
             min_tracking_confidence=0.3,
         )
-        self.landmarker = FaceLandmarker.create_from_options(options)
-        self._ts = 0
+        return FaceLandmarker.create_from_options(options)
 
-    def get_68(self, bgr_frame, target_size=None):
-        """Returns (68, 2) float32 pixel-coords array or None."""
-        rgb = cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-        self._ts += 33  # fake increasing timestamp (ms)
-        result = self.landmarker.detect_for_video(mp_image, self._ts)
+    @staticmethod
+    def _landmarks(result):
+        """(68, 2) landmarks normalized to the searched image's size, or None."""
         if not result.face_landmarks:
             return None
-        face = result.face_landmarks[0]
-        h, w = bgr_frame.shape[:2]
-        if target_size is not None:
-            tw, th = target_size
-            all_lmks = np.array(
-                [(lm.x * tw, lm.y * th) for lm in face], dtype=np.float32
-            )
-        else:
-            all_lmks = np.array(
-                [(lm.x * w, lm.y * h) for lm in face], dtype=np.float32
-            )
-        return all_lmks[MP_TO_68]
+        return landmarks_to_68(result.face_landmarks[0], 1, 1)
+
+    def _detect(self, rgb):
+        """Landmarks of a full frame, tracked through the VIDEO-mode landmarker."""
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+        self._ts += 33  # fake increasing timestamp (ms)
+        return self._landmarks(self.landmarker.detect_for_video(mp_image, self._ts))
+
+    def _detect_roi(self, rgb):
+        """Landmarks of a crop around the last face, searched on their own."""
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+        return self._landmarks(self.roi_landmarker.detect(mp_image))
+
+    def get_68(self, rgb_frame, target_size=None):
+        """Returns (68, 2) float32 pixel-coords array or None."""
+        pts = self._detect(rgb_frame)
+        if pts is None:
+            return None
+        h, w = rgb_frame.shape[:2]
+        tw, th = target_size if target_size is not None else (w, h)
+        return pts * np.float32([tw, th])
+
+    def track_68(self, frame, target_size=None):
+        """get_68 for a FrameContext, searching only a padded box around the last face.
+
+        Between predictions the face barely moves, so only that box is
+        converted and landmarked. Falls back to a full-frame search when the
+        face is not found in the box or runs into one of its inner edges.
+        """
+        w, h = frame.width, frame.height
+        pts = None
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            crop = self._detect_roi(cv2.cvtColor(frame.bgr[y0:y1, x0:x1], cv2.COLOR_BGR2RGB))
+            if crop is not None and not self._leaving(crop, w, h):
+                pts = crop * np.float32([x1 - x0, y1 - y0]) + np.float32([x0, y0])
+                self.roi_hits += 1
+        if pts is None:
+            self.full_searches += 1
+            pts = self._detect(frame.rgb)
+            if pts is None:
+                self._roi = None
+                return None
+            pts = pts * np.float32([w, h])
+        self._roi = face_window(pts, w, h, TRACK_PAD)
+        tw, th = target_size if target_size is not None else (w, h)
+        return pts * np.float32([tw / w, th / h])
+
+    def _leaving(self, pts, width: int, height: int) -> bool:
+        """Whether box-normalized landmarks touch an edge of the box that is not the frame border."""
+        x0, y0, x1, y1 = self._roi
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        return bool(
+            (lo[0] < TRACK_EDGE and x0 > 0)
+            or (lo[1] < TRACK_EDGE and y0 > 0)
+            or (hi[0] > 1 - TRACK_EDGE and x1 < width)
+            or (hi[1] > 1 - TRACK_EDGE and y1 < height)
+        )
+
+    def reset_tracking(self):
+        """Forget the last face box; the next track_68 searches the full frame."""
+        self._roi = None
 
     def close(self):
         self.landmarker.close()
+        self.roi_landmarker.close()
 
 
 # ---------------------------------------------------------------------------
@@ -197,7 +312,7 @@ def similarity_transform(image, landmarks, scale_to):
 
 
 def piecewise_affine(image, source_lmks, target_lmks):
-    anchor = list(range(31)) + [36, 39, 42, 45, 48, 51, 54, 57]
+    anchor = ALIGN_ANCHORS
     tform = PiecewiseAffineTransform()
     tform.estimate(target_lmks[anchor, :], source_lmks[anchor, :])
     return warp(image, tform, output_shape=image.shape[:2]).astype(np.float32)
@@ -224,22 +339,121 @@ def crop_face(frame, bbox):
     return sq
 
 
+# Landmarks the piecewise warp is anchored on (jaw, nose, eye corners, mouth)
+ALIGN_ANCHORS = list(range(31)) + [36, 39, 42, 45, 48, 51, 54, 57]
+
+
+class FaceAligner:
+    """Fast equivalent of similarity_transform -> piecewise_affine -> crop_face -> resize.
+
+    The target template is fixed, so everything on the output side is
+    computed once: the Delaunay triangulation of the anchor landmarks, each
+    triangle's bounding box and pixel mask in the final (image_size,
+    image_size) crop, with crop, square padding and resize folded into the
+    triangle coordinates. The similarity step is affine, so it composes
+    into each triangle's affine map and is not applied separately.
+
+    Per frame this only solves one 3-point affine per triangle and warps
+    that triangle's small box straight out of the grayscale uint8 frame:
+    no full-frame float warps and no per-pixel triangle lookups. Pixels
+    outside the anchor hull are black, as with skimage's warp.
+    """
+
+    def __init__(self, mean_lmks: np.ndarray, scale_to: int, image_size: int):
+        target = np.asarray(mean_lmks, dtype=np.float64) * scale_to / 320
+        li = target.round().astype(np.int32)
+        bl, bt = li[:, 0].min(), li[:, 1].min()
+        w, h = li[:, 0].max() - bl, li[:, 1].max() - bt
+        m = max(w, h)
+        # Template coords -> output pixel coords (cv2.resize pixel-centre convention)
+        origin = np.array([bl - (m - w) // 2, bt - (m - h) // 2], dtype=np.float64)
+        s = image_size / m
+        dst = ((target[ALIGN_ANCHORS] - origin + 0.5) * s - 0.5).astype(np.float32)
+
+        self.image_size = image_size
+        self.triangles = self._delaunay(dst)
+
+        # Rasterize triangle ids so every output pixel belongs to at most one triangle
+        labels = np.zeros((image_size, image_size), dtype=np.int32)
+        shift = 4
+        for k, tri in enumerate(self.triangles):
+            pts = np.round(dst[tri] * (1 << shift)).astype(np.int32)
+            cv2.fillConvexPoly(labels, pts, k + 1, lineType=cv2.LINE_8, shift=shift)
+
+        self._patches = []
+        for k, tri in enumerate(self.triangles):
+            ys, xs = np.nonzero(labels == k + 1)
+            if ys.size == 0:
+                continue
+            x0, y0 = int(xs.min()), int(ys.min())
+            x1, y1 = int(xs.max()) + 1, int(ys.max()) + 1
+            mask = labels[y0:y1, x0:x1] == k + 1
+            self._patches.append((tri, x0, y0, x1, y1, mask, dst[tri] - np.float32([x0, y0])))
+
+    @staticmethod
+    def _delaunay(points: np.ndarray) -> np.ndarray:
+        """(T, 3) indices into `points` of their Delaunay triangles."""
+        lo = points.min(axis=0) - 1
+        hi = points.max(axis=0) + 1
+        subdiv = cv2.Subdiv2D((int(np.floor(lo[0])), int(np.floor(lo[1])),
+                               int(np.ceil(hi[0] - lo[0])) + 1, int(np.ceil(hi[1] - lo[1])) + 1))
+        subdiv.insert([(float(x), float(y)) for x, y in points])
+        tris = []
+        for t in subdiv.getTriangleList().reshape(-1, 3, 2):
+            d = np.linalg.norm(points[None, :, :] - t[:, None, :], axis=2)
+            idx = d.argmin(axis=1)
+            # Drop triangles touching Subdiv2D's virtual outer vertices
+            if np.all(d[np.arange(3), idx] < 1e-3):
+                tris.append(idx)
+        return np.array(tris, dtype=np.intp)
+
+    def align(self, gray: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
+        """Warp a uint8 grayscale frame to the (image_size, image_size) model crop.
+
+        `landmarks` are the frame's (68, 2) pixel coordinates.
+        """
+        src = np.asarray(landmarks, dtype=np.float32)[ALIGN_ANCHORS]
+        out = np.zeros((self.image_size, self.image_size), dtype=np.uint8)
+        for tri, x0, y0, x1, y1, mask, dst_tri in self._patches:
+            # Affine from this triangle's output box back into the frame
+            mat = cv2.getAffineTransform(dst_tri, src[tri])
+            patch = cv2.warpAffine(
+                gray, mat, (x1 - x0, y1 - y0),
+                flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                borderMode=cv2.BORDER_CONSTANT,
+            )
+            out[y0:y1, x0:x1][mask] = patch[mask]
+        return out
+
+
 # ---------------------------------------------------------------------------
 # MLPainEngine — core preprocessing + inference (adapted from LivePainDetector)
 # ---------------------------------------------------------------------------
 
 
-class MLPainEngine:
-    def __init__(
-        self,
-        checkpoint_path: str,
-        num_outputs: int,
-        image_size: int = 160,
-        smooth_window: int = 7,
-    ):
+def load_checkpoint(checkpoint_path: str, num_outputs: int, device: str = "cpu"):
+    """Eager ConvNetOrdinalLateFusion in eval mode from a state-dict checkpoint."""
+    net = ConvNetOrdinalLateFusion(num_outputs=num_outputs)
+    net.load_state_dict(torch.load(checkpoint_path, map_location=device, weights_only=True))
+    net.to(device)
+    net.eval()
+    return net
+
+
+class PainModel:
+    """Pain CNN and face template, loaded once and shared by every session.
+
+    Holds only immutable data (the eval-mode network, the 68-pt template and
+    the per-resolution FaceAligners), so any number of MLPainEngines, on any
+    number of threads, can run on one instance. Per-session state (calibration
+    references, smoothing) lives on the engine.
+    """
+
+    def __init__(self, checkpoint_path: str, num_outputs: int, image_size: int = 160, net=None):
+        # net: an already loaded network (e.g. pain_export's TorchScript module)
+        # exposing embed() and head(); None loads the eager checkpoint
         self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
         self.image_size = image_size
-        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
 
         # Standard 68-pt face template
         self.mean_lmks = np.load(
@@ -247,30 +461,141 @@ class MLPainEngine:
         ).astype(np.float32)
         self.mean_lmks = self.mean_lmks * 155 / self.mean_lmks.max()
         self.mean_lmks[:, 1] += 15
-
-        # MediaPipe face processor (VIDEO mode, separate instance)
-        self.face = FaceProcessor(_FACE_MODEL)
+        self._aligners: dict[int, FaceAligner] = {}
+        self._lock = threading.Lock()
+        # CLAHE objects keep scratch buffers; one per thread
+        self._local = threading.local()
 
         # Load CNN model
-        self.model = ConvNetOrdinalLateFusion(num_outputs=num_outputs)
-        self.model.load_state_dict(
-            torch.load(checkpoint_path, map_location=self.device, weights_only=True)
-        )
-        self.model.to(self.device)
-        self.model.eval()
+        self.net = net if net is not None else load_checkpoint(checkpoint_path, num_outputs, self.device)
+        # File the network was loaded from (set by pain_export for exported graphs)
+        self.artifact = os.path.basename(checkpoint_path) if net is None else None
+
+    @property
+    def clahe(self):
+        clahe = getattr(self._local, "clahe", None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe
+
+    def aligner(self, scale_to: int) -> FaceAligner:
+        aligner = self._aligners.get(scale_to)
+        if aligner is None:
+            with self._lock:
+                aligner = self._aligners.get(scale_to)
+                if aligner is None:
+                    aligner = FaceAligner(self.mean_lmks, scale_to, self.image_size)
+                    self._aligners[scale_to] = aligner
+        return aligner
+
+
+class MLPainEngine:
+    """One session's pain inference state on top of a shared PainModel.
+
+    Pass a PainModel (see pain_service) to skip loading the checkpoint;
+    a checkpoint path loads a private copy.
+    """
+
+    def __init__(
+        self,
+        model: "PainModel | str",
+        num_outputs: int | None = None,
+        image_size: int = 160,
+        smooth_window: int = 7,
+        fast_align: bool = True,
+    ):
+        if not isinstance(model, PainModel):
+            model = PainModel(model, num_outputs, image_size)
+        self.pain_model = model
+        self.model = model.net
+        self.device = model.device
+        self.image_size = model.image_size
+        self.mean_lmks = model.mean_lmks
+        # fast_align: FaceAligner (per-triangle cv2 warps, uint8); False keeps the
+        # original skimage path
+        self.fast_align = fast_align
+
+        # MediaPipe face processor (VIDEO mode, separate instance). Only created
+        # when a caller has no face landmarks of its own to pass in.
+        self._face: FaceProcessor | None = None
 
         self.ref_tensors: list = []
+        # Tower outputs of all references stacked into one (R, ...) batch,
+        # computed once in add_reference since they never change between predicts
+        self.ref_embeddings = None
         self.score_buf: collections.deque = collections.deque(maxlen=smooth_window)
 
-    def _prep(self, bgr, scale_to=640):
-        """Full pipeline: detect -> align -> crop -> grayscale -> CLAHE -> tensor."""
-        h, w = bgr.shape[:2]
-        new_h = int(h * scale_to / w)
-        resized = cv2.resize(bgr, (scale_to, new_h), interpolation=cv2.INTER_AREA)
-        lmks = self.face.get_68(bgr, target_size=(scale_to, new_h))
+    @property
+    def face(self) -> FaceProcessor:
+        if self._face is None:
+            self._face = FaceProcessor(_FACE_MODEL)
+        return self._face
+
+    @property
+    def clahe(self):
+        return self.pain_model.clahe
+
+    def _prep(self, frame, face_landmarks=None, scale_to=ALIGN_WIDTH):
+        """Full pipeline: detect -> align -> crop -> grayscale -> CLAHE -> tensor.
+
+        `frame` is a FrameContext (or a BGR array). `face_landmarks` are the
+        frame's 478 MediaPipe face landmarks (array or objects) if the caller
+        already ran face detection (empty when no face was found); with None the
+        engine runs its own face landmarker.
+        """
+        if isinstance(frame, np.ndarray):
+            frame = FrameContext(frame)
+        new_h = int(frame.height * scale_to / frame.width)
+        if face_landmarks is not None:
+            if len(face_landmarks) == 0:
+                return None
+            lmks = landmarks_to_68(face_landmarks, scale_to, new_h)
+        else:
+            lmks = self.face.track_68(frame, target_size=(scale_to, new_h))
         if lmks is None:
             return None
 
+        if self.fast_align:
+            roi = self._face_gray(frame, lmks, scale_to)
+            if roi is None:
+                return None
+            img_a = self._aligner(scale_to).align(*roi)
+        else:
+            img_a = self._align_skimage(frame.resized(scale_to), lmks, scale_to)
+        img_a = self.clahe.apply(img_a)
+        t = (
+            img_a.reshape(1, 1, self.image_size, self.image_size).astype(np.float32)
+            / 255.0
+        )
+        return torch.from_numpy(t).to(self.device)
+
+    @staticmethod
+    def _face_gray(frame, lmks, scale_to):
+        """Grayscale face box at alignment scale plus `lmks` moved into it, or None.
+
+        Only a padded box around the landmarks is resized and converted
+        (what the full-frame resize would give there, up to the INTER_AREA
+        phase at the box corner), so the pixel work follows the face size
+        rather than the camera resolution.
+        """
+        s = scale_to / frame.width
+        src = (lmks.astype(np.float64) + 0.5) / s - 0.5  # alignment scale -> source pixels
+        x0, y0, x1, y1 = face_window(src, frame.width, frame.height, ALIGN_PAD)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        crop = frame.bgr[y0:y1, x0:x1]
+        if s != 1:
+            size = (max(1, round((x1 - x0) * s)), max(1, round((y1 - y0) * s)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        box_scale = np.array([crop.shape[1] / (x1 - x0), crop.shape[0] / (y1 - y0)])
+        lmks_box = (src - np.array([x0, y0]) + 0.5) * box_scale - 0.5
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), lmks_box.astype(np.float32)
+
+    def _aligner(self, scale_to: int) -> FaceAligner:
+        return self.pain_model.aligner(scale_to)
+
+    def _align_skimage(self, resized, lmks, scale_to):
+        """Reference alignment path (float32 full-frame skimage warps) -> uint8 gray crop."""
         mean_lmks = self.mean_lmks * scale_to / 320
         img_f = resized.astype(np.float32) / 255.0
 
@@ -282,50 +607,161 @@ class MLPainEngine:
         img_a = cv2.resize(img_a, (self.image_size, self.image_size))
         if img_a.ndim == 3 and img_a.shape[2] == 3:
             img_a = np.matmul(img_a, np.array([[0.114], [0.587], [0.299]]))
-        img_a = self.clahe.apply((img_a * 255).astype(np.uint8))
-        t = (
-            img_a.reshape(1, 1, self.image_size, self.image_size).astype(np.float32)
-            / 255.0
-        )
-        return torch.from_numpy(t).to(self.device)
+        return (img_a * 255).astype(np.uint8)
 
-    def add_reference(self, bgr) -> bool:
-        t = self._prep(bgr)
+    def add_reference(self, frame, face_landmarks=None) -> bool:
+        t = self._prep(frame, face_landmarks)
         if t is None:
             return False
         self.ref_tensors.append(t)
+        emb = self.embed(t)
+        self.ref_embeddings = (
+            emb if self.ref_embeddings is None else torch.cat([self.ref_embeddings, emb], dim=0)
+        )
         return True
 
     def clear_references(self):
+        """Drop the references and their cached embeddings (recalibration)."""
         self.ref_tensors.clear()
+        self.ref_embeddings = None
         self.score_buf.clear()
-
-    def predict(self, bgr):
+        if self._face is not None:
+            self._face.reset_tracking()
+
+    def embed(self, t):
+        """Tower activations of a prepped (N, 1, H, W) face tensor."""
+        with torch.inference_mode():
+            return self.model.embed(t)
+
+    def head(self, target_emb, ref_embs=None):
+        """PSPI outputs (R, num_outputs) of a target embedding vs the cached references."""
+        if ref_embs is None:
+            ref_embs = self.ref_embeddings
+        with torch.inference_mode():
+            return self.model.head(target_emb, ref_embs).cpu().numpy()
+
+    def predict(self, frame, face_landmarks=None):
         """Returns (smoothed_pspi, raw_pspi) or (None, None)."""
-        if not self.ref_tensors:
+        if self.ref_embeddings is None:
             return None, None
-        target = self._prep(bgr)
+        target = self._prep(frame, face_landmarks)
         if target is None:
             return None, None
 
-        scores = []
-        with torch.no_grad():
-            for ref in self.ref_tensors:
-                out = (
-                    self.model(torch.cat([target, ref], dim=1))
-                    .detach()
-                    .cpu()
-                    .numpy()
-                )
-                pspi = np.clip(out[0, -3:], 0, None)
-                scores.append(pspi)
-        raw = float(np.array(scores).mean())
+        # Tower on the live frame only; one batched head pass over every reference
+        out = self.head(self.embed(target))
+        raw = float(np.clip(out[:, -3:], 0, None).mean())
         self.score_buf.append(raw)
         smoothed = float(np.median(list(self.score_buf)))
         return smoothed, raw
 
     def close(self):
-        self.face.close()
+        if self._face is not None:
+            self._face.close()
+
+
+# ---------------------------------------------------------------------------
+# InferenceCadence — which updates run the CNN
+# ---------------------------------------------------------------------------
+
+
+class InferenceCadence:
+    """
+    Adaptive CNN cadence for the ACTIVE state.
+
+    Every update brings cheap signals: the face landmarks and the heuristic
+    EAR/MAR. When any of them moved since the last inference (or the face
+    reappeared) the CNN runs on that same update and the interval drops to
+    min_every. A change seen on a reduced-resolution update is held over
+    instead: due() then asks for full pixels, and the next update runs.
+    Each inference that finds the face stable and the PSPI flat and low
+    doubles the interval, up to max_every (the floor rate). A rising or
+    elevated PSPI keeps the full rate.
+    """
+
+    def __init__(self, min_every: int = 1, max_every: int = CADENCE_MAX_EVERY):
+        self.min_every = max(1, int(min_every))
+        self.max_every = max(self.min_every, int(max_every))
+        self.every = self.min_every
+        self.reason: str | None = None  # what triggered the latest inference
+        self._since = 0  # updates since the last inference
+        self._held: str | None = None  # change seen on a reduced frame, run on the next update
+        self._ref: tuple | None = None  # (lmks68, face size, ear, mar) at the last inference
+        self._last_pspi: float | None = None
+        self._times: collections.deque = collections.deque(maxlen=8)
+
+    def due(self) -> bool:
+        """Whether the next update runs the CNN even if nothing changes."""
+        return self._held is not None or self._since + 1 >= self.every
+
+    def should_run(self, lmks68, ear: float, mar: float, full_res: bool = True) -> bool:
+        """Called once per ACTIVE update; True if this update should run the CNN.
+
+        `lmks68` are the frame's (68, 2) pixel landmarks, or None when the
+        caller has none (the engine then finds the face itself). With
+        full_res=False a change is held over to the next update rather than
+        run on this frame's reduced pixels.
+        """
+        self._since += 1
+        self.reason = self._change(lmks68, ear, mar) or self._held
+        if self.reason is not None:
+            self.every = self.min_every
+            if not full_res and self._held is None:
+                self._held = self.reason
+                return False
+        elif self._since < self.every:
+            return False
+        self._held = None
+        self._since = 0
+        self._times.append(time.monotonic())
+        if lmks68 is not None:
+            size = float((lmks68.max(axis=0) - lmks68.min(axis=0)).max())
+            self._ref = (lmks68, max(size, 1e-6), ear, mar)
+        return True
+
+    def _change(self, lmks68, ear: float, mar: float) -> str | None:
+        if lmks68 is None:
+            return None
+        if self._ref is None:
+            return "face"
+        ref, size, ref_ear, ref_mar = self._ref
+        if np.linalg.norm(lmks68 - ref, axis=1).mean() / size > CADENCE_MOTION:
+            return "motion"
+        if abs(ear - ref_ear) > CADENCE_EAR_DELTA:
+            return "ear"
+        if abs(mar - ref_mar) > CADENCE_MAR_DELTA:
+            return "mar"
+        return None
+
+    def face_lost(self) -> None:
+        """No face this update: the next face seen counts as a change."""
+        self._ref = None
+        self._held = None
+
+    def observe(self, pspi: float) -> None:
+        """Feed the smoothed PSPI of an inference; backs off when all is stable."""
+        rising = self._last_pspi is not None and pspi - self._last_pspi > CADENCE_PSPI_RISE
+        self._last_pspi = pspi
+        if rising or pspi >= CADENCE_PSPI_WATCH:
+            self.every = self.min_every
+        elif self.reason is None:
+            self.every = min(self.max_every, self.every * 2)
+
+    def reset(self) -> None:
+        self.every = self.min_every
+        self.reason = None
+        self._since = 0
+        self._held = None
+        self._ref = None
+        self._last_pspi = None
+
+    @property
+    def hz(self) -> float | None:
+        """Recent inferences per second (None until two have run)."""
+        if len(self._times) < 2:
+            return None
+        span = time.monotonic() - self._times[0]
+        return (len(self._times) - 1) / span if span > 0 else None
 
 
 # ---------------------------------------------------------------------------
@@ -342,22 +778,57 @@ class MLPainDetector:
 
     Auto-captures the first few frames as neutral references.
     Falls back to HeuristicPainDetector if ML is unavailable.
+
+    Pass a shared PainModel (see pain_service) to reuse an already loaded
+    network; otherwise the checkpoint is loaded for this detector alone.
+    checkpoint_path=None (and no model) forces the heuristic.
+
+    Once ACTIVE, an InferenceCadence picks the updates that run the CNN:
+    every process_every-th update while the face or PSPI is changing,
+    backing off to every max_every-th when all is stable. The status
+    dict reports the resulting rate as inference_hz.
     """
 
     def __init__(
         self,
-        checkpoint_path: str = _DEFAULT_CHECKPOINT,
+        checkpoint_path: str | None = _DEFAULT_CHECKPOINT,
         num_outputs: int = _DEFAULT_NUM_OUTPUTS,
+        process_every: int = PROCESS_EVERY,
+        model: "PainModel | None" = None,
+        max_every: int = CADENCE_MAX_EVERY,
     ):
+        # Run the CNN at least every Nth update() while anything changes; 1 when
+        # a PainWorker sets the pace
+        self.process_every = max(1, int(process_every))
+        self._cadence = InferenceCadence(self.process_every, max_every)
         self._use_ml = False
         self._engine: MLPainEngine | None = None
         self._heuristic = HeuristicPainDetector()
 
+        # State machine
+        self._state = "CALIBRATING"  # CALIBRATING | ACTIVE | RECALIBRATING
+        self._calibration_count = 0
+        self._frame_count = 0
+
+        # Level persistence (require consecutive frames)
+        self._warning_frames = 0
+        self._stop_frames = 0
+
+        # Auto-recalibration tracking
+        self._stagnant_since: float | None = None
+
+        # Latest values
+        self._last_pspi: float | None = None
+        self._last_level = "normal"
+
+        if model is None and checkpoint_path is None:
+            return
+
         if not TORCH_AVAILABLE:
             logger.warning("torch not available, using heuristic pain detection")
             return
 
-        if not os.path.exists(checkpoint_path):
+        if model is None and not os.path.exists(checkpoint_path):
             logger.warning(
                 "Checkpoint not found at %s, using heuristic pain detection",
                 checkpoint_path,
@@ -372,59 +843,69 @@ class MLPainDetector:
             return
 
         try:
-            self._engine = MLPainEngine(checkpoint_path, num_outputs)
+            if model is not None:
+                self._engine = MLPainEngine(model)
+            else:
+                self._engine = MLPainEngine(checkpoint_path, num_outputs)
+                logger.info(
+                    "ML pain detector loaded (device=%s, checkpoint=%s)",
+                    self._engine.device,
+                    checkpoint_path,
+                )
             self._use_ml = True
-            logger.info(
-                "ML pain detector loaded (device=%s, checkpoint=%s)",
-                self._engine.device,
-                checkpoint_path,
-            )
         except Exception as e:
             logger.warning("Failed to load ML pain model: %s, falling back to heuristic", e)
 
-        # State machine
-        self._state = "CALIBRATING"  # CALIBRATING | ACTIVE | RECALIBRATING
-        self._calibration_count = 0
-        self._frame_count = 0
-
-        # Level persistence (require consecutive frames)
-        self._warning_frames = 0
-        self._stop_frames = 0
-
-        # Auto-recalibration tracking
-        self._stagnant_since: float | None = None
-
-        # Latest values
-        self._last_pspi: float | None = None
-        self._last_level = "normal"
-
     @property
     def calibrated(self) -> bool:
         return self._state == "ACTIVE"
 
-    def update(self, bgr: np.ndarray, face_landmarks_objects, w: int, h: int) -> dict:
+    @property
+    def uses_ml(self) -> bool:
+        """False when running the heuristic fallback (cheap, landmarks only)."""
+        return self._use_ml and self._engine is not None
+
+    def needs_pixels(self) -> bool:
+        """Whether the next update() will run the CNN and so needs ALIGN_WIDTH pixels.
+
+        The heuristic path and skipped frames only read landmarks, which lets
+        the caller decode those frames at reduced resolution.
+        """
+        if not self._use_ml or self._engine is None:
+            return False
+        if self._state in ("CALIBRATING", "RECALIBRATING"):
+            return True
+        # Scheduled inferences and changes held over from a reduced frame
+        return self._cadence.due()
+
+    def update(self, frame, face_landmarks, w: int, h: int) -> dict:
         """
         Process a frame and return pain status dict.
 
         Args:
-            bgr: BGR frame (cv2 format)
-            face_landmarks_objects: list of face landmark objects (for heuristic EAR/MAR)
+            frame: FrameContext for the current frame (or a BGR array)
+            face_landmarks: the frame's (478, 4) face landmark array (see
+                rep_counter.landmarks_to_array; empty when no face was found, None
+                when face detection did not run), used for heuristic EAR/MAR and
+                reused for alignment so the face graph runs once
             w: frame width
             h: frame height
 
         Returns:
-            dict with keys: level, message, face_detected, ear, mar, pspi_score, calibrated
+            dict with keys: level, message, face_detected, ear, mar, pspi_score,
+            calibrated, inference_hz
         """
         # Compute heuristic EAR/MAR values for debug display
         ear, mar = 0.0, 0.0
-        if face_landmarks_objects:
-            result = self._heuristic.update(face_landmarks_objects, w, h)
+        has_face = face_landmarks is not None and len(face_landmarks) > 0
+        if has_face:
+            result = self._heuristic.update(face_landmarks, w, h)
             ear = round(result[2], 4)
             mar = round(result[3], 4)
 
         if not self._use_ml or self._engine is None:
             # Pure heuristic mode
-            if face_landmarks_objects:
+            if has_face:
                 return {
                     "level": result[0],
                     "message": result[1],
@@ -433,6 +914,7 @@ class MLPainDetector:
                     "mar": mar,
                     "pspi_score": None,
                     "calibrated": True,
+                    "inference_hz": None,
                 }
             return {
                 "level": "normal",
@@ -442,13 +924,14 @@ class MLPainDetector:
                 "mar": 0.0,
                 "pspi_score": None,
                 "calibrated": True,
+                "inference_hz": None,
             }
 
         self._frame_count += 1
 
         # --- CALIBRATING / RECALIBRATING ---
         if self._state in ("CALIBRATING", "RECALIBRATING"):
-            if self._engine.add_reference(bgr):
+            if self._engine.add_reference(frame, face_landmarks):
                 self._calibration_count += 1
                 logger.info(
                     "Calibration reference %d/%d captured",
@@ -463,19 +946,29 @@ class MLPainDetector:
             return {
                 "level": "normal",
                 "message": "Calibrating pain detection...",
-                "face_detected": face_landmarks_objects is not None
-                and len(face_landmarks_objects) > 0,
+                "face_detected": has_face,
                 "ear": ear,
                 "mar": mar,
                 "pspi_score": None,
                 "calibrated": False,
+                "inference_hz": None,
             }
 
-        # --- ACTIVE: run inference every Nth frame ---
-        if self._frame_count % PROCESS_EVERY == 0:
-            smoothed, _raw = self._engine.predict(bgr)
+        # --- ACTIVE: run inference when the cadence asks for it ---
+        if face_landmarks is not None and not has_face:
+            self._cadence.face_lost()
+            run = False
+        else:
+            # Reduced decodes (FrameContext.scale > 1) are compared in source
+            # pixels, so a resolution switch does not read as face motion
+            scale = getattr(frame, "scale", 1)
+            lmks68 = landmarks_to_68(face_landmarks, w * scale, h * scale) if has_face else None
+            run = self._cadence.should_run(lmks68, ear, mar, full_res=scale == 1)
+        if run:
+            smoothed, _raw = self._engine.predict(frame, face_landmarks)
             if smoothed is not None:
                 self._last_pspi = smoothed
+                self._cadence.observe(smoothed)
 
                 # Auto-recalibrate if PSPI stays above threshold too long
                 now = time.time()
@@ -493,6 +986,7 @@ class MLPainDetector:
                             "mar": mar,
                             "pspi_score": self._last_pspi,
                             "calibrated": False,
+                            "inference_hz": None,
                         }
                 else:
                     self._stagnant_since = None
@@ -522,6 +1016,7 @@ class MLPainDetector:
             message = ""
 
         self._last_level = level
+        hz = self._cadence.hz
 
         return {
             "level": level,
@@ -531,10 +1026,11 @@ class MLPainDetector:
             "mar": mar,
             "pspi_score": round(pspi, 3) if pspi is not None else None,
             "calibrated": True,
+            "inference_hz": round(hz, 1) if hz is not None else None,
         }
 
     def recalibrate(self):
-        """Reset references and re-enter calibration mode."""
+        """Reset references (and their cached embeddings) and re-enter calibration mode."""
         if self._engine:
             self._engine.clear_references()
         self._state = "RECALIBRATING"
@@ -543,6 +1039,7 @@ class MLPainDetector:
         self._stop_frames = 0
         self._last_pspi = None
         self._stagnant_since = None
+        self._cadence.reset()
 
     def close(self):
         if self._engine:
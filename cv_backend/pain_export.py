@@ -0,0 +1,118 @@
+"""Export the pain CNN to frozen TorchScript and load it for CPU inference.
+
+The eager ConvNetOrdinalLateFusion runs every op through the Python module
+tree. export() traces its three entry points (forward, embed, head), freezes
+the graph (weights and BatchNorm folded into constants, no Python dispatch)
+and saves it next to the checkpoint; with quantized=True the fully connected
+layers are also dynamically quantized to int8 first. ensure_exported()
+re-exports whenever the checkpoint is newer than its artifact, so like the
+coach reference models the artifacts are produced automatically on startup.
+
+load_pain_model() returns a PainModel running on the exported graph when one
+is available (CPU only; the frozen graph bakes in its device), falling back
+to the eager checkpoint otherwise.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+import torch
+
+from ml_pain_detector import PainModel, load_checkpoint
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZE = 160
+TRACE_REFS = 3  # reference batch used for tracing; the graph accepts any count
+
+
+def exported_path(checkpoint_path: str, quantized: bool = False) -> str:
+    """Artifact path for a checkpoint: model.pt -> model.torchscript.pt / model.int8.torchscript.pt."""
+    root, _ = os.path.splitext(checkpoint_path)
+    return root + (".int8" if quantized else "") + ".torchscript.pt"
+
+
+def export(
+    checkpoint_path: str,
+    num_outputs: int,
+    quantized: bool = False,
+    out_path: str | None = None,
+    image_size: int = IMAGE_SIZE,
+) -> str:
+    """Trace, freeze and save the checkpoint's network. Returns the artifact path."""
+    net = load_checkpoint(checkpoint_path, num_outputs, "cpu")
+    if quantized:
+        net = torch.ao.quantization.quantize_dynamic(net, {torch.nn.Linear}, dtype=torch.qint8)
+
+    gen = torch.Generator().manual_seed(0)
+    target = torch.rand(1, 1, image_size, image_size, generator=gen)
+    refs = torch.rand(TRACE_REFS, 1, image_size, image_size, generator=gen)
+    with torch.inference_mode():
+        target_emb, ref_embs = net.embed(target), net.embed(refs)
+    with torch.no_grad():
+        traced = torch.jit.trace_module(
+            net,
+            {
+                "forward": torch.cat([target, refs[:1]], dim=1),
+                "embed": target,
+                "head": (target_emb, ref_embs),
+            },
+        )
+        frozen = torch.jit.freeze(traced.eval(), preserved_attrs=["embed", "head"])
+
+    out_path = out_path or exported_path(checkpoint_path, quantized)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    torch.jit.save(frozen, tmp)
+    os.replace(tmp, out_path)
+    logger.info("Exported %s -> %s", os.path.basename(checkpoint_path), out_path)
+    return out_path
+
+
+def ensure_exported(checkpoint_path: str, num_outputs: int, quantized: bool = False) -> str | None:
+    """Artifact path, (re)exporting if missing or older than the checkpoint; None on failure."""
+    path = exported_path(checkpoint_path, quantized)
+    try:
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(checkpoint_path):
+            return path
+        return export(checkpoint_path, num_outputs, quantized, path)
+    except Exception as e:
+        logger.warning("TorchScript export of %s failed (%s); using eager model", checkpoint_path, e)
+        return None
+
+
+def load_pain_model(
+    checkpoint_path: str,
+    num_outputs: int,
+    scripted: bool = True,
+    quantized: bool = False,
+) -> PainModel:
+    """PainModel on the exported TorchScript graph when possible, else the eager checkpoint."""
+    if scripted and not torch.cuda.is_available():
+        path = ensure_exported(checkpoint_path, num_outputs, quantized)
+        if path is not None:
+            try:
+                net = torch.jit.load(path, map_location="cpu")
+                logger.info("Pain model: TorchScript %s", os.path.basename(path))
+                model = PainModel(checkpoint_path, num_outputs, net=net)
+                model.artifact = os.path.basename(path)
+                return model
+            except RuntimeError as e:
+                logger.warning("Could not load %s (%s); using eager model", path, e)
+    return PainModel(checkpoint_path, num_outputs)
+
+
+def set_thread_budget(budget: int, workers: int = 1) -> int:
+    """Split a per-process CPU budget across concurrent pain workers.
+
+    Each thread that calls into torch gets its own intra-op team, so N
+    workers at T threads each use N * T cores. Returns the threads per worker.
+    """
+    per_worker = max(1, int(budget) // max(1, int(workers)))
+    torch.set_num_threads(per_worker)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set, or parallel work has started
+    return per_worker
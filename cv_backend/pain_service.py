@@ -0,0 +1,138 @@
+"""
+Process-wide pain inference service.
+
+Every /ws/exercise session used to build its own MLPainDetector, i.e. its own
+copy of the PyTorch checkpoint and face template, costing memory per patient
+and seconds of setup per connection. PainService loads the network once per
+process (PainModel) and runs every session's updates on one shared
+PainWorkerPool. Each session gets its own MLPainDetector on top of the shared
+model, so calibration references, smoothing and alert state stay isolated
+per session (keyed by PainWorker.id); opening a session does no file I/O.
+"""
+
+import logging
+import os
+import threading
+
+from ml_pain_detector import (
+    _DEFAULT_CHECKPOINT,
+    _DEFAULT_NUM_OUTPUTS,
+    TORCH_AVAILABLE,
+    MLPainDetector,
+)
+from pain_worker import PainWorker, PainWorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+class PainService:
+    """Shared pain model plus the worker threads serving every session."""
+
+    def __init__(
+        self,
+        checkpoint_path: str = _DEFAULT_CHECKPOINT,
+        num_outputs: int = _DEFAULT_NUM_OUTPUTS,
+        num_workers: int = 2,
+        max_hz: float = 10.0,
+        duty: float = 0.5,
+        thread_budget: int | None = None,
+        scripted: bool = True,
+        quantized: bool = False,
+    ):
+        """
+        Args:
+            thread_budget: torch CPU threads for this process, split across the
+                workers (None leaves torch's default).
+            scripted: run the exported TorchScript graph (see pain_export).
+            quantized: prefer the int8-quantized export.
+        """
+        self.checkpoint_path = checkpoint_path
+        self.num_outputs = num_outputs
+        self.num_workers = num_workers
+        self.max_hz = max_hz
+        self.duty = duty
+        self.thread_budget = thread_budget
+        self.scripted = scripted
+        self.quantized = quantized
+        self.threads_per_worker: int | None = None
+
+        self.model = None
+        self._pool: PainWorkerPool | None = None
+        self._sessions: dict[int, PainWorker] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self) -> None:
+        """Load the shared model and start the pool (idempotent)."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            self._pool = PainWorkerPool(self.num_workers)
+            if not TORCH_AVAILABLE:
+                logger.warning("torch not available, using heuristic pain detection")
+                return
+            if not os.path.exists(self.checkpoint_path):
+                logger.warning(
+                    "Checkpoint not found at %s, using heuristic pain detection",
+                    self.checkpoint_path,
+                )
+                return
+            from pain_export import load_pain_model, set_thread_budget
+
+            if self.thread_budget:
+                self.threads_per_worker = set_thread_budget(self.thread_budget, self.num_workers)
+            try:
+                self.model = load_pain_model(
+                    self.checkpoint_path, self.num_outputs, self.scripted, self.quantized
+                )
+                logger.info(
+                    "Shared pain model loaded (device=%s, checkpoint=%s, workers=%d, threads/worker=%s)",
+                    self.model.device,
+                    self.checkpoint_path,
+                    self.num_workers,
+                    self.threads_per_worker,
+                )
+            except Exception as e:
+                logger.warning("Failed to load ML pain model: %s, falling back to heuristic", e)
+
+    def open_session(self) -> PainWorker:
+        """New session: isolated detector state on the shared model and pool."""
+        self.load()
+        # No shared model -> heuristic detector (the reason was logged once by load())
+        detector = MLPainDetector(
+            checkpoint_path=None, process_every=1, model=self.model
+        )
+        worker = PainWorker(detector, self._pool, max_hz=self.max_hz, duty=self.duty)
+        with self._lock:
+            self._sessions[worker.id] = worker
+        return worker
+
+    def release(self, worker: PainWorker) -> None:
+        """Close a session's worker and forget its state."""
+        with self._lock:
+            self._sessions.pop(worker.id, None)
+        worker.close()
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            pool, self._pool = self._pool, None
+            self._loaded = False
+        for worker in sessions:
+            worker.close()
+        if pool is not None:
+            pool.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = {sid: w.stats() for sid, w in self._sessions.items()}
+        return {
+            "model_loaded": self.model is not None,
+            "artifact": getattr(self.model, "artifact", None),
+            "workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "queued": self._pool.queued() if self._pool is not None else 0,
+            "sessions": sessions,
+        }
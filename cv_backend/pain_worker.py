@@ -0,0 +1,224 @@
+"""
+Off-loop pain inference for /ws/exercise.
+
+A full ML pain update (face alignment plus the CNN) takes tens of
+milliseconds, so running it inline on the event loop stalls every other
+WebSocket served by the worker process. Each session instead gets a
+PainWorker: a one-slot latest-frame mailbox whose updates run on the
+threads of a PainWorkerPool (shared by all sessions, see pain_service).
+The session offers frames as they arrive, only the newest pending one is
+processed, and the session always answers with the most recently completed
+result plus its age.
+
+A session is queued on the pool at most once and never runs on two pool
+threads at the same time, so its detector state needs no locking. Instead
+of a fixed every-Nth-frame cadence each worker paces itself from the
+measured cost of its own updates: the next frame is taken no sooner than
+cost / duty after the previous one started, and never faster than max_hz.
+Cheap updates (the heuristic fallback) run inline.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Reported until the first update completes
+_PENDING_STATUS = {
+    "level": "normal",
+    "message": "",
+    "face_detected": False,
+    "ear": 0.0,
+    "mar": 0.0,
+    "pspi_score": None,
+    "calibrated": False,
+    "inference_hz": None,
+}
+
+
+class PainWorkerPool:
+    """Threads that run queued sessions' pending updates, first come first served."""
+
+    def __init__(self, num_workers: int = 2):
+        self.num_workers = max(1, int(num_workers))
+        self._ready: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"pain-worker-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def schedule(self, worker: "PainWorker") -> None:
+        self._ready.put(worker)
+
+    def queued(self) -> int:
+        return self._ready.qsize()
+
+    def _run(self) -> None:
+        while True:
+            worker = self._ready.get()
+            if worker is None:
+                return
+            worker._run_once()
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._ready.put(None)
+
+
+class PainWorker:
+    """One session's pain detector behind a latest-frame mailbox, run on a PainWorkerPool."""
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        detector,
+        pool: PainWorkerPool | None = None,
+        max_hz: float = 10.0,
+        duty: float = 0.5,
+        cost_alpha: float = 0.2,
+    ):
+        """
+        Args:
+            detector: MLPainDetector (or anything with update(frame, face_lms, w, h),
+                uses_ml and close()); it decides per update whether to run the CNN
+                (see InferenceCadence), and skipped updates lower the measured
+                cost, so a stable face is checked more often for the same CPU.
+            pool: shared pool to run on; None starts a private single-thread pool.
+            max_hz: upper bound on updates per second.
+            duty: fraction of one core the session may spend on updates.
+            cost_alpha: EMA weight of the newest measured update cost.
+        """
+        self.id = next(self._ids)
+        self.detector = detector
+        self.min_interval = 1.0 / max(1e-3, float(max_hz))
+        self.duty = min(1.0, max(1e-3, float(duty)))
+        self.cost_alpha = float(cost_alpha)
+        self.inline = not getattr(detector, "uses_ml", True)
+
+        self._own_pool = pool is None and not self.inline
+        self._pool = PainWorkerPool(1) if self._own_pool else pool
+        self._lock = threading.Lock()
+        self._pending: tuple | None = None
+        self._queued = False  # on the pool's ready queue or running
+        self._closed = False
+        self._next_due = 0.0
+        self._result: dict = dict(_PENDING_STATUS)
+        self._result_ts: float | None = None
+
+        # Stats
+        self.cost_ms: float | None = None
+        self.submitted = 0
+        self.completed = 0
+        self.replaced = 0
+
+    @property
+    def interval(self) -> float:
+        """Current minimum spacing (s) between update starts."""
+        if self.cost_ms is None:
+            return self.min_interval
+        return max(self.min_interval, self.cost_ms / 1000.0 / self.duty)
+
+    def wants_frame(self) -> bool:
+        """Whether a frame offered now would be picked up for the next update.
+
+        Lets the caller skip full-resolution decoding for frames the worker
+        would not consume anyway.
+        """
+        if self.inline:
+            return True
+        with self._lock:
+            return not self._queued and not self._closed and time.monotonic() >= self._next_due
+
+    def submit(self, frame, face_landmarks, w: int, h: int) -> None:
+        """Offer a frame; replaces any frame still waiting in the mailbox."""
+        item = (frame, face_landmarks, w, h, time.monotonic())
+        self.submitted += 1
+        if self.inline:
+            self._process(item)
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._pending is not None:
+                self.replaced += 1
+            self._pending = item
+            if self._queued:
+                return
+            self._queued = True
+        self._pool.schedule(self)
+
+    def latest(self) -> dict:
+        """Most recent completed pain status, with age_ms since its frame was submitted."""
+        with self._lock:
+            result, ts = self._result, self._result_ts
+        status = dict(result)
+        status["age_ms"] = None if ts is None else int((time.monotonic() - ts) * 1000)
+        return status
+
+    def _process(self, item: tuple) -> None:
+        frame, face_landmarks, w, h, submitted_at = item
+        start = time.perf_counter()
+        try:
+            result = self.detector.update(frame, face_landmarks, w, h)
+        except Exception:
+            logger.exception("Pain update failed")
+            result = None
+        cost_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self.cost_ms = cost_ms if self.cost_ms is None else (
+                self.cost_alpha * cost_ms + (1.0 - self.cost_alpha) * self.cost_ms
+            )
+            if result is not None:
+                self._result, self._result_ts = result, submitted_at
+                self.completed += 1
+
+    def _run_once(self) -> None:
+        """Pool thread: process the newest pending frame, then requeue or go idle."""
+        with self._lock:
+            item, self._pending = self._pending, None
+        if item is not None:
+            started = time.monotonic()
+            self._process(item)
+            self._next_due = started + self.interval
+        with self._lock:
+            if self._pending is not None and not self._closed:
+                # A frame arrived meanwhile: back of the queue, behind other sessions
+                requeue = True
+            else:
+                self._queued = requeue = False
+                closed = self._closed
+        if requeue:
+            self._pool.schedule(self)
+        elif closed:
+            self._finish()
+
+    def _finish(self) -> None:
+        # The detector is only touched by whoever holds the session: close it there
+        self.detector.close()
+        if self._own_pool:
+            self._pool.shutdown()
+
+    def close(self) -> None:
+        """Stop the session; the detector is closed once any in-flight update finishes."""
+        with self._lock:
+            self._closed = True
+            self._pending = None
+            running = self._queued
+        if not running:
+            self._finish()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cost_ms": round(self.cost_ms, 1) if self.cost_ms is not None else None,
+            "interval_ms": round(self.interval * 1000.0, 1),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "replaced": self.replaced,
+        }
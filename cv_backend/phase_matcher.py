@@ -0,0 +1,209 @@
+"""
+Streaming phase tracker for matching live frames to a reference clip.
+
+Instead of matching each frame against the whole reference (O(N) per frame,
+and prone to flicker between similar-looking phases), PhaseMatcher keeps a
+running estimate of where in the reference the user is and only compares the
+frame against a band of reference frames around it.
+
+Within the band it runs a streaming subsequence DTW with exponential
+forgetting: every reference frame j in the band carries the cost of the best
+warping path ending there,
+
+    cost[j] = d(frame, ref[j]) + decay * min(prev_cost[j - max_step .. j])
+
+so the match follows the user's recent motion (not just the current pose),
+only ever moves forward through the reference at 0..max_step reference
+frames per user frame, and needs no materialised windows. Per-frame cost is
+O(band * (D + max_step)), independent of reference length.
+
+If the nearest frame in the band stays far off for a few frames (tracking
+loss: the user skipped ahead, restarted the rep, or ran off the end of the
+reference) the band doubles on every further miss, falling back to one
+global match via the caller-supplied matcher (KD-tree index or brute force)
+once it covers the whole reference.
+
+When the reference is one loop of a repeated motion (its last frame runs
+back into its first), the band wraps around the end of the clip, so paths
+carry straight on into the next rep instead of being lost at the seam.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Callable
+
+import numpy as np
+
+
+class PhaseMatcher:
+    """Banded streaming-DTW matcher over a (N, D) reference feature array."""
+
+    def __init__(
+        self,
+        ref_features: np.ndarray,
+        global_match: Callable[[np.ndarray], tuple[int, float]],
+        loss_distance: float,
+        ref_fps: float = 15.0,
+        radius: int = 12,
+        max_speed: float = 2.0,
+        decay: float = 0.8,
+        loss_frames: int = 3,
+        hold_frames: int = 15,
+        loop: bool = False,
+    ):
+        """
+        Args:
+            ref_features: (N, D) scaled reference features, in clip order.
+            global_match: exact nearest-reference search used to (re)acquire the phase.
+            loss_distance: nearest in-band distance above which a frame counts as a miss.
+            ref_fps: frame rate the reference clip was recorded at.
+            radius: reference frames searched either side of the predicted phase.
+            max_speed: fastest user speed (x reference) the path may follow.
+            decay: per-frame forgetting factor of the accumulated path cost.
+            loss_frames: consecutive misses before the band widens.
+            hold_frames: frames to keep tracking without widening after a global
+                match that was itself a miss (the pose is far from the whole
+                reference, so searching wider again wouldn't help).
+            loop: the clip is one cycle of a repeated motion; bands wrap
+                around its end.
+        """
+        self.ref = ref_features
+        self.n = ref_features.shape[0]
+        self.global_match = global_match
+        self.loss_distance = float(loss_distance)
+        self.ref_fps = float(ref_fps)
+        self.base_radius = max(1, int(radius))
+        self.max_speed = float(max_speed)
+        self.decay = float(decay)
+        self.loss_frames = max(1, int(loss_frames))
+        self.hold_frames = max(0, int(hold_frames))
+        self.loop = bool(loop)
+
+        self._cost = np.full(self.n, np.inf, dtype=np.float64)
+        self._band = (0, 0)
+        self._last_ts: float | None = None
+        self.phase: int | None = None
+        self.radius = self.base_radius
+        self.misses = 0
+        self._hold = 0
+        self._restart = False
+
+        # Stats
+        self.reacquisitions = 0
+
+    def _cells(self, lo: int, hi: int) -> slice | np.ndarray:
+        """Reference frames lo..hi-1; wrapped modulo n for a loop."""
+        if self.loop:
+            return np.arange(lo, hi) % self.n
+        return slice(lo, hi)
+
+    def reset(self):
+        self._cost[self._cells(*self._band)] = np.inf
+        self._band = (0, 0)
+        self._last_ts = None
+        self.phase = None
+        self.radius = self.base_radius
+        self.misses = 0
+        self._hold = 0
+        self._restart = False
+
+    def _max_step(self, timestamp_sec: float) -> int:
+        """Reference frames the user can cover since the last frame (dropped frames widen it)."""
+        if self._last_ts is None:
+            return 1
+        dt = max(0.0, timestamp_sec - self._last_ts)
+        return int(min(self.radius, max(1, math.ceil(self.max_speed * self.ref_fps * dt))))
+
+    def _acquire(self, feat_scaled: np.ndarray) -> tuple[int, float]:
+        """Global match; the next frame starts new paths around the matched frame."""
+        idx, dist = self.global_match(feat_scaled)
+        self.phase = idx
+        self._restart = True
+        self.radius = self.base_radius
+        self.misses = 0
+        self._hold = self.hold_frames if dist > self.loss_distance else 0
+        self.reacquisitions += 1
+        return idx, dist
+
+    def update(self, feat_scaled: np.ndarray, timestamp_sec: float) -> tuple[int, float]:
+        """Advance the phase estimate with one frame.
+
+        Returns (ref_index, distance): the matched reference frame and the
+        frame's distance to it.
+        """
+        if self.phase is None or self.n == 0:
+            self._last_ts = timestamp_sec
+            return self._acquire(feat_scaled)
+
+        step = self._max_step(timestamp_sec)
+        self._last_ts = timestamp_sec
+
+        if self.loop:
+            # Band may run past either end of the clip; it never covers a frame twice
+            lo = self.phase - self.radius
+            hi = min(lo + self.n, self.phase + self.radius + step + 1)
+        else:
+            lo = max(0, self.phase - self.radius)
+            hi = min(self.n, self.phase + self.radius + step + 1)
+        d = np.linalg.norm(self.ref[self._cells(lo, hi)] - feat_scaled[None, :], axis=1)
+
+        if self._restart:
+            # Band was just widened or re-acquired: every cell starts a fresh path
+            cost = d.astype(np.float64)
+            self._restart = False
+        else:
+            # Best predecessor of each band cell: min over prev_cost[j - step .. j]
+            pad_lo = lo - step if self.loop else max(0, lo - step)
+            prev = self._cost[self._cells(pad_lo, hi)]
+            offset = lo - pad_lo
+            best_prev = prev[offset:].copy()
+            for k in range(1, step + 1):
+                if offset - k >= 0:
+                    np.minimum(best_prev, prev[offset - k:offset - k + (hi - lo)], out=best_prev)
+                else:
+                    np.minimum(best_prev[k - offset:], prev[:hi - lo - (k - offset)], out=best_prev[k - offset:])
+            cost = d + self.decay * best_prev
+
+        self._cost[self._cells(*self._band)] = np.inf
+        self._cost[self._cells(lo, hi)] = cost
+        self._band = (lo, hi)
+
+        nearest_j = int(np.argmin(d))
+        nearest = float(d[nearest_j])
+        widened = self.radius > self.base_radius
+
+        if nearest <= self.loss_distance and widened:
+            # Found the user again in the wider band: jump there and restart
+            j = nearest_j
+            self._restart = True
+        else:
+            j = int(np.argmin(cost))
+        self.phase = (lo + j) % self.n
+
+        if nearest <= self.loss_distance:
+            self.misses = 0
+            self.radius = self.base_radius
+            return self.phase, float(d[j])
+
+        if self._hold > 0:
+            self._hold -= 1
+            return self.phase, float(d[j])
+
+        # Once widening has started, keep doubling every missed frame
+        self.misses += 1
+        if self.misses >= (1 if widened else self.loss_frames):
+            if 2 * self.radius >= self.n:
+                return self._acquire(feat_scaled)
+            # Widen the band; paths restart from the next frame
+            self.radius *= 2
+            self.misses = 0
+            self._restart = True
+        return self.phase, float(d[j])
+
+    def stats(self) -> dict:
+        return {
+            "phase": self.phase,
+            "radius": self.radius,
+            "reacquisitions": self.reacquisitions,
+        }
@@ -0,0 +1,239 @@
+"""
+Exact nearest-reference index for coach reference models.
+
+A KD-tree over the scaled reference feature vectors, stored as flat arrays so
+train_reference.train can persist it in the model .npz next to the data it
+indexes. Reference clips are smooth trajectories through pose space: almost
+all of their variance lies along a few principal axes, so the tree is built
+in the PCA-rotated frame (a rotation, so distances are unchanged) where the
+node bounding boxes are tight. A query descends best-first through the node
+boxes, so whole subtrees are pruned above the leaves, and usually scans one
+or two leaves. Candidate leaves are read from the original rows (through
+tree_idx, so a memory-mapped reference matrix stays shared) with the same
+distance computation as brute force, and ties resolve to the lowest reference
+index exactly like np.argmin, so both paths always return the same frame.
+
+Layout (sklearn-style implicit binary tree, node i has children 2i+1, 2i+2):
+    tree_mean      float64 (D,)      centre of the rotated frame
+    tree_rotation  float64 (D, D)    principal axes as columns
+    tree_idx       int32 (N,)        reference row of each tree-ordered point
+    tree_bounds    int32 (M, 2)      [start, end) slice of tree_idx per node
+    tree_lo        float64 (M, D)    node bounding box in the rotated frame
+    tree_hi        float64 (M, D)
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TREE_KEYS = ("tree_mean", "tree_rotation", "tree_idx", "tree_bounds", "tree_lo", "tree_hi")
+
+DEFAULT_LEAF_SIZE = 32
+
+# Below this many reference frames one vectorized brute-force scan is as fast
+# as a tree query (the rotation and best-first descent cost ~60us per query).
+INDEX_MIN_ROWS = 1024
+
+# Slack on the box lower bound to absorb rounding in the rotated frame
+_BOUND_EPS = 1e-6
+
+
+def row_distances(data: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Euclidean distance from q to every row of data (shared by both search paths)."""
+    return np.linalg.norm(data - q[None, :], axis=1)
+
+
+def brute_force_nearest(data: np.ndarray, q: np.ndarray) -> tuple[int, float]:
+    """Reference (ref_index, distance) by exhaustive scan."""
+    d = row_distances(data, q)
+    idx = int(np.argmin(d))
+    return idx, float(d[idx])
+
+
+class KDTreeIndex:
+    """Exact Euclidean nearest-neighbour search over a fixed (N, D) array."""
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        mean: np.ndarray,
+        rotation: np.ndarray,
+        idx: np.ndarray,
+        bounds: np.ndarray,
+        lo: np.ndarray,
+        hi: np.ndarray,
+    ):
+        self.data = data
+        self.mean = mean
+        self.rotation = rotation
+        self.idx = idx
+        self.bounds = bounds
+        self.lo = lo
+        self.hi = hi
+        self._bounds = bounds.tolist()
+        self._first_leaf = bounds.shape[0] // 2
+        # Leaves gather their rows from data itself, which may be a shared memory map
+        self._row_of = idx.astype(np.intp)
+
+    # -- construction ------------------------------------------------------
+
+    @classmethod
+    def build(cls, data: np.ndarray, leaf_size: int = DEFAULT_LEAF_SIZE) -> "KDTreeIndex":
+        n, dim = data.shape
+        points = data.astype(np.float64)
+        mean = points.mean(axis=0) if n else np.zeros(dim)
+        if n > 1:
+            # Principal axes from the (D, D) scatter matrix; an SVD of the
+            # centred rows would also build an (N, N) factor
+            centred = points - mean
+            _, vectors = np.linalg.eigh(centred.T @ centred)
+            rotation = np.ascontiguousarray(vectors[:, ::-1])
+        else:
+            rotation = np.eye(dim)
+        rotated = (points - mean) @ rotation
+
+        leaf_size = max(1, leaf_size)
+        n_levels = 1 + int(math.floor(math.log2(max(1, (n - 1) // leaf_size)))) if n > leaf_size else 1
+        n_nodes = 2 ** n_levels - 1
+
+        idx = np.arange(n, dtype=np.int32)
+        bounds = np.zeros((n_nodes, 2), dtype=np.int32)
+        lo = np.zeros((n_nodes, dim), dtype=np.float64)
+        hi = np.zeros((n_nodes, dim), dtype=np.float64)
+
+        for node in range(n_nodes):
+            if node == 0:
+                start, end = 0, n
+            else:
+                parent = (node - 1) // 2
+                p_start, p_end = bounds[parent]
+                mid = p_start + (p_end - p_start) // 2
+                start, end = (p_start, mid) if node == 2 * parent + 1 else (mid, p_end)
+            bounds[node] = start, end
+            members = rotated[idx[start:end]]
+            if not members.shape[0]:
+                continue
+            lo[node] = members.min(axis=0)
+            hi[node] = members.max(axis=0)
+
+            if 2 * node + 1 < n_nodes and end - start > 1:
+                # Median split along the axis of greatest spread
+                split_dim = int(np.argmax(hi[node] - lo[node]))
+                mid = (end - start) // 2
+                order = np.argpartition(members[:, split_dim], mid)
+                idx[start:end] = idx[start:end][order]
+
+        return cls(data, mean, rotation, idx, bounds, lo, hi)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "tree_mean": self.mean,
+            "tree_rotation": self.rotation,
+            "tree_idx": self.idx,
+            "tree_bounds": self.bounds,
+            "tree_lo": self.lo,
+            "tree_hi": self.hi,
+        }
+
+    @classmethod
+    def from_arrays(cls, data: np.ndarray, arrays) -> "KDTreeIndex | None":
+        """Rebuild from persisted arrays; None if they are missing or don't match data."""
+        if any(k not in arrays for k in TREE_KEYS):
+            return None
+        a = {k: np.asarray(arrays[k]) for k in TREE_KEYS}
+        n, dim = data.shape
+        m = a["tree_bounds"].shape[0]
+        if (
+            a["tree_mean"].shape != (dim,)
+            or a["tree_rotation"].shape != (dim, dim)
+            or a["tree_idx"].shape != (n,)
+            or not np.array_equal(np.sort(a["tree_idx"]), np.arange(n))
+            or a["tree_bounds"].shape != (m, 2)
+            or m == 0
+            or tuple(a["tree_bounds"][0]) != (0, n)
+            or a["tree_lo"].shape != (m, dim)
+            or a["tree_hi"].shape != (m, dim)
+        ):
+            return None
+        return cls(
+            data,
+            a["tree_mean"],
+            a["tree_rotation"],
+            a["tree_idx"],
+            a["tree_bounds"],
+            a["tree_lo"],
+            a["tree_hi"],
+        )
+
+    # -- queries -----------------------------------------------------------
+
+    def query(self, q: np.ndarray) -> tuple[int, float]:
+        """Exact nearest row of data to q as (ref_index, distance).
+
+        Best-first descent: nodes wait in a heap keyed by the distance from
+        the rotated query to their box, children are only pushed while their
+        box could hold something closer than the best match so far, and the
+        search stops once the nearest waiting box is farther than that match.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        qr = (q - self.mean) @ self.rotation
+        best_d = math.inf
+        best_i = -1
+        heap = [(0.0, 0)]
+        while heap:
+            lower, node = heapq.heappop(heap)
+            if lower > best_d:
+                break
+            if node < self._first_leaf:
+                # Siblings are adjacent rows, so both boxes are one slice
+                left = 2 * node + 1
+                gap = np.maximum(np.maximum(self.lo[left : left + 2] - qr, qr - self.hi[left : left + 2]), 0.0)
+                child_lower = (np.sqrt(np.einsum("ij,ij->i", gap, gap)) - _BOUND_EPS).tolist()
+                for child, bound in zip((left, left + 1), child_lower):
+                    start, end = self._bounds[child]
+                    if end > start and bound <= best_d:
+                        heapq.heappush(heap, (bound, child))
+                continue
+            start, end = self._bounds[node]
+            if end <= start:
+                continue
+            rows = self._row_of[start:end]
+            d = row_distances(self.data[rows], q)
+            j = int(np.argmin(d))
+            dj = float(d[j])
+            if dj > best_d:
+                continue
+            # Resolve ties to the lowest reference index, as np.argmin does
+            cand = int(rows[d == d[j]].min())
+            best_i = cand if dj < best_d else min(best_i, cand)
+            best_d = dj
+        return best_i, best_d
+
+    def verify(self, queries: np.ndarray) -> bool:
+        """Check the index agrees with brute force on the given query rows."""
+        return all(self.query(q)[0] == brute_force_nearest(self.data, q)[0] for q in queries)
+
+
+def load_or_build(data: np.ndarray, arrays=None, leaf_size: int = DEFAULT_LEAF_SIZE) -> KDTreeIndex | None:
+    """Index for data, from persisted arrays when present, built otherwise.
+
+    Returns None (callers fall back to brute force) when data is too small for
+    the index to pay off or the index fails a spot check against brute force.
+    """
+    n = data.shape[0]
+    if n < INDEX_MIN_ROWS:
+        return None
+    index = KDTreeIndex.from_arrays(data, arrays) if arrays is not None else None
+    if index is None:
+        index = KDTreeIndex.build(data, leaf_size)
+    sample = data[np.linspace(0, n - 1, num=min(n, 8), dtype=np.intp)] + np.float32(0.05)
+    if not index.verify(sample):
+        logger.warning("Reference index disagrees with brute force; using brute-force matching")
+        return None
+    return index
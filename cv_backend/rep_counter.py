@@ -1,6 +1,10 @@
 """
 Rep counter and pain detection for real-time exercise tracking.
 Extracted from Gator_analysis/body_tracker.py for use in the CV backend.
+
+The detectors read landmarks as (N, 4) float arrays of normalized
+x, y, z, visibility (see landmarks_to_array), converted once per frame by
+the caller; lists of landmark objects or dicts are converted on entry.
 """
 
 import math
@@ -8,6 +12,32 @@ import time
 from dataclasses import dataclass
 from typing import Tuple
 
+import numpy as np
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """(N, 4) float32 x, y, z, visibility from landmark objects, dicts or an array.
+
+    Arrays pass through (3-column arrays get visibility 1.0); a missing or
+    None visibility is 1.0. None or an empty list gives a (0, 4) array.
+    """
+    if isinstance(landmarks, np.ndarray):
+        if landmarks.ndim == 2 and landmarks.shape[1] == 3:
+            return np.hstack([landmarks, np.ones((len(landmarks), 1), landmarks.dtype)])
+        return landmarks
+    if not landmarks:
+        return np.zeros((0, 4), dtype=np.float32)
+    if isinstance(landmarks[0], dict):
+        rows = [
+            (lm.get("x", 0.0), lm.get("y", 0.0), lm.get("z", 0.0), lm.get("visibility"))
+            for lm in landmarks
+        ]
+    else:
+        rows = [(lm.x, lm.y, lm.z, getattr(lm, "visibility", None)) for lm in landmarks]
+    return np.array(
+        [(x, y, z, 1.0 if v is None else v) for x, y, z, v in rows], dtype=np.float32
+    )
+
 
 class ComplementaryFilter:
     def __init__(self, alpha: float = 0.85):
@@ -71,6 +101,16 @@ def calculate_angle(a, b, c) -> float:
     return math.degrees(math.acos(cos_angle))
 
 
+def joint_angle(points: np.ndarray) -> float:
+    """calculate_angle for a (3, 2) array of pixel points a, b (vertex), c."""
+    ba = points[0] - points[1]
+    bc = points[2] - points[1]
+    denom = float(np.hypot(*ba) * np.hypot(*bc))
+    if denom == 0:
+        return 0.0
+    return math.degrees(math.acos(max(-1.0, min(1.0, float(ba @ bc) / denom))))
+
+
 @dataclass
 class ExerciseConfig:
     name: str
@@ -99,6 +139,7 @@ class RepCounter:
 
     def __init__(self, exercise_key: str = "arm_abduction"):
         self.config = self.EXERCISES.get(exercise_key, self.EXERCISES["arm_abduction"])
+        self._joints = list(self.config.joint_indices)
         self.filter = ComplementaryFilter(alpha=0.85)
         self.controller = PIController(kp=1.0, ki=0.5, ts=0.1)
         self.rep_count = 0
@@ -108,17 +149,14 @@ class RepCounter:
         self.form_quality = "neutral"
 
     def update(self, landmarks, frame_width, frame_height):
-        if not landmarks:
+        """`landmarks`: (33, 4) pose array (see landmarks_to_array)."""
+        if landmarks is None or len(landmarks) == 0:
             return self._get_status()
-        a, b, c = [landmarks[i] for i in self.config.joint_indices]
-        if min(a.visibility, b.visibility, c.visibility) < 0.5:
+        joints = landmarks_to_array(landmarks)[self._joints].astype(np.float64)
+        if joints[:, 3].min() < 0.5:
             return self._get_status()
 
-        raw_angle = calculate_angle(
-            (a.x * frame_width, a.y * frame_height),
-            (b.x * frame_width, b.y * frame_height),
-            (c.x * frame_width, c.y * frame_height),
-        )
+        raw_angle = joint_angle(joints[:, :2] * (frame_width, frame_height))
         self.current_angle = raw_angle
         self.smoothed_angle = self.filter.update(raw_angle)
 
@@ -199,17 +237,18 @@ class SixSevenDetector:
 
     def update(self, landmarks, frame_width: int, frame_height: int) -> dict:
         """
-        landmarks: list of pose landmark objects with .x, .y, .visibility
+        landmarks: (33, 4) pose array of x, y, z, visibility (see landmarks_to_array)
         Returns dict with {"triggered": bool}
         """
-        if not landmarks or len(landmarks) < 17:
+        if landmarks is None or len(landmarks) < 17:
             return {"triggered": False}
+        landmarks = landmarks_to_array(landmarks)
 
         l_wrist = landmarks[15]  # Left wrist
         r_wrist = landmarks[16]  # Right wrist
 
         # Need decent visibility on both wrists
-        if getattr(l_wrist, "visibility", 1.0) < 0.5 or getattr(r_wrist, "visibility", 1.0) < 0.5:
+        if l_wrist[3] < 0.5 or r_wrist[3] < 0.5:
             return {"triggered": False}
 
         now = time.time()
@@ -219,7 +258,7 @@ class SixSevenDetector:
             return {"triggered": False}
 
         # Determine which hand is higher (lower Y = higher on screen)
-        y_diff = l_wrist.y - r_wrist.y
+        y_diff = float(l_wrist[1] - r_wrist[1])
         if abs(y_diff) < self.min_y_diff:
             return {"triggered": False}
 
@@ -244,6 +283,11 @@ class SixSevenDetector:
         return {"triggered": False}
 
 
+# Face mesh index pairs whose distances give EAR / MAR:
+# left eye lids, left eye corners, right eye lids, right eye corners, lips, mouth corners
+_PAIN_PAIRS = np.array([(159, 145), (33, 133), (386, 374), (362, 263), (13, 14), (78, 308)])
+
+
 class HeuristicPainDetector:
     def __init__(self):
         self.pain_level = "normal"
@@ -259,21 +303,22 @@ class HeuristicPainDetector:
         self.MIN_STOP_FRAMES = 3
 
     def update(self, face_landmarks, w, h):
-        if not face_landmarks:
+        """`face_landmarks`: (478, 3|4) face mesh array (see landmarks_to_array)."""
+        if face_landmarks is None or len(face_landmarks) == 0:
             self.warning_frames = 0
             self.stop_frames = 0
             return "normal", "", 0, 0
 
-        def dist(i1, i2):
-            p1 = face_landmarks[i1]
-            p2 = face_landmarks[i2]
-            return math.hypot((p1.x - p2.x) * w, (p1.y - p2.y) * h)
+        if not isinstance(face_landmarks, np.ndarray):
+            face_landmarks = landmarks_to_array(face_landmarks)
+        pts = face_landmarks[_PAIN_PAIRS, :2].astype(np.float64)
+        d = np.hypot(*((pts[:, 0] - pts[:, 1]) * (w, h)).T)
 
-        ear_l = dist(159, 145) / (dist(33, 133) + 1e-6)
-        ear_r = dist(386, 374) / (dist(362, 263) + 1e-6)
-        ear = (ear_l + ear_r) / 2.0
+        ear_l = d[0] / (d[1] + 1e-6)
+        ear_r = d[2] / (d[3] + 1e-6)
+        ear = float(ear_l + ear_r) / 2.0
 
-        mar = dist(13, 14) / (dist(78, 308) + 1e-6)
+        mar = float(d[4] / (d[5] + 1e-6))
 
         # Blend a strict "both indicators" signal with strong single-indicator fallbacks.
         stop_signal = (ear < self.EAR_STOP and mar > self.MAR_STOP) or ear < 0.13 or mar > 0.85
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Tests for the shared, memory-mapped coach model registry."""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from coach_engine import CoachV2Engine
+from coach_registry import CoachModelRegistry
+from pt_coach.common import landmarks_list_to_np, load_reference_json
+
+CV_BACKEND = Path(__file__).resolve().parent.parent
+MODELS_DIR = CV_BACKEND / "coach_models"
+SKELETON_DIR = CV_BACKEND.parent / "skeleton_data"
+
+
+def _copy_model(key: str, dest: Path) -> Path:
+    for suffix in (".npz", ".meta.json"):
+        shutil.copy(MODELS_DIR / f"{key}_reference_model{suffix}", dest / f"{key}_reference_model{suffix}")
+    return dest / f"{key}_reference_model.npz"
+
+
+def _registry(tmp_path: Path, key: str = "squat") -> CoachModelRegistry:
+    models = tmp_path / "models"
+    models.mkdir(exist_ok=True)
+    registry = CoachModelRegistry(tmp_path / "cache")
+    registry.register({key: _copy_model(key, models)})
+    return registry
+
+
+class TestSharedModel:
+    def test_arrays_are_memory_mapped_read_only(self, tmp_path):
+        model = _registry(tmp_path).get("squat")
+        for arr in (model.ref_norm, model.ref_features_scaled):
+            assert isinstance(arr, np.memmap)
+            assert not arr.flags.writeable
+
+    def test_sessions_share_model_but_not_state(self, tmp_path):
+        registry = _registry(tmp_path)
+        a = registry.session("squat")
+        b = registry.session("squat")
+        assert a.model is b.model
+        assert a.ref_features_scaled is b.ref_features_scaled
+        assert a.quality_hist is not b.quality_hist
+        assert a.matcher is not b.matcher
+
+    def test_matches_engine_loaded_from_file(self, tmp_path):
+        registry = _registry(tmp_path)
+        shared = registry.session("squat")
+        direct = CoachV2Engine(MODELS_DIR / "squat_reference_model.npz")
+        frames = load_reference_json(SKELETON_DIR / "ex6_reference.json")["frames"]
+        for i, frame in enumerate(frames[:40]):
+            lms = landmarks_list_to_np(frame["landmarks"])
+            assert shared.infer(lms, i / 15.0) == direct.infer(lms, i / 15.0)
+
+
+class TestCache:
+    def test_cache_reused_across_registries(self, tmp_path):
+        """A second process (registry) maps the existing cache instead of unpacking again."""
+        _registry(tmp_path).get("squat")
+        cached = tmp_path / "cache" / "squat_reference_model" / "ref_norm.npy"
+        mtime = cached.stat().st_mtime_ns
+
+        other = CoachModelRegistry(tmp_path / "cache")
+        other.register({"squat": tmp_path / "models" / "squat_reference_model.npz"})
+        other.get("squat")
+        assert cached.stat().st_mtime_ns == mtime
+
+    def test_cache_rebuilt_when_model_changes(self, tmp_path):
+        registry = _registry(tmp_path)
+        registry.get("squat")
+
+        # Retrain: overwrite the squat model with another exercise's arrays
+        npz = tmp_path / "models" / "squat_reference_model.npz"
+        shutil.copy(MODELS_DIR / "arm_vw_reference_model.npz", npz)
+        os.utime(npz, ns=(npz.stat().st_atime_ns, npz.stat().st_mtime_ns + 10**9))
+
+        fresh = CoachModelRegistry(tmp_path / "cache")
+        fresh.register({"squat": npz})
+        with np.load(npz) as expected:
+            np.testing.assert_array_equal(fresh.get("squat").ref_norm, expected["ref_norm"])
+
+    def test_without_cache_dir_loads_in_memory(self, tmp_path):
+        registry = CoachModelRegistry(None)
+        registry.register({"squat": MODELS_DIR / "squat_reference_model.npz"})
+        model = registry.get("squat")
+        assert not isinstance(model.ref_norm, np.memmap)
+        assert "squat" in registry
+        assert "unknown" not in registry
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Parity tests for the fast pain-model face alignment (FaceAligner) vs the skimage path."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ml_pain_detector as mpd
+from frame_context import FrameContext
+
+CV_BACKEND = Path(__file__).resolve().parent.parent
+SAMPLE_VIDEO = CV_BACKEND.parent / "web" / "public" / "sample-exercise.mp4"
+WIDTH, HEIGHT = 480, 360
+
+pytestmark = pytest.mark.skipif(not mpd.TORCH_AVAILABLE, reason="torch/skimage not installed")
+
+
+def _recorded_frames(n: int) -> list[np.ndarray]:
+    """Frames from the bundled sample recording, cropped to webcam-like 480x360."""
+    cap = cv2.VideoCapture(str(SAMPLE_VIDEO))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for i in np.linspace(0, max(0, total - 1), n).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(i))
+        ok, frame = cap.read()
+        if ok:
+            frames.append(cv2.resize(frame[100:460, 700:1180], (WIDTH, HEIGHT), interpolation=cv2.INTER_AREA))
+    cap.release()
+    if len(frames) < n:
+        pytest.skip("sample recording not readable")
+    return frames
+
+
+def _face_landmarks(seed: int, shift=(0.0, 0.0), scale=1.0, angle_deg=0.0, jitter=1.5) -> list:
+    """478 normalized face landmarks with the 68-pt subset placed on a posed template face."""
+    rng = np.random.default_rng(seed)
+    std = np.load(CV_BACKEND / "pain_models" / "standard_face_68.npy").astype(np.float64)
+    std = (std - std.min(0)) / (std.max(0) - std.min(0)) - 0.5
+    a = np.deg2rad(angle_deg)
+    rot = np.array([[np.cos(a), -np.sin(a)], [np.sin(a), np.cos(a)]])
+    pts = (std * np.array([120.0, 150.0]) * scale) @ rot.T + np.array([240.0, 175.0]) + np.asarray(shift)
+    pts += rng.normal(0.0, jitter, pts.shape)
+    lms = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(478)]
+    for k, i in enumerate(mpd.MP_TO_68):
+        lms[i] = SimpleNamespace(x=float(pts[k, 0] / WIDTH), y=float(pts[k, 1] / HEIGHT), z=0.0)
+    return lms
+
+
+POSES = [
+    dict(shift=(0, 0)),
+    dict(shift=(25, -10), scale=0.8, angle_deg=8),
+    dict(shift=(-30, 15), scale=1.15, angle_deg=-12),
+    dict(shift=(10, 20), scale=0.65, angle_deg=3, jitter=3.0),
+    dict(shift=(-5, -20), scale=1.3, angle_deg=-4),
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return mpd.MLPainEngine(mpd._DEFAULT_CHECKPOINT, mpd._DEFAULT_NUM_OUTPUTS)
+
+
+class TestFaceAligner:
+    def test_triangulation_covers_anchor_hull(self):
+        template = np.load(CV_BACKEND / "pain_models" / "standard_face_68.npy").astype(np.float32)
+        aligner = mpd.FaceAligner(template, 640, 160)
+        n = len(mpd.ALIGN_ANCHORS)
+        h = len(cv2.convexHull(template[mpd.ALIGN_ANCHORS]))
+        assert aligner.triangles.shape == (2 * n - h - 2, 3)  # full triangulation (Euler)
+        assert len(np.unique(aligner.triangles)) == n
+
+    def test_output_is_uint8_crop(self, engine):
+        frame = _recorded_frames(1)[0]
+        lmks = mpd.landmarks_to_68(_face_landmarks(0), 640, 480)
+        gray = cv2.cvtColor(FrameContext(frame).resized(640), cv2.COLOR_BGR2GRAY)
+        out = engine._aligner(640).align(gray, lmks)
+        assert out.dtype == np.uint8
+        assert out.shape == (160, 160)
+        # Face fills the crop centre; corners are outside the anchor hull
+        assert out[80, 80] > 0
+        assert out[0, 0] == 0 and out[0, -1] == 0
+
+    def test_aligned_pixels_match_skimage_path(self, engine):
+        frames = _recorded_frames(len(POSES))
+        for seed, (frame, pose) in enumerate(zip(frames, POSES)):
+            lmks = mpd.landmarks_to_68(_face_landmarks(seed, **pose), 640, 480)
+            ctx = FrameContext(frame)
+            fast = engine._aligner(640).align(cv2.cvtColor(ctx.resized(640), cv2.COLOR_BGR2GRAY), lmks)
+            ref = engine._align_skimage(ctx.resized(640), lmks, 640).reshape(fast.shape)
+            diff = np.abs(fast.astype(np.int16) - ref.astype(np.int16))
+            # Same warp: only interpolation (one resample instead of two) and rounding differ
+            assert diff.mean() < 2.0
+            assert np.mean(diff > 16) < 0.02
+            # Model input after CLAHE
+            diff_in = np.abs(engine.clahe.apply(fast).astype(np.int16) - engine.clahe.apply(ref).astype(np.int16))
+            assert diff_in.mean() < 8.0
+
+    @pytest.mark.parametrize("width", [480, 640, 1280])
+    def test_face_box_matches_full_frame(self, engine, width):
+        frames = _recorded_frames(len(POSES))
+        for seed, (frame, pose) in enumerate(zip(frames, POSES)):
+            frame = cv2.resize(frame, (width, width * 3 // 4), interpolation=cv2.INTER_CUBIC)
+            ctx = FrameContext(frame)
+            lmks = mpd.landmarks_to_68(_face_landmarks(seed, **pose), 640, 480)
+            gray, lmks_box = engine._face_gray(ctx, lmks, 640)
+            # Pixel work follows the face, not the frame
+            assert gray.size < 0.5 * 640 * 480
+            aligner = engine._aligner(640)
+            boxed = aligner.align(gray, lmks_box)
+            full = aligner.align(cv2.cvtColor(ctx.resized(640), cv2.COLOR_BGR2GRAY), lmks)
+            diff = np.abs(boxed.astype(np.int16) - full.astype(np.int16))
+            assert diff.mean() < 1.0
+            assert np.mean(diff > 8) < 0.01
+
+    def test_face_off_frame_is_skipped(self, engine):
+        ctx = FrameContext(_recorded_frames(1)[0])
+        lmks = mpd.landmarks_to_68(_face_landmarks(0), 640, 480) + np.float32([2000, 0])
+        assert engine._face_gray(ctx, lmks, 640) is None
+
+    def test_pspi_matches_skimage_path(self, engine):
+        frames = _recorded_frames(3 + len(POSES))
+        scores = {}
+        for fast_align in (True, False):
+            engine.fast_align = fast_align
+            engine.clear_references()
+            for k in range(3):
+                assert engine.add_reference(frames[k], _face_landmarks(100 + k, jitter=0.5))
+            scores[fast_align] = np.array(
+                [engine.predict(f, _face_landmarks(seed, **pose))[1] for seed, (f, pose) in enumerate(zip(frames[3:], POSES))]
+            )
+        engine.fast_align = True
+        engine.clear_references()
+        # PSPI runs 0-16; alert thresholds are 1.0 (warning) and 3.0 (stop)
+        assert np.max(np.abs(scores[True] - scores[False])) < 0.4
+        assert abs(scores[True].mean() - scores[False].mean()) < 0.2
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tests for FaceProcessor.track_68's search box around the last face."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ml_pain_detector as mpd
+from frame_context import FrameContext
+
+WIDTH, HEIGHT = 640, 480
+
+
+class FakeLandmarker:
+    """Stand-in MediaPipe landmarker: the "face" is the box of bright pixels.
+
+    Landmark objects alternate between the box corners (normalized to the
+    searched image), so the 68-point subset spans exactly that box.
+    """
+
+    def __init__(self, running_mode):
+        self.running_mode = running_mode
+        self.calls = []
+        self.timestamps = []
+        self.closed = False
+
+    def _result(self, mp_image):
+        rgb = mp_image.numpy_view()
+        self.calls.append(rgb.shape[:2])
+        ys, xs = np.nonzero(rgb[..., 0])
+        if len(xs) == 0:
+            return SimpleNamespace(face_landmarks=[])
+        h, w = rgb.shape[:2]
+        corner = np.arange(478)
+        x = np.where(corner % 2, xs.max() + 1, xs.min()) / w
+        y = np.where((corner // 2) % 2, ys.max() + 1, ys.min()) / h
+        return SimpleNamespace(face_landmarks=[[SimpleNamespace(x=x, y=y, z=0.0) for x, y in zip(x, y)]])
+
+    def detect_for_video(self, mp_image, timestamp_ms):
+        assert self.running_mode == mpd.RunningMode.VIDEO
+        self.timestamps.append(timestamp_ms)
+        return self._result(mp_image)
+
+    def detect(self, mp_image):
+        assert self.running_mode == mpd.RunningMode.IMAGE
+        return self._result(mp_image)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(
+        mpd.FaceLandmarker, "create_from_options", staticmethod(lambda options: FakeLandmarker(options.running_mode))
+    )
+    return mpd.FaceProcessor("face_landmarker.task")
+
+
+def _frame(x0, y0, w=100, h=120) -> FrameContext:
+    bgr = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    bgr[max(0, y0) : y0 + h, max(0, x0) : x0 + w] = 255
+    return FrameContext(bgr)
+
+
+def _box(pts):
+    return (*pts.min(axis=0).round().astype(int), *pts.max(axis=0).round().astype(int))
+
+
+class TestTrack68:
+    def test_follows_the_face_in_its_search_box(self, processor):
+        full, roi = processor.landmarker, processor.roi_landmarker
+        assert _box(processor.track_68(_frame(200, 150))) == (200, 150, 300, 270)
+        assert processor._roi == (140, 90, 360, 330)
+        for shift in range(1, 6):
+            assert _box(processor.track_68(_frame(200 + shift, 150))) == (200 + shift, 150, 300 + shift, 270)
+        assert processor.full_searches == 1 and processor.roi_hits == 5
+        # Only the first frame went through the video landmarker; crops are searched on their own
+        assert full.calls == [(HEIGHT, WIDTH)] and len(roi.calls) == 5
+        assert all(shape[1] < WIDTH for shape in roi.calls)
+
+    def test_scales_to_target_size(self, processor):
+        pts = processor.track_68(_frame(200, 150), target_size=(320, 240))
+        assert _box(pts) == (100, 75, 150, 135)
+
+    def test_face_leaving_the_box_triggers_full_search(self, processor):
+        processor.track_68(_frame(200, 150))
+        # Right edge of the face runs into the right side of the 140..360 box
+        pts = processor.track_68(_frame(255, 150))
+        assert _box(pts) == (255, 150, 355, 270)
+        assert processor.roi_hits == 0 and processor.full_searches == 2
+        assert processor.landmarker.timestamps == [33, 66]
+        assert processor._roi == (195, 90, 415, 330)
+
+    def test_frame_border_is_not_a_box_edge(self, processor):
+        processor.track_68(_frame(0, 0))
+        assert processor._roi[:2] == (0, 0)
+        assert processor._leaving(np.float32([[0.0, 0.0], [0.5, 0.5]]), WIDTH, HEIGHT) is False
+        assert processor._leaving(np.float32([[0.5, 0.5], [0.99, 0.5]]), WIDTH, HEIGHT) is True
+        processor.track_68(_frame(0, 0))
+        assert processor.roi_hits == 1
+
+    def test_lost_face_clears_the_box(self, processor):
+        processor.track_68(_frame(200, 150))
+        assert processor.track_68(FrameContext(np.zeros((HEIGHT, WIDTH, 3), np.uint8))) is None
+        assert processor._roi is None and processor.full_searches == 2
+        processor.track_68(_frame(200, 150))
+        processor.reset_tracking()
+        processor.track_68(_frame(200, 150))
+        assert processor.roi_hits == 0 and processor.full_searches == 4
+
+    def test_close_closes_both_landmarkers(self, processor):
+        processor.close()
+        assert processor.landmarker.closed and processor.roi_landmarker.closed
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Tests for the latest-frame-wins WebSocket reader (frame_ingest.py)."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi import WebSocketDisconnect
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_ingest import LatestFrameReader
+
+
+class FakeWebSocket:
+    """Delivers queued messages to receive(); an exception in the queue is raised instead."""
+
+    def __init__(self):
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    def send(self, text):
+        self.messages.put_nowait({"type": "websocket.receive", "text": text})
+
+    def disconnect(self):
+        self.messages.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def receive(self):
+        msg = await self.messages.get()
+        if isinstance(msg, Exception):
+            raise msg
+        return msg
+
+
+async def _drain():
+    """Let the reader task consume everything queued so far."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestLatestFrameReader:
+    def test_newest_frame_wins(self):
+        async def scenario():
+            websocket = FakeWebSocket()
+            reader = LatestFrameReader(websocket)
+            reader.start()
+            for text in ("f1", "f2", "f3"):
+                websocket.send(text)
+            await _drain()
+            first = await reader.next()
+            websocket.send("f4")
+            second = await reader.next()
+            await reader.stop()
+            return first["text"], second["text"], reader.counters()
+
+        first, second, counters = asyncio.run(scenario())
+        assert (first, second) == ("f3", "f4")
+        assert counters == {"received": 4, "processed": 2, "dropped": 2}
+
+    def test_next_waits_for_a_frame(self):
+        async def scenario():
+            websocket = FakeWebSocket()
+            reader = LatestFrameReader(websocket)
+            reader.start()
+            pending = asyncio.ensure_future(reader.next())
+            await _drain()
+            waited = not pending.done()
+            websocket.send("late")
+            msg = await asyncio.wait_for(pending, 1.0)
+            await reader.stop()
+            return waited, msg["text"]
+
+        assert asyncio.run(scenario()) == (True, "late")
+
+    def test_pending_frame_is_delivered_before_the_disconnect(self):
+        async def scenario():
+            websocket = FakeWebSocket()
+            reader = LatestFrameReader(websocket)
+            reader.start()
+            websocket.send("last")
+            websocket.disconnect()
+            await _drain()
+            msgs = [await reader.next(), await reader.next(), await reader.next()]
+            await reader.stop()
+            return msgs
+
+        last, *after = asyncio.run(scenario())
+        assert last["text"] == "last" and after == [None, None]
+
+    def test_disconnect_wakes_a_waiting_session(self):
+        async def scenario():
+            websocket = FakeWebSocket()
+            reader = LatestFrameReader(websocket)
+            reader.start()
+            pending = asyncio.ensure_future(reader.next())
+            await _drain()
+            websocket.messages.put_nowait(WebSocketDisconnect(1001))
+            msg = await asyncio.wait_for(pending, 1.0)
+            await reader.stop()
+            return msg, reader._task.done()
+
+        assert asyncio.run(scenario()) == (None, True)
+
+    def test_stop_cancels_the_reader(self):
+        async def scenario():
+            reader = LatestFrameReader(FakeWebSocket())
+            reader.start()
+            await _drain()
+            await reader.stop()
+            return reader._task.done(), await reader.next()
+
+        assert asyncio.run(scenario()) == (True, None)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Tests for the cross-session micro-batching scheduler (inference_scheduler.py)."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inference_scheduler import InferenceScheduler
+
+
+class FakeLandmarker:
+    """Stand-in IMAGE-mode landmarker: reports which detector and thread saw the frame."""
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def detect(self, image):
+        if image == "bad":
+            raise ValueError(f"{self.name} rejected the frame")
+        return self.name, image, threading.current_thread().name, id(self)
+
+    def close(self):
+        self.closed = True
+
+
+def _scheduler(**kwargs) -> InferenceScheduler:
+    factories = {name: (lambda name=name: FakeLandmarker(name)) for name in ("pose", "hands", "face")}
+    return InferenceScheduler(factories, **kwargs)
+
+
+def _run(scheduler, scenario):
+    try:
+        return asyncio.run(scenario())
+    finally:
+        scheduler.close()
+
+
+class TestInferenceScheduler:
+    def test_frames_within_the_window_share_a_batch(self):
+        scheduler = _scheduler(num_workers=2, window_ms=20.0, max_batch=16)
+
+        async def scenario():
+            return await asyncio.gather(*(scheduler.detect(frame, {"pose"}) for frame in range(5)))
+
+        results = _run(scheduler, scenario)
+        assert [result["pose"][1] for result in results] == list(range(5))
+        stats = scheduler.stats()
+        assert stats["batches"] == 1 and stats["frames"] == 5 and stats["last_batch_size"] == 5
+        assert stats["in_flight"] == 0
+
+    def test_batches_are_capped(self):
+        scheduler = _scheduler(num_workers=2, window_ms=20.0, max_batch=2)
+
+        async def scenario():
+            return await asyncio.gather(*(scheduler.detect(frame, {"pose"}) for frame in range(5)))
+
+        _run(scheduler, scenario)
+        stats = scheduler.stats()
+        assert stats["batches"] == 3 and stats["max_batch_size"] == 2 and stats["frames"] == 5
+
+    def test_fans_out_to_the_requested_detectors(self):
+        scheduler = _scheduler(num_workers=3, window_ms=0.0)
+        scheduler.warm_up()
+        result = asyncio.run(scheduler.detect("frame", ["face", "pose", "unknown"]))
+        instances = list(scheduler._instances)
+        scheduler.close()
+
+        # Only requested detectors, in factory order
+        assert list(result) == ["pose", "face"]
+        assert all(output[:2] == (name, "frame") for name, output in result.items())
+        # Every worker thread built its own set; all are closed with the scheduler
+        assert len(instances) == 3 * 3
+        assert {output[3] for output in result.values()} <= {id(landmarker) for landmarker in instances}
+        assert all(landmarker.closed for landmarker in instances)
+
+    def test_errors_reach_only_the_failing_frame(self):
+        scheduler = _scheduler(num_workers=2, window_ms=10.0)
+
+        async def scenario():
+            return await asyncio.gather(
+                scheduler.detect("good", {"pose", "hands"}),
+                scheduler.detect("bad", {"pose", "hands"}),
+                scheduler.detect("also good", {"pose"}),
+                return_exceptions=True,
+            )
+
+        good, bad, also_good = _run(scheduler, scenario)
+        assert good["hands"][1] == "good" and also_good["pose"][1] == "also good"
+        assert isinstance(bad, ValueError)
+        assert scheduler.stats()["in_flight"] == 0
+
+    def test_cancelled_frames_are_skipped(self):
+        scheduler = _scheduler(num_workers=1, window_ms=20.0)
+
+        async def scenario():
+            abandoned = asyncio.ensure_future(scheduler.detect("gone", {"pose"}))
+            kept = asyncio.ensure_future(scheduler.detect("kept", {"pose"}))
+            await asyncio.sleep(0)
+            abandoned.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await abandoned
+            return await kept
+
+        assert _run(scheduler, scenario)["pose"][1] == "kept"
+        assert scheduler.stats()["frames"] == 2
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Tests for the per-session landmark buffers and the binary landmark packet."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from landmark_packet import LandmarkBuffers, pack_results, unpack
+
+
+def _group(n: int, seed: int, visibility=None) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=visibility)
+        for x, y, z in rng.random((n, 3), dtype=np.float32)
+    ]
+
+
+def _results(seed: int, hands: int = 2):
+    pose = SimpleNamespace(pose_landmarks=[_group(33, seed, 0.9)])
+    hand = SimpleNamespace(
+        hand_landmarks=[_group(21, seed + k) for k in range(hands)],
+        handedness=[[SimpleNamespace(category_name=name)] for name in ("Right", "Left")[:hands]],
+    )
+    face = SimpleNamespace(face_landmarks=[_group(478, seed)])
+    return pose, hand, face
+
+
+class TestLandmarkBuffers:
+    def test_views_match_landmarks(self):
+        pose, hand, face = _results(0)
+        buf = LandmarkBuffers().fill(pose, hand, face)
+        assert buf.pose.shape == (1, 33, 4) and buf.hands.shape == (2, 21, 3) and buf.face.shape == (1, 478, 3)
+        lm = face.face_landmarks[0][100]
+        np.testing.assert_array_equal(buf.face[0, 100], np.float32([lm.x, lm.y, lm.z]))
+        assert np.all(buf.pose[..., 3] == np.float32(0.9))
+        np.testing.assert_array_equal(buf.handedness, [1.0, 0.0])
+
+    def test_refill_reuses_memory(self):
+        buf = LandmarkBuffers()
+        first = buf.fill(*_results(0)).face
+        second = buf.fill(*_results(1, hands=1)).face
+        assert np.shares_memory(first, second)
+        assert buf.hands.shape == (1, 21, 3) and buf.handedness.shape == (1,)
+        buf.fill(None, None, SimpleNamespace(face_landmarks=[]))
+        assert buf.pose.shape == (0, 0, 4) and buf.face.shape == (0, 0, 3)
+
+    def test_groups_of_different_lengths(self):
+        buf = LandmarkBuffers()
+        short, full = _group(15, 3), _group(21, 4)
+        hand = SimpleNamespace(hand_landmarks=[short, full], handedness=[])
+        hands = buf.fill(None, hand, None).hands
+        assert hands.shape == (2, 21, 3)
+        np.testing.assert_array_equal(hands[0, 14], np.float32([short[14].x, short[14].y, short[14].z]))
+        assert np.isnan(hands[0, 15:]).all()
+        np.testing.assert_array_equal(hands[1, 20], np.float32([full[20].x, full[20].y, full[20].z]))
+
+    def test_packet_round_trip(self):
+        pose, hand, face = _results(2)
+        buf = LandmarkBuffers().fill(pose, hand, face)
+        packet = unpack(buf.pack({"pain": {"level": "normal"}}))
+        np.testing.assert_array_equal(packet["pose"], buf.pose)
+        np.testing.assert_array_equal(packet["hands"], buf.hands)
+        np.testing.assert_array_equal(packet["handedness"], buf.handedness)
+        np.testing.assert_array_equal(packet["face"], buf.face)
+        assert packet["extra"] == {"pain": {"level": "normal"}}
+        assert pack_results(pose, hand, face) == buf.pack()
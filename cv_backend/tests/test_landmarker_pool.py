@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Tests for the per-session VIDEO-mode landmarker leases (landmarker_pool.py)."""
+
+import sys
+from pathlib import Path
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from landmarker_pool import LandmarkerPool
+
+
+class FakeLandmarker:
+    """Stand-in VIDEO-mode landmarker that remembers every frame it tracked."""
+
+    created = []
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = []
+        self.closed = False
+        FakeLandmarker.created.append(self)
+
+    def detect_for_video(self, image, timestamp_ms):
+        assert not self.closed
+        if self.frames:
+            assert timestamp_ms > self.frames[-1][1]
+        self.frames.append((image, timestamp_ms))
+        return (self.name, len(self.frames))
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(max_sets=2):
+    FakeLandmarker.created = []
+    return LandmarkerPool({name: lambda name=name: FakeLandmarker(name) for name in ("pose", "face")}, max_sets=max_sets)
+
+
+class TestLandmarkerPool:
+    def test_sessions_beyond_the_cap_fall_back(self):
+        pool = _pool(max_sets=2)
+        first, second = pool.acquire(), pool.acquire()
+        assert first is not None and second is not None and first.id != second.id
+        assert pool.acquire() is None
+        assert pool.stats() == {"max_sets": 2, "leased": 2, "created": 2, "fallbacks": 1}
+        pool.release(first)
+        assert pool.acquire() is not None
+        assert pool.stats()["leased"] == 2
+
+    def test_landmarkers_are_created_lazily_per_detector(self):
+        pool = _pool()
+        lease = pool.acquire()
+        assert FakeLandmarker.created == []
+        for frame in range(3):
+            assert lease.detect("pose", frame, lease.next_timestamp()) == ("pose", frame + 1)
+        assert [landmarker.name for landmarker in FakeLandmarker.created] == ["pose"]
+
+    def test_released_set_starts_the_next_session_fresh(self):
+        pool = _pool(max_sets=1)
+        lease = pool.acquire()
+        lease.detect("pose", "previous session", lease.next_timestamp())
+        lease.detect("face", "previous session", lease.next_timestamp())
+        pool.release(lease)
+        assert all(landmarker.closed for landmarker in FakeLandmarker.created)
+
+        # The next session gets new graphs with no tracking history
+        lease = pool.acquire()
+        assert lease.detect("pose", "new session", lease.next_timestamp()) == ("pose", 1)
+        assert FakeLandmarker.created[-1].frames[0][0] == "new session"
+        assert len(FakeLandmarker.created) == 3
+
+    def test_release_is_idempotent(self):
+        pool = _pool(max_sets=1)
+        lease = pool.acquire()
+        pool.release(lease)
+        pool.release(lease)
+        pool.release(None)
+        assert pool.stats()["leased"] == 0
+        assert pool.acquire() is not None and pool.acquire() is None
+
+    def test_close_closes_leased_sets(self):
+        pool = _pool()
+        lease = pool.acquire()
+        lease.detect("face", "frame", lease.next_timestamp())
+        pool.close()
+        assert FakeLandmarker.created[0].closed
+        assert pool.stats()["leased"] == 0
+
+    def test_timestamps_increase_strictly(self):
+        lease = _pool().acquire()
+        stamps = [lease.next_timestamp() for _ in range(100)]
+        assert all(b > a for a, b in zip(stamps, stamps[1:]))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Tests for the adaptive pain-CNN cadence (InferenceCadence)."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_context import FrameContext
+from ml_pain_detector import ALIGN_WIDTH, CADENCE_PSPI_WATCH, InferenceCadence, MLPainDetector
+
+EAR, MAR = 0.3, 0.2
+
+
+def _face(shift=0.0) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.uniform(200, 400, (68, 2)) + shift
+
+
+def _run(cadence, updates, face=None, ear=EAR, mar=MAR, pspi=0.0) -> list[bool]:
+    """Feed `updates` identical updates; returns which ones ran the CNN."""
+    face = _face() if face is None else face
+    runs = []
+    for _ in range(updates):
+        run = cadence.should_run(face, ear, mar)
+        if run:
+            cadence.observe(pspi)
+        runs.append(run)
+    return runs
+
+
+class TestInferenceCadence:
+    def test_backs_off_to_floor_when_stable(self):
+        cadence = InferenceCadence(1, 8)
+        runs = _run(cadence, 64)
+        assert cadence.every == 8
+        # Interval doubles 1 -> 2 -> 4 -> 8, then holds at the floor rate
+        assert runs[:8] == [True, True, False, True, False, False, False, True]
+        assert sum(runs[32:]) == 4
+
+    def test_change_runs_on_the_same_update(self):
+        for change in (dict(face=_face(15.0)), dict(ear=EAR - 0.08), dict(mar=MAR + 0.2)):
+            cadence = InferenceCadence(1, 8)
+            _run(cadence, 40)
+            assert not cadence.due()
+            assert _run(cadence, 1, **change) == [True]
+            assert cadence.every == 1
+
+    def test_small_jitter_does_not_trigger(self):
+        cadence = InferenceCadence(1, 8)
+        _run(cadence, 40)
+        assert _run(cadence, 7, face=_face(0.5)) == [False] * 7
+
+    def test_rising_or_elevated_pspi_keeps_full_rate(self):
+        cadence = InferenceCadence(1, 8)
+        assert all(_run(cadence, 10, pspi=CADENCE_PSPI_WATCH + 0.1))
+        cadence = InferenceCadence(1, 8)
+        _run(cadence, 40)
+        face = _face()
+        for k in range(1, 30):
+            if cadence.should_run(face, EAR, MAR):
+                cadence.observe(0.05 * k)  # PSPI climbing while the face holds still
+        assert cadence.every == 1
+
+    def test_reappearing_face_triggers(self):
+        cadence = InferenceCadence(1, 8)
+        _run(cadence, 40)
+        cadence.face_lost()
+        assert _run(cadence, 1) == [True]
+        assert cadence.reason == "face"
+
+    def test_min_every_without_landmarks(self):
+        # No cheap signals: fixed every-Nth cadence, backing off while PSPI is flat
+        cadence = InferenceCadence(3, 3)
+        runs = [cadence.should_run(None, EAR, MAR) for _ in range(9)]
+        assert runs == [False, False, True] * 3
+
+    def test_reset(self):
+        cadence = InferenceCadence(1, 8)
+        _run(cadence, 40)
+        cadence.reset()
+        assert cadence.every == 1 and cadence.due()
+
+    def test_change_on_reduced_frame_is_held_for_full_pixels(self):
+        cadence = InferenceCadence(1, 8)
+        _run(cadence, 40)
+        assert not cadence.due()
+        assert not cadence.should_run(_face(15.0), EAR, MAR, full_res=False)
+        # The held change makes the caller decode full pixels for the next update
+        assert cadence.due()
+        assert cadence.should_run(_face(15.0), EAR, MAR, full_res=True)
+        assert cadence.reason == "motion"
+
+
+class RecordingEngine:
+    """Stand-in MLPainEngine that records the width of every frame it scores."""
+
+    def __init__(self):
+        self.widths = []
+
+    def add_reference(self, frame, face_landmarks):
+        return True
+
+    def predict(self, frame, face_landmarks):
+        self.widths.append(frame.width)
+        return 0.0, 0.0
+
+    def clear_references(self):
+        pass
+
+
+class TestPainDecodeResolution:
+    def test_change_triggered_inference_gets_full_width(self):
+        detector = MLPainDetector(checkpoint_path=None, process_every=1, max_every=8)
+        engine = detector._engine = RecordingEngine()
+        detector._use_ml = True
+        rng = np.random.default_rng(1)
+        face = np.concatenate([rng.uniform(0.3, 0.7, (478, 3)), np.ones((478, 1))], axis=1).astype(np.float32)
+
+        def update(landmarks):
+            # Same policy as the websocket loop: full alignment width only when asked for
+            if detector.needs_pixels():
+                frame = FrameContext(np.zeros((480, ALIGN_WIDTH, 3), np.uint8))
+            else:
+                frame = FrameContext(np.zeros((240, ALIGN_WIDTH // 2, 3), np.uint8), scale=2)
+            detector.update(frame, landmarks, frame.width, frame.height)
+
+        for _ in range(60):
+            update(face)
+        assert detector.calibrated and not detector.needs_pixels()
+        scored = len(engine.widths)
+        moved = face.copy()
+        moved[:, 0] += 0.05
+        update(moved)
+        update(moved)
+        assert len(engine.widths) == scored + 1
+        assert detector._cadence.reason == "motion"
+        assert min(engine.widths) >= ALIGN_WIDTH
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Parity tests for the exported (frozen TorchScript) pain model."""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ml_pain_detector as mpd
+
+torch = pytest.importorskip("torch")
+pain_export = pytest.importorskip("pain_export")
+
+NUM_OUTPUTS = mpd._DEFAULT_NUM_OUTPUTS
+
+
+def _inputs(num_refs: int, seed: int = 0):
+    """Fixed face-crop-like inputs in [0, 1]: one target and num_refs references."""
+    gen = torch.Generator().manual_seed(seed)
+    return (
+        torch.rand(1, 1, 160, 160, generator=gen),
+        torch.rand(num_refs, 1, 160, 160, generator=gen),
+    )
+
+
+def _pspi(net, target, refs) -> np.ndarray:
+    with torch.inference_mode():
+        out = net.head(net.embed(target), net.embed(refs))
+    return np.clip(out[:, -3:].numpy(), 0, None)
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    # Copy so exports land in a temp dir, not next to the real checkpoint
+    path = tmp_path_factory.mktemp("ckpt") / "model.pt"
+    shutil.copy(mpd._DEFAULT_CHECKPOINT, path)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def eager(checkpoint):
+    return mpd.load_checkpoint(checkpoint, NUM_OUTPUTS)
+
+
+class TestExport:
+    def test_artifact_next_to_checkpoint(self, checkpoint):
+        assert pain_export.exported_path(checkpoint).endswith("model.torchscript.pt")
+        assert pain_export.exported_path(checkpoint, quantized=True).endswith("model.int8.torchscript.pt")
+
+    @pytest.mark.parametrize("num_refs", [1, 3, 5])
+    def test_frozen_matches_eager(self, checkpoint, eager, num_refs):
+        scripted = torch.jit.load(pain_export.ensure_exported(checkpoint, NUM_OUTPUTS))
+        target, refs = _inputs(num_refs)
+        with torch.inference_mode():
+            np.testing.assert_allclose(
+                scripted.embed(target).numpy(), eager.embed(target).numpy(), atol=1e-5
+            )
+            np.testing.assert_allclose(
+                scripted(torch.cat([target, refs[:1]], 1)).numpy(),
+                eager(torch.cat([target, refs[:1]], 1)).numpy(),
+                atol=1e-4,
+            )
+        np.testing.assert_allclose(_pspi(scripted, target, refs), _pspi(eager, target, refs), atol=1e-4)
+
+    def test_int8_pspi_close_to_eager(self, checkpoint, eager):
+        quantized = torch.jit.load(pain_export.ensure_exported(checkpoint, NUM_OUTPUTS, quantized=True))
+        for seed in range(4):
+            target, refs = _inputs(3, seed)
+            # PSPI runs 0-16 with alert thresholds at 1.0 and 3.0
+            diff = np.abs(_pspi(quantized, target, refs) - _pspi(eager, target, refs))
+            assert diff.max() < 0.1
+
+    def test_reexports_when_checkpoint_changes(self, checkpoint):
+        path = pain_export.ensure_exported(checkpoint, NUM_OUTPUTS)
+        mtime = os.path.getmtime(path)
+        assert pain_export.ensure_exported(checkpoint, NUM_OUTPUTS) == path
+        assert os.path.getmtime(path) == mtime
+        os.utime(checkpoint, (mtime + 10, mtime + 10))
+        pain_export.ensure_exported(checkpoint, NUM_OUTPUTS)
+        assert os.path.getmtime(path) > mtime
+
+
+class TestLoader:
+    def test_prefers_exported_graph(self, checkpoint):
+        model = pain_export.load_pain_model(checkpoint, NUM_OUTPUTS)
+        assert model.artifact == "model.torchscript.pt"
+        assert isinstance(model.net, torch.jit.ScriptModule)
+
+    def test_eager_when_disabled(self, checkpoint):
+        model = pain_export.load_pain_model(checkpoint, NUM_OUTPUTS, scripted=False)
+        assert model.artifact == "model.pt"
+        assert isinstance(model.net, mpd.ConvNetOrdinalLateFusion)
+
+    def test_engine_scores_match_eager(self, checkpoint):
+        scripted = mpd.MLPainEngine(pain_export.load_pain_model(checkpoint, NUM_OUTPUTS))
+        eager = mpd.MLPainEngine(pain_export.load_pain_model(checkpoint, NUM_OUTPUTS, scripted=False))
+        target, refs = _inputs(3)
+        for engine in (scripted, eager):
+            engine.ref_embeddings = engine.embed(refs)
+        np.testing.assert_allclose(
+            scripted.head(scripted.embed(target)), eager.head(eager.embed(target)), atol=1e-4
+        )
+
+    def test_thread_budget_split_across_workers(self):
+        before = torch.get_num_threads()
+        try:
+            assert pain_export.set_thread_budget(8, 3) == 2
+            assert torch.get_num_threads() == 2
+            assert pain_export.set_thread_budget(2, 4) == 1
+        finally:
+            torch.set_num_threads(before)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tests for the shared pain model / pain service (one network, per-session state)."""
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ml_pain_detector as mpd
+from pain_service import PainService
+
+CV_BACKEND = Path(__file__).resolve().parent.parent
+WIDTH, HEIGHT = 480, 360
+
+pytestmark = pytest.mark.skipif(not mpd.TORCH_AVAILABLE, reason="torch/skimage not installed")
+
+
+def _face(seed: int) -> tuple[np.ndarray, list]:
+    """Synthetic BGR face frame plus 478 normalized landmarks placed on it."""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8), (0, 0), 3)
+    cv2.ellipse(img, (240, 175), (70, 90), 0, 0, 360, (180, 160, 150), -1)
+    cv2.circle(img, (215, 150), 8, (30, 30, 30), -1)
+    cv2.circle(img, (265, 150), 8, (30, 30, 30), -1)
+    cv2.ellipse(img, (240, 215), (25, 4 + seed % 8), 0, 0, 360, (60, 40, 120), -1)
+
+    std = np.load(CV_BACKEND / "pain_models" / "standard_face_68.npy").astype(np.float64)
+    std = (std - std.min(0)) / (std.max(0) - std.min(0))
+    pts = std * np.array([120.0, 150.0]) + np.array([180.0, 100.0]) + rng.normal(0.0, 1.5, (68, 2))
+    lms = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(478)]
+    for k, i in enumerate(mpd.MP_TO_68):
+        lms[i] = SimpleNamespace(x=float(pts[k, 0] / WIDTH), y=float(pts[k, 1] / HEIGHT), z=0.0)
+    return img, lms
+
+
+@pytest.fixture(scope="module")
+def model():
+    return mpd.PainModel(mpd._DEFAULT_CHECKPOINT, mpd._DEFAULT_NUM_OUTPUTS)
+
+
+def _calibrated(engine, seeds=(1, 2, 3)):
+    for seed in seeds:
+        assert engine.add_reference(*_face(seed))
+    return engine
+
+
+class TestSharedPainModel:
+    def test_engines_share_network_but_not_references(self, model):
+        a = mpd.MLPainEngine(model)
+        b = mpd.MLPainEngine(model)
+        assert a.model is b.model is model.net
+        _calibrated(a)
+        assert len(a.ref_tensors) == 3
+        assert b.ref_embeddings is None
+        assert b.predict(*_face(10)) == (None, None)
+
+    def test_shared_engine_matches_private_engine(self, model):
+        shared = _calibrated(mpd.MLPainEngine(model))
+        private = _calibrated(mpd.MLPainEngine(mpd._DEFAULT_CHECKPOINT, mpd._DEFAULT_NUM_OUTPUTS))
+        for seed in (10, 11, 12):
+            assert shared.predict(*_face(seed)) == pytest.approx(private.predict(*_face(seed)), abs=1e-6)
+
+    def test_concurrent_sessions_match_sequential(self, model):
+        calib = {0: (1, 2, 3), 1: (4, 5, 6), 2: (7, 8, 9), 3: (1, 5, 9)}
+        frames = [_face(seed) for seed in range(10, 16)]
+
+        def run(sid):
+            engine = _calibrated(mpd.MLPainEngine(model), calib[sid])
+            return [engine.predict(*f)[1] for f in frames]
+
+        expected = {sid: run(sid) for sid in calib}
+        got = {}
+        threads = [threading.Thread(target=lambda s=sid: got.__setitem__(s, run(s))) for sid in calib]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for sid in calib:
+            assert got[sid] == pytest.approx(expected[sid], abs=1e-6)
+        # Different references -> different scores: no state leaks between sessions
+        assert expected[0] != pytest.approx(expected[1], abs=1e-6)
+
+
+class TestPainService:
+    def test_model_loaded_once(self):
+        service = PainService(num_workers=1, scripted=False)
+        service.load()
+        model = service.model
+        service.load()
+        assert service.model is model is not None
+        a, b = service.open_session(), service.open_session()
+        assert a.id != b.id
+        assert set(service.stats()["sessions"]) == {a.id, b.id}
+        if a.detector.uses_ml:
+            assert a.detector._engine.pain_model is b.detector._engine.pain_model is model
+            assert a.detector._engine is not b.detector._engine
+        service.release(a)
+        assert set(service.stats()["sessions"]) == {b.id}
+        service.close()
+        assert service.stats()["sessions"] == {}
+
+    def test_missing_checkpoint_falls_back_to_heuristic(self, tmp_path):
+        service = PainService(checkpoint_path=str(tmp_path / "missing.pt"), num_workers=1)
+        session = service.open_session()
+        assert service.model is None
+        assert not session.detector.uses_ml
+        assert session.inline
+        session.submit(None, [], WIDTH, HEIGHT)
+        assert session.latest()["face_detected"] is False
+        service.close()
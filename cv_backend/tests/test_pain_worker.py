@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for the off-loop pain inference worker (mailbox, latching, pacing)."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pain_worker import PainWorker
+
+
+class SlowDetector:
+    """Stands in for MLPainDetector: fixed-cost update() that records its frames."""
+
+    uses_ml = True
+
+    def __init__(self, cost_sec: float = 0.0):
+        self.cost_sec = cost_sec
+        self.frames = []
+        self.threads = set()
+        self.closed = threading.Event()
+
+    def update(self, frame, face_landmarks, w, h):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.cost_sec)
+        self.frames.append(frame)
+        return {"level": "normal", "pspi_score": float(frame), "calibrated": True}
+
+    def close(self):
+        self.closed.set()
+
+
+def _wait_for(cond, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.002)
+
+
+class TestPainWorker:
+    def test_pending_status_before_first_result(self):
+        worker = PainWorker(SlowDetector())
+        status = worker.latest()
+        assert status["pspi_score"] is None
+        assert status["age_ms"] is None
+        worker.close()
+
+    def test_runs_off_the_calling_thread(self):
+        det = SlowDetector()
+        worker = PainWorker(det)
+        worker.submit(1, [], 640, 480)
+        _wait_for(lambda: worker.completed == 1)
+        assert threading.get_ident() not in det.threads
+        assert worker.latest()["pspi_score"] == 1.0
+        worker.close()
+
+    def test_latest_frame_wins(self):
+        det = SlowDetector(cost_sec=0.05)
+        worker = PainWorker(det, max_hz=1000, duty=1.0)
+        worker.submit(0, [], 640, 480)
+        _wait_for(lambda: len(det.threads) == 1)  # first update in flight
+        for i in range(1, 6):
+            worker.submit(i, [], 640, 480)
+        _wait_for(lambda: worker.completed == 2)
+        assert det.frames == [0, 5]
+        assert worker.replaced == 4
+        worker.close()
+
+    def test_result_latches_with_age(self):
+        worker = PainWorker(SlowDetector())
+        worker.submit(7, [], 640, 480)
+        _wait_for(lambda: worker.completed == 1)
+        first = worker.latest()
+        time.sleep(0.03)
+        later = worker.latest()
+        assert later["pspi_score"] == first["pspi_score"] == 7.0
+        assert later["age_ms"] >= first["age_ms"] + 25
+        worker.close()
+
+    def test_pace_follows_measured_cost(self):
+        det = SlowDetector(cost_sec=0.03)
+        worker = PainWorker(det, max_hz=1000, duty=0.5)
+        worker.submit(0, [], 640, 480)
+        _wait_for(lambda: worker.completed == 1)
+        # ~30 ms per update at 50% duty -> at least ~60 ms between update starts
+        assert worker.interval >= 0.05
+        assert not worker.wants_frame()
+        _wait_for(lambda: worker.wants_frame())
+        worker.close()
+
+    def test_rate_cap(self):
+        worker = PainWorker(SlowDetector(), max_hz=5)
+        worker.submit(0, [], 640, 480)
+        _wait_for(lambda: worker.completed == 1)
+        assert worker.interval >= 0.2
+        assert not worker.wants_frame()
+        worker.close()
+
+    def test_close_closes_detector_on_worker_thread(self):
+        det = SlowDetector(cost_sec=0.05)
+        worker = PainWorker(det)
+        worker.submit(0, [], 640, 480)
+        _wait_for(lambda: len(det.threads) == 1)
+        worker.close()
+        assert not det.closed.is_set()  # in-flight update finishes first
+        assert det.closed.wait(1.0)
+        worker.submit(1, [], 640, 480)
+        time.sleep(0.02)
+        assert det.frames == [0]
+
+    def test_heuristic_detector_runs_inline(self):
+        det = SlowDetector()
+        det.uses_ml = False
+        worker = PainWorker(det)
+        assert worker.wants_frame()
+        worker.submit(3, [], 640, 480)
+        assert det.threads == {threading.get_ident()}
+        assert worker.latest()["pspi_score"] == 3.0
+        worker.close()
+        assert det.closed.is_set()
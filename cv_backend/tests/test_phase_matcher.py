@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Tests for the streaming phase matcher used by CoachV2Engine."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from phase_matcher import PhaseMatcher
+from ref_index import brute_force_nearest
+
+CV_BACKEND = Path(__file__).resolve().parent.parent
+MODEL_NPZ = CV_BACKEND / "coach_models" / "arm_vw_reference_model.npz"
+LOSS_DISTANCE = 1.5
+
+
+def _reference() -> np.ndarray:
+    return np.load(MODEL_NPZ)["ref_features_scaled"]
+
+
+def _replay(ref: np.ndarray, speed: float, start: int = 0, noise: float = 0.15, fps: float = 30.0):
+    """User frames walking through the reference (15 fps) at `speed`, sampled at `fps`."""
+    positions = np.arange(start, ref.shape[0] - 1, speed * 15.0 / fps)
+    truth = np.round(positions).astype(int)
+    rng = np.random.default_rng(0)
+    frames = ref[truth] + rng.normal(0.0, noise, size=(len(truth), ref.shape[1])).astype(np.float32)
+    return frames, truth, 1.0 / fps
+
+
+class _CountingMatch:
+    def __init__(self, ref):
+        self.ref = ref
+        self.calls = 0
+
+    def __call__(self, q):
+        self.calls += 1
+        return brute_force_nearest(self.ref, q)
+
+
+class TestPhaseTracking:
+    def test_follows_time_warped_replay(self):
+        ref = _reference()
+        for speed in (0.7, 1.0, 1.5):
+            matcher = PhaseMatcher(ref, _CountingMatch(ref), LOSS_DISTANCE)
+            frames, truth, dt = _replay(ref, speed)
+            phases = np.array([matcher.update(f, i * dt)[0] for i, f in enumerate(frames)])
+            pose_err = np.linalg.norm(ref[phases] - ref[truth], axis=1)
+            assert np.percentile(pose_err, 95) < 0.5
+
+    def test_searches_band_not_whole_reference(self):
+        ref = _reference()
+        global_match = _CountingMatch(ref)
+        matcher = PhaseMatcher(ref, global_match, LOSS_DISTANCE)
+        frames, _, dt = _replay(ref, 1.0)
+        for i, f in enumerate(frames):
+            matcher.update(f, i * dt)
+        # Only the initial acquisition needs the full reference
+        assert global_match.calls <= 2
+        assert matcher.radius == matcher.base_radius
+
+    def test_reacquires_after_jump(self):
+        ref = _reference()
+        matcher = PhaseMatcher(ref, _CountingMatch(ref), LOSS_DISTANCE)
+        frames, _, dt = _replay(ref, 1.0, noise=0.05)
+        for i, f in enumerate(frames[:60]):
+            matcher.update(f, i * dt)
+
+        # User jumps to a distant part of the reference
+        far = (matcher.phase + ref.shape[0] // 2) % ref.shape[0]
+        t0 = 60 * dt
+        for k in range(20):
+            idx, _ = matcher.update(ref[far], t0 + k * dt)
+        assert np.linalg.norm(ref[idx] - ref[far]) < 1e-3
+
+    def test_dropped_frames_allow_larger_steps(self):
+        ref = _reference()
+        matcher = PhaseMatcher(ref, _CountingMatch(ref), LOSS_DISTANCE)
+        matcher.update(ref[100], 0.0)
+        assert matcher._max_step(1.0 / 30.0) == 1
+        assert matcher._max_step(0.2) == 6
+        assert matcher._max_step(10.0) == matcher.radius
+
+    def test_returns_distance_to_reported_frame(self):
+        ref = _reference()
+        matcher = PhaseMatcher(ref, _CountingMatch(ref), LOSS_DISTANCE)
+        frames, _, dt = _replay(ref, 1.0)
+        for i, f in enumerate(frames[:80]):
+            idx, dist = matcher.update(f, i * dt)
+            # The distance belongs to the frame reported, not the band's nearest
+            assert abs(dist - np.linalg.norm(ref[idx] - f)) < 1e-4
+
+
+def _loop_reference(n: int = 240, dims: int = 42) -> np.ndarray:
+    """One cycle of a smooth periodic motion: frame n would be frame 0 again."""
+    rng = np.random.default_rng(1)
+    angle = 2.0 * np.pi * np.arange(n) / n
+    harmonics = np.stack([f(k * angle) for k in (1, 2, 3) for f in (np.cos, np.sin)], axis=1)
+    return (harmonics @ rng.normal(0.0, 1.5, size=(6, dims))).astype(np.float32)
+
+
+class TestLoopReference:
+    def _track(self, loop):
+        ref = _loop_reference()
+        global_match = _CountingMatch(ref)
+        matcher = PhaseMatcher(ref, global_match, LOSS_DISTANCE, loop=loop)
+        # Two and a half reps back to back, starting just before the seam
+        truth = (np.arange(200, 200 + 600) % ref.shape[0]).repeat(2)
+        rng = np.random.default_rng(0)
+        frames = ref[truth] + rng.normal(0.0, 0.1, size=(len(truth), ref.shape[1])).astype(np.float32)
+        phases = np.array([matcher.update(f, i / 30.0)[0] for i, f in enumerate(frames)])
+        return ref, phases, truth, global_match
+
+    def test_band_wraps_across_the_seam(self):
+        ref, phases, truth, global_match = self._track(loop=True)
+        # Only the initial acquisition; every rep boundary is tracked in-band
+        assert global_match.calls == 1
+        assert np.percentile(np.linalg.norm(ref[phases] - ref[truth], axis=1), 95) < 0.5
+
+    def test_clip_without_loop_reacquires_at_the_end(self):
+        _, _, _, global_match = self._track(loop=False)
+        assert global_match.calls > 1
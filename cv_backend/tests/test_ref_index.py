@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Tests for the KD-tree nearest-reference index used by CoachV2Engine."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ref_index
+from coach_engine import CoachV2Engine
+from ref_index import INDEX_MIN_ROWS, TREE_KEYS, KDTreeIndex, brute_force_nearest, load_or_build
+from train_reference import train
+
+CV_BACKEND = Path(__file__).resolve().parent.parent
+MODELS_DIR = CV_BACKEND / "coach_models"
+SKELETON_DIR = CV_BACKEND.parent / "skeleton_data"
+MODEL_KEYS = ["arm_abduction", "arm_vw", "leg_abduction", "squat"]
+
+
+def _ref_features(key: str) -> np.ndarray:
+    return np.load(MODELS_DIR / f"{key}_reference_model.npz")["ref_features_scaled"]
+
+
+def _queries(data: np.ndarray, n: int = 200, seed: int = 0) -> np.ndarray:
+    """Reference rows plus noisy neighbours of them, and a few far-away points."""
+    rng = np.random.default_rng(seed)
+    rows = data[rng.integers(0, len(data), n)]
+    noisy = rows + rng.normal(0.0, 0.3, size=rows.shape).astype(np.float32)
+    far = rng.normal(0.0, 5.0, size=(10, data.shape[1])).astype(np.float32)
+    return np.concatenate([data[:20], noisy, far])
+
+
+class TestIndexMatchesBruteForce:
+    @pytest.mark.parametrize("key", MODEL_KEYS)
+    def test_bundled_models(self, key):
+        data = _ref_features(key)
+        index = KDTreeIndex.build(data)
+        for q in _queries(data):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+    @pytest.mark.parametrize("leaf_size", [1, 5, 32, 10_000])
+    def test_leaf_sizes(self, leaf_size):
+        data = _ref_features("squat")
+        index = KDTreeIndex.build(data, leaf_size)
+        for q in _queries(data, n=50):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+    def test_distance_matches(self):
+        data = _ref_features("arm_vw")
+        index = KDTreeIndex.build(data)
+        # Both paths measure float64 queries in float64
+        for q in _queries(data, n=50).astype(np.float64):
+            assert index.query(q)[1] == pytest.approx(brute_force_nearest(data, q)[1], abs=0.0)
+
+    def test_ties_resolve_to_lowest_index(self):
+        """Duplicate reference frames must resolve like np.argmin (first occurrence)."""
+        base = _ref_features("squat")
+        data = np.concatenate([base, base[::-1], base])
+        index = KDTreeIndex.build(data, 8)
+        for q in _queries(base, n=50):
+            idx, _ = index.query(q)
+            assert idx == brute_force_nearest(data, q)[0]
+            assert idx < len(base)
+
+    def test_large_reference(self):
+        base = _ref_features("arm_vw")
+        rng = np.random.default_rng(1)
+        data = np.concatenate(
+            [base + rng.normal(0.0, 0.05, size=base.shape).astype(np.float32) for _ in range(8)]
+        )
+        index = load_or_build(data)
+        assert index is not None
+        for q in _queries(data, n=100):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+
+    def test_descent_prunes_above_the_leaves(self, monkeypatch):
+        base = _ref_features("arm_vw")
+        rng = np.random.default_rng(2)
+        data = np.concatenate(
+            [base + rng.normal(0.0, 0.05, size=base.shape).astype(np.float32) for _ in range(16)]
+        )
+        index = KDTreeIndex.build(data, 8)
+        pushed = []
+        real_push = ref_index.heapq.heappush
+        monkeypatch.setattr(
+            ref_index.heapq, "heappush", lambda heap, item: (pushed.append(item[1]), real_push(heap, item))
+        )
+        queries = _queries(data, n=40)[20:60]
+        for q in queries:
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+        n_nodes = index.bounds.shape[0]
+        # Only a small share of the tree is ever queued: whole subtrees are cut off
+        assert len(pushed) / len(queries) < n_nodes / 10
+        assert any(node < n_nodes // 2 for node in pushed)
+
+
+class TestPersistence:
+    def test_round_trip(self):
+        data = _ref_features("arm_abduction")
+        arrays = KDTreeIndex.build(data).to_arrays()
+        index = KDTreeIndex.from_arrays(data, arrays)
+        assert index is not None
+        for q in _queries(data, n=50):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+    def test_rejects_mismatched_arrays(self):
+        data = _ref_features("arm_abduction")
+        arrays = KDTreeIndex.build(data).to_arrays()
+        assert KDTreeIndex.from_arrays(data[:-1], arrays) is None
+        assert KDTreeIndex.from_arrays(data, {k: arrays[k] for k in TREE_KEYS[:-1]}) is None
+
+    def test_queries_read_memory_mapped_data_in_place(self, tmp_path):
+        base = _ref_features("arm_vw")
+        np.save(tmp_path / "ref.npy", np.concatenate([base, base + np.float32(0.01)]))
+        data = np.load(tmp_path / "ref.npy", mmap_mode="r")
+        index = KDTreeIndex.from_arrays(data, KDTreeIndex.build(data).to_arrays())
+        assert index is not None and index.data is data
+        # No reordered copy of the reference rows is kept next to the map
+        copies = [v for v in vars(index).values() if isinstance(v, np.ndarray) and v is not data and v.shape == data.shape]
+        assert not copies
+        for q in _queries(np.asarray(data), n=30):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+    def test_small_models_use_brute_force(self):
+        data = _ref_features("squat")
+        assert len(data) < INDEX_MIN_ROWS
+        assert load_or_build(data) is None
+
+    def test_index_threshold(self):
+        base = _ref_features("arm_vw")
+        data = np.concatenate([base, base[::-1]])[:INDEX_MIN_ROWS]
+        assert load_or_build(data[:-1]) is None
+        index = load_or_build(data)
+        assert index is not None
+        # float64 queries (as the engine sends) give brute force's exact answer
+        for q in _queries(data, n=50).astype(np.float64) + 1e-4:
+            assert index.query(q) == brute_force_nearest(data, q)
+
+    def test_train_persists_index(self, tmp_path):
+        out = tmp_path / "squat_reference_model.npz"
+        train(SKELETON_DIR / "ex6_reference.json", out)
+        model = np.load(out)
+        for key in TREE_KEYS:
+            assert key in model.files
+        data = model["ref_features_scaled"]
+        index = KDTreeIndex.from_arrays(data, model)
+        assert index is not None
+        for q in _queries(data, n=50):
+            assert index.query(q)[0] == brute_force_nearest(data, q)[0]
+
+    def test_engine_match_frame_paths_agree(self, tmp_path):
+        out = tmp_path / "squat_reference_model.npz"
+        train(SKELETON_DIR / "ex6_reference.json", out)
+        engine = CoachV2Engine(out)
+        data = engine.ref_features_scaled
+        engine.model.ref_index = KDTreeIndex.from_arrays(data, np.load(out))
+        assert engine.model.ref_index is not None
+        for q in _queries(data, n=50):
+            assert engine._match_frame(q)[0] == brute_force_nearest(data, q)[0]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Tests for the array-based exercise detectors (RepCounter, SixSevenDetector, HeuristicPainDetector)."""
+
+import math
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Ensure cv_backend is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rep_counter import (
+    HeuristicPainDetector,
+    RepCounter,
+    SixSevenDetector,
+    calculate_angle,
+    joint_angle,
+    landmarks_to_array,
+)
+
+W, H = 640, 480
+
+
+def _objects(arr: np.ndarray) -> list:
+    return [SimpleNamespace(x=float(r[0]), y=float(r[1]), z=float(r[2]), visibility=float(r[3])) for r in arr]
+
+
+def _pose(shoulder_deg: float) -> np.ndarray:
+    """(33, 4) pose with the right arm raised `shoulder_deg` from the torso."""
+    pose = np.zeros((33, 4), dtype=np.float32)
+    pose[:, 3] = 0.9
+    shoulder = np.array([0.5, 0.4])
+    pose[12, :2] = shoulder
+    pose[24, :2] = shoulder + (0.0, 0.3)
+    a = math.radians(shoulder_deg)
+    pose[14, :2] = shoulder + 0.2 * np.array([math.sin(a) * H / W, math.cos(a)])
+    return pose
+
+
+def _face(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    face = np.ones((478, 4), dtype=np.float32)
+    face[:, :3] = rng.uniform(0.3, 0.7, (478, 3))
+    return face
+
+
+class TestLandmarkArrays:
+    def test_objects_dicts_and_arrays_agree(self):
+        arr = _face(0)
+        dicts = [dict(x=float(r[0]), y=float(r[1]), z=float(r[2])) for r in arr]
+        np.testing.assert_array_equal(landmarks_to_array(_objects(arr)), arr)
+        np.testing.assert_array_equal(landmarks_to_array(dicts), arr)  # visibility defaults to 1
+        np.testing.assert_array_equal(landmarks_to_array(arr[:, :3]), arr)
+        assert landmarks_to_array(arr) is arr
+        assert landmarks_to_array([]).shape == (0, 4)
+
+    def test_joint_angle_matches_calculate_angle(self):
+        rng = np.random.default_rng(1)
+        for _ in range(50):
+            pts = rng.uniform(0, 640, (3, 2))
+            assert joint_angle(pts) == pytest.approx(calculate_angle(*map(tuple, pts)), abs=1e-9)
+        assert joint_angle(np.zeros((3, 2))) == 0.0
+
+
+class TestDetectors:
+    def test_rep_counter_counts_from_arrays(self):
+        counter = RepCounter("arm_abduction")
+        for deg in list(range(0, 160, 10)) + list(range(160, -10, -10)):
+            for _ in range(10):  # let the filter settle at each angle
+                status = counter.update(_pose(deg), W, H)
+        assert status["rep_count"] == 1
+        assert status["state"] == "rest" and status["angle"] < 10
+
+    def test_rep_counter_ignores_low_visibility(self):
+        counter = RepCounter("arm_abduction")
+        pose = _pose(90)
+        pose[14, 3] = 0.2
+        assert counter.update(pose, W, H)["angle"] == 0.0
+        assert counter.update(None, W, H)["state"] == "rest"
+
+    def test_array_and_object_inputs_match(self):
+        rng = np.random.default_rng(2)
+        pairs = [(RepCounter("squat"), RepCounter("squat")), (HeuristicPainDetector(), HeuristicPainDetector())]
+        for _ in range(20):
+            pose, face = _pose(rng.uniform(0, 170)), _face(int(rng.integers(1 << 30)))
+            assert pairs[0][0].update(pose, W, H) == pairs[0][1].update(_objects(pose), W, H)
+            a, b = pairs[1][0].update(face, W, H), pairs[1][1].update(_objects(face), W, H)
+            assert a[:2] == b[:2] and a[2:] == pytest.approx(b[2:])
+
+    def test_heuristic_ear_mar(self):
+        face = np.full((478, 4), 0.5, dtype=np.float32)
+        face[[33, 133, 362, 263], 0] = [0.40, 0.46, 0.54, 0.60]  # eye corners
+        face[[159, 145, 386, 374], 1] = [0.49, 0.51, 0.49, 0.51]  # lids
+        face[[78, 308], 0] = [0.45, 0.55]  # mouth corners
+        face[[13, 14], 1] = [0.50, 0.53]  # lips
+        _, _, ear, mar = HeuristicPainDetector().update(face, W, H)
+        assert ear == pytest.approx((0.02 * H) / (0.06 * W), rel=1e-4)
+        assert mar == pytest.approx((0.03 * H) / (0.10 * W), rel=1e-4)
+        assert HeuristicPainDetector().update(np.zeros((0, 4)), W, H) == ("normal", "", 0, 0)
+
+    def test_six_seven_on_arrays(self):
+        detector = SixSevenDetector(swap_threshold=3)
+        pose = _pose(0)
+        triggered = False
+        for k in range(6):
+            pose[15, 1], pose[16, 1] = (0.3, 0.6) if k % 2 else (0.6, 0.3)
+            triggered |= detector.update(pose, W, H)["triggered"]
+        assert triggered
@@ -12,6 +12,7 @@ from pathlib import Path
 
 import numpy as np
 
+from ref_index import KDTreeIndex
 from pt_coach.common import (
     FEATURE_LANDMARKS,
     PART_BY_INDEX,
@@ -125,6 +126,9 @@ def train(json_path: str | Path, output_npz: str | Path, output_meta: str | Path
         "exercise_code": spec.code,
         "exercise_source": str(json_path),
         "reference_frames": int(ref_norm.shape[0]),
+        "reference_fps": float(data.get("fps", 15.0)),
+        # One clean rep: the clip ends about where it started, so phase tracking wraps
+        "reference_loops": bool(np.linalg.norm(ref_scaled[-1] - ref_scaled[0]) <= dist_p90),
         "feature_landmarks": FEATURE_LANDMARKS,
         "correction_landmarks": correction_landmarks,
         "distance_calibration": {
@@ -151,6 +155,7 @@ def train(json_path: str | Path, output_npz: str | Path, output_meta: str | Path
         ref_features_scaled=ref_scaled,
         feat_mean=feat_mean,
         feat_std=feat_std,
+        **KDTreeIndex.build(ref_scaled).to_arrays(),
     )
     output_meta.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
 
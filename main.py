@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-from dataclasses import dataclass, replace
+from dataclasses import dataclass, field
 import math
 from pathlib import Path
 import time
-from typing import Dict, Mapping, Optional, Tuple
+import uuid
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import cv2
 import mediapipe as mp
@@ -14,14 +15,24 @@ import numpy as np
 
 import config
 from backend.skeleton_adapter import (
+    JOINT_INDEX,
+    JOINT_NAMES,
     MEDIAPIPE_INDEX_BY_JOINT,
-    SkeletonFrame,
-    adapt_ios_payload,
+    NUM_JOINTS,
+    AnySkeletonFrame,
+    ArraySkeletonFrame,
+    adapt_ios_payload_arrays,
     adapt_mediapipe_pose_landmarks,
-    reconstruct_camera_points_3d,
+    as_array_frame,
+    project_to_normalized_2d,
+    reconstruct_camera_xyz,
     to_pipeline_payload,
 )
+from backend.pose_metrics import DEFAULT_METRIC_TABLE, MetricTable, metric_table_for_template
+from backend.session_chunks import SessionChunkEncoder
+from backend.session_writer import SessionLogWriter
 from backend.skeleton_preview import IOSSkeletonPreview
+from backend.stream_stages import PipelineStage, format_stage_stats
 from backend.websocket_server import (
     IOSWebSocketConfig,
     build_websocket_uri,
@@ -50,60 +61,23 @@ except Exception:  # pragma: no cover - optional dependency at runtime
     MPRunningMode = None
 
 
-def _angle_3d(
-    point_a: Tuple[float, float, float],
-    point_b: Tuple[float, float, float],
-    point_c: Tuple[float, float, float],
-) -> float:
-    bax, bay, baz = point_a[0] - point_b[0], point_a[1] - point_b[1], point_a[2] - point_b[2]
-    bcx, bcy, bcz = point_c[0] - point_b[0], point_c[1] - point_b[1], point_c[2] - point_b[2]
-
-    dot = (bax * bcx) + (bay * bcy) + (baz * bcz)
-    norm_ba = math.sqrt((bax * bax) + (bay * bay) + (baz * baz))
-    norm_bc = math.sqrt((bcx * bcx) + (bcy * bcy) + (bcz * bcz))
-
-    if norm_ba < 1e-6 or norm_bc < 1e-6:
-        return 0.0
-
-    cosine = max(min(dot / (norm_ba * norm_bc), 1.0), -1.0)
-    return math.degrees(math.acos(cosine))
-
-
-def _distance_3d(
-    point_a: Tuple[float, float, float],
-    point_b: Tuple[float, float, float],
-) -> float:
-    dx = point_a[0] - point_b[0]
-    dy = point_a[1] - point_b[1]
-    dz = point_a[2] - point_b[2]
-    return math.sqrt((dx * dx) + (dy * dy) + (dz * dz))
-
-
-def _joint_distance_from_frame(frame: SkeletonFrame, joint_name: str) -> Optional[float]:
-    camera_point = frame.camera_points_3d.get(joint_name)
-    if camera_point is not None:
-        depth = float(camera_point[2])
-        if depth > 0.0 and math.isfinite(depth):
-            return depth
-
-    depth = frame.point_depths_m.get(joint_name)
-    if depth is not None:
-        depth_f = float(depth)
-        if depth_f > 0.0 and math.isfinite(depth_f):
-            return depth_f
-
-    # Fallback: camera-to-joint world distance when per-joint LiDAR depth is unavailable.
-    camera_position = frame.camera_position
-    joint_world = frame.joints_3d.get(joint_name)
-    if camera_position is None or joint_world is None:
-        return None
-    dx = float(joint_world[0] - camera_position[0])
-    dy = float(joint_world[1] - camera_position[1])
-    dz = float(joint_world[2] - camera_position[2])
-    distance_m = math.sqrt((dx * dx) + (dy * dy) + (dz * dz))
-    if distance_m <= 0.0 or not math.isfinite(distance_m):
-        return None
-    return distance_m
+def _joint_distances_m(frame: ArraySkeletonFrame) -> np.ndarray:
+    """Camera-to-joint distance per joint slot (NaN where unknown)."""
+    camera_z = frame.camera_xyz[:, 2]
+    depths = frame.depths_m
+    with np.errstate(invalid="ignore"):
+        from_camera = frame.camera_mask & (camera_z > 0.0) & (camera_z < np.inf)
+        from_depth = frame.depths_mask & (depths > 0.0) & (depths < np.inf)
+        distances = np.where(from_camera, camera_z, np.where(from_depth, depths, np.nan))
+
+        # Fallback: camera-to-joint world distance when per-joint LiDAR depth is unavailable.
+        if frame.camera_position is not None:
+            delta = frame.joints_xyz - frame.camera_position
+            dx, dy, dz = delta.T
+            world = np.sqrt((dx * dx) + (dy * dy) + (dz * dz))
+            fallback = frame.joints_mask & (world > 0.0) & (world < np.inf) & ~(from_camera | from_depth)
+            distances = np.where(fallback, world, distances)
+    return distances
 
 
 @dataclass
@@ -134,44 +108,27 @@ class ArmDepthMotionDetector:
         }
 
     @staticmethod
-    def _joint_depth_from_frame(frame: SkeletonFrame, joint_name: str) -> Optional[float]:
-        return _joint_distance_from_frame(frame, joint_name)
-
-    @classmethod
-    def _arm_distance_for_side(cls, frame: SkeletonFrame, side: str) -> Optional[float]:
-        shoulder_name = f"{side}_shoulder"
-        elbow_name = f"{side}_elbow"
-        wrist_name = f"{side}_wrist"
-        distance_candidates: list[float] = []
-        for joint_name in (wrist_name, elbow_name):
-            joint_depth = cls._joint_depth_from_frame(frame, joint_name)
-            if joint_depth is not None:
-                distance_candidates.append(joint_depth)
+    def _limb_distance(distances: List[float], distal: Tuple[str, str], proximal: str) -> Optional[float]:
+        # Mean of the distal joints' distances, else the proximal joint's
+        distance_candidates = [
+            distances[JOINT_INDEX[joint_name]]
+            for joint_name in distal
+            if not math.isnan(distances[JOINT_INDEX[joint_name]])
+        ]
         if not distance_candidates:
-            shoulder_depth = cls._joint_depth_from_frame(frame, shoulder_name)
-            if shoulder_depth is not None:
-                distance_candidates.append(shoulder_depth)
-        if not distance_candidates:
-            return None
+            proximal_distance = distances[JOINT_INDEX[proximal]]
+            if math.isnan(proximal_distance):
+                return None
+            distance_candidates.append(proximal_distance)
         return float(sum(distance_candidates) / float(len(distance_candidates)))
 
     @classmethod
-    def _leg_distance_for_side(cls, frame: SkeletonFrame, side: str) -> Optional[float]:
-        hip_name = f"{side}_hip"
-        knee_name = f"{side}_knee"
-        ankle_name = f"{side}_ankle"
-        distance_candidates: list[float] = []
-        for joint_name in (ankle_name, knee_name):
-            joint_depth = cls._joint_depth_from_frame(frame, joint_name)
-            if joint_depth is not None:
-                distance_candidates.append(joint_depth)
-        if not distance_candidates:
-            hip_depth = cls._joint_depth_from_frame(frame, hip_name)
-            if hip_depth is not None:
-                distance_candidates.append(hip_depth)
-        if not distance_candidates:
-            return None
-        return float(sum(distance_candidates) / float(len(distance_candidates)))
+    def _arm_distance_for_side(cls, distances: List[float], side: str) -> Optional[float]:
+        return cls._limb_distance(distances, (f"{side}_wrist", f"{side}_elbow"), f"{side}_shoulder")
+
+    @classmethod
+    def _leg_distance_for_side(cls, distances: List[float], side: str) -> Optional[float]:
+        return cls._limb_distance(distances, (f"{side}_ankle", f"{side}_knee"), f"{side}_hip")
 
     def _update_state(self, state: ArmMotionState, rel_depth_m: float, timestamp: float) -> int:
         if state.filtered_rel_depth_m is None or state.previous_timestamp is None:
@@ -228,13 +185,14 @@ class ArmDepthMotionDetector:
         state.last_velocity_mps = velocity
         return velocity_sign
 
-    def update(self, frame: SkeletonFrame) -> Dict[str, float]:
+    def update(self, frame: ArraySkeletonFrame, distances: Optional[np.ndarray] = None) -> Dict[str, float]:
         if frame.timestamp <= 0.0:
             return {}
+        distance_list = (_joint_distances_m(frame) if distances is None else distances).tolist()
 
         output: Dict[str, float] = {}
         for side in ("left", "right"):
-            arm_distance_m = self._arm_distance_for_side(frame, side)
+            arm_distance_m = self._arm_distance_for_side(distance_list, side)
             if arm_distance_m is None:
                 continue
             state = self.arm_states[side]
@@ -252,7 +210,7 @@ class ArmDepthMotionDetector:
             output[f"{side}_arm_depth_direction"] = direction
 
         for side in ("left", "right"):
-            leg_distance_m = self._leg_distance_for_side(frame, side)
+            leg_distance_m = self._leg_distance_for_side(distance_list, side)
             if leg_distance_m is None:
                 continue
             state = self.leg_states[side]
@@ -271,74 +229,73 @@ class ArmDepthMotionDetector:
         return output
 
 
-@dataclass
-class BodyPartDistanceState:
-    filtered_distance_m: Optional[float] = None
-    previous_timestamp: Optional[float] = None
-    last_velocity_mps: float = 0.0
+# Joint slots in name order, matching the metric order of the per-name tracker
+_SLOTS_BY_NAME = np.argsort(np.asarray(JOINT_NAMES))
+_DISTANCE_METRIC_NAMES = tuple(
+    (f"{JOINT_NAMES[index]}_distance_m", f"{JOINT_NAMES[index]}_distance_velocity_mps") for index in range(NUM_JOINTS)
+)
 
 
 class BodyPartDistanceTracker:
+    """Smoothed camera distance and velocity for every joint slot, updated for all joints at once."""
+
     def __init__(self) -> None:
         self.filter_alpha = config.ARM_DEPTH_FILTER_ALPHA
         self.max_per_frame_jump_m = 0.35
-        self.states: Dict[str, BodyPartDistanceState] = {}
-
-    def _update_state(self, joint_name: str, distance_m: float, timestamp: float) -> BodyPartDistanceState:
-        state = self.states.get(joint_name)
-        if state is None:
-            state = BodyPartDistanceState(
-                filtered_distance_m=distance_m,
-                previous_timestamp=timestamp,
-                last_velocity_mps=0.0,
-            )
-            self.states[joint_name] = state
-            return state
-
-        previous_filtered = state.filtered_distance_m
-        previous_timestamp = state.previous_timestamp
-        if previous_filtered is None or previous_timestamp is None:
-            state.filtered_distance_m = distance_m
-            state.previous_timestamp = timestamp
-            state.last_velocity_mps = 0.0
-            return state
-
-        dt = timestamp - previous_timestamp
-        if dt <= 1e-6:
-            dt = 1e-6
-
-        clamped_distance = min(
-            max(distance_m, previous_filtered - self.max_per_frame_jump_m),
+        # Per joint slot; NaN filtered distance means the joint has not been seen yet
+        self.filtered_distance_m = np.full(NUM_JOINTS, np.nan)
+        self.previous_timestamp = np.zeros(NUM_JOINTS)
+        self.last_velocity_mps = np.zeros(NUM_JOINTS)
+
+    def _update_state(self, valid: np.ndarray, distances: np.ndarray, timestamp: float) -> None:
+        previous_filtered = self.filtered_distance_m
+        first = np.isnan(previous_filtered)
+        dt = np.maximum(timestamp - self.previous_timestamp, 1e-6)
+        clamped_distance = np.minimum(
+            np.maximum(distances, previous_filtered - self.max_per_frame_jump_m),
             previous_filtered + self.max_per_frame_jump_m,
         )
         filtered = (previous_filtered * (1.0 - self.filter_alpha)) + (clamped_distance * self.filter_alpha)
-        state.last_velocity_mps = (filtered - previous_filtered) / dt
-        state.filtered_distance_m = filtered
-        state.previous_timestamp = timestamp
-        return state
+        velocity = (filtered - previous_filtered) / dt
+        # Joints seen for the first time start at their raw distance
+        self.filtered_distance_m = np.where(valid, np.where(first, distances, filtered), previous_filtered)
+        self.last_velocity_mps = np.where(valid, np.where(first, 0.0, velocity), self.last_velocity_mps)
+        self.previous_timestamp = np.where(valid, timestamp, self.previous_timestamp)
 
-    def update(self, frame: SkeletonFrame) -> Dict[str, float]:
+    def update(self, frame: ArraySkeletonFrame, distances: Optional[np.ndarray] = None) -> Dict[str, float]:
         if frame.timestamp <= 0.0:
             return {}
         if not frame.source.startswith("ios"):
             return {}
-        if not frame.joints_3d:
+        if not frame.joints_mask.any():
             return {}
+        if distances is None:
+            distances = _joint_distances_m(frame)
 
+        valid = frame.joints_mask & ~np.isnan(distances)
+        self._update_state(valid, distances, frame.timestamp)
         metrics: Dict[str, float] = {}
-        for joint_name in sorted(frame.joints_3d.keys()):
-            distance_m = _joint_distance_from_frame(frame, joint_name)
-            if distance_m is None:
-                continue
-            state = self._update_state(joint_name, distance_m, frame.timestamp)
-            filtered = state.filtered_distance_m
-            if filtered is None:
-                continue
-            metrics[f"{joint_name}_distance_m"] = float(filtered)
-            metrics[f"{joint_name}_distance_velocity_mps"] = float(state.last_velocity_mps)
+        filtered = self.filtered_distance_m.tolist()
+        velocity = self.last_velocity_mps.tolist()
+        for index in _SLOTS_BY_NAME[valid[_SLOTS_BY_NAME]].tolist():
+            distance_name, velocity_name = _DISTANCE_METRIC_NAMES[index]
+            metrics[distance_name] = filtered[index]
+            metrics[velocity_name] = velocity[index]
         return metrics
 
 
+def _session_record(entry: Tuple[ArraySkeletonFrame, Dict[str, float], str]) -> Dict[str, object]:
+    frame, metrics, feedback = entry
+    return {
+        "timestamp": frame.timestamp,
+        "exercise": frame.exercise,
+        "source": frame.source,
+        "metrics": metrics,
+        "feedback": feedback,
+        "skeleton": to_pipeline_payload(frame),
+    }
+
+
 class ExercisePipeline:
     """
     Shared processor for webcam and iOS LiDAR skeleton streams.
@@ -347,7 +304,10 @@ class ExercisePipeline:
     def __init__(self) -> None:
         self.frame_index = 0
         self.templates_cache: Dict[str, Dict[str, object]] = {}
-        self.previous_ios_joints_3d: Optional[Dict[str, Tuple[float, float, float]]] = None
+        # Exercise -> default metrics plus the template's own (compiled once)
+        self.metric_tables: Dict[str, MetricTable] = {}
+        # Stabilized joint positions and mask of the previous iOS frame
+        self.previous_ios_joints: Optional[Tuple[np.ndarray, np.ndarray]] = None
         self.arm_depth_motion_detector = ArmDepthMotionDetector()
         self.body_part_distance_tracker = BodyPartDistanceTracker()
 
@@ -355,6 +315,8 @@ class ExercisePipeline:
         self.db = None
         self.sessions_collection = None
         self.templates_collection = None
+        self.session_writer: Optional[SessionLogWriter] = None
+        self.session_id = uuid.uuid4().hex
 
         if MongoClient and config.MONGODB_URI:
             try:
@@ -366,73 +328,71 @@ class ExercisePipeline:
                 self.db = self.mongo_client[config.MONGODB_DATABASE]
                 self.sessions_collection = self.db[config.SESSIONS_COLLECTION]
                 self.templates_collection = self.db[config.EXERCISE_TEMPLATES_COLLECTION]
-                print("[MongoDB] Connected.")
+                if config.SESSION_LOG_FORMAT == "chunks":
+                    encode = SessionChunkEncoder(self.session_id, chunk_seconds=config.SESSION_CHUNK_SECONDS)
+                    self.sessions_collection.create_index([("session_id", 1), ("chunk_index", 1)])
+                else:
+                    encode = _session_record
+                self.session_writer = SessionLogWriter(
+                    self.sessions_collection,
+                    encode=encode,
+                    batch_size=config.SESSION_LOG_BATCH_SIZE,
+                    flush_interval_sec=config.SESSION_LOG_FLUSH_INTERVAL_SEC,
+                    max_queue=config.SESSION_LOG_QUEUE_SIZE,
+                    overflow=config.SESSION_LOG_OVERFLOW,
+                    sample_every=config.SESSION_LOG_SAMPLE_EVERY,
+                )
+                print(f"[MongoDB] Connected. Logging session {self.session_id} as {config.SESSION_LOG_FORMAT}.")
             except Exception as error:
                 print(f"[MongoDB] Disabled ({error})")
                 self.mongo_client = None
                 self.db = None
 
-    @staticmethod
-    def _project_joints_to_normalized_2d(
-        joints_3d: Mapping[str, Tuple[float, float, float]],
-    ) -> Dict[str, Tuple[float, float]]:
-        if not joints_3d:
-            return {}
-        xs = [coords[0] for coords in joints_3d.values()]
-        ys = [coords[1] for coords in joints_3d.values()]
-        min_x, max_x = min(xs), max(xs)
-        min_y, max_y = min(ys), max(ys)
-        width = max(max_x - min_x, 1e-6)
-        height = max(max_y - min_y, 1e-6)
-        return {
-            name: ((coords[0] - min_x) / width, (coords[1] - min_y) / height)
-            for name, coords in joints_3d.items()
-        }
-
-    def _stabilize_ios_frame(self, frame: SkeletonFrame) -> SkeletonFrame:
+    def _stabilize_ios_frame(self, frame: ArraySkeletonFrame) -> ArraySkeletonFrame:
         if config.IOS_DISABLE_JOINT_STABILIZATION:
             return frame
         if frame.source not in {"ios_lidar", "ios_lidar+mediapipe"}:
             return frame
-        if not frame.joints_3d:
+        if not frame.joints_mask.any():
             return frame
 
-        previous = self.previous_ios_joints_3d
-        self.previous_ios_joints_3d = dict(frame.joints_3d)
-        if not previous:
+        current, mask = frame.joints_xyz, frame.joints_mask
+        previous = self.previous_ios_joints
+        self.previous_ios_joints = (current.copy(), mask.copy())
+        if previous is None:
             return frame
 
         alpha = config.IOS_JOINT_SMOOTHING_ALPHA
         max_jump_m = config.IOS_JOINT_MAX_JUMP_M
-        stabilized: Dict[str, Tuple[float, float, float]] = {}
-        for joint_name, current in frame.joints_3d.items():
-            prev = previous.get(joint_name)
-            if prev is None:
-                stabilized[joint_name] = current
-                continue
-            if _distance_3d(current, prev) > max_jump_m:
-                stabilized[joint_name] = prev
-                continue
-            stabilized[joint_name] = (
-                (prev[0] * (1.0 - alpha)) + (current[0] * alpha),
-                (prev[1] * (1.0 - alpha)) + (current[1] * alpha),
-                (prev[2] * (1.0 - alpha)) + (current[2] * alpha),
-            )
-
-        self.previous_ios_joints_3d = dict(stabilized)
+        previous_xyz, previous_mask = previous
+        tracked = mask & previous_mask
+        delta = current - previous_xyz
+        jump_m = np.sqrt((delta[:, 0] * delta[:, 0]) + (delta[:, 1] * delta[:, 1]) + (delta[:, 2] * delta[:, 2]))
+        # Implausible jumps keep the previous position, the rest are smoothed
+        held = (jump_m > max_jump_m)[:, None]
+        smoothed = (previous_xyz * (1.0 - alpha)) + (current * alpha)
+        stabilized = np.where(tracked[:, None], np.where(held, previous_xyz, smoothed), current)
+
+        self.previous_ios_joints = (stabilized, mask.copy())
+        extra_joints = frame.extras.get("joints_3d") or {}
         all_joints = dict(frame.all_joints_3d)
-        for joint_name, coords in stabilized.items():
-            all_joints[joint_name] = coords
-        keypoints_2d = self._project_joints_to_normalized_2d(stabilized)
-        return replace(
-            frame,
-            joints_3d=stabilized,
+        present = np.flatnonzero(mask).tolist()
+        all_joints.update(zip([JOINT_NAMES[index] for index in present], map(tuple, stabilized[present].tolist())))
+        all_joints.update(extra_joints)
+        keypoints_xy, keypoints_mask, extra_keypoints = project_to_normalized_2d(stabilized, mask, extra_joints)
+        extras = {name: values for name, values in frame.extras.items() if name != "keypoints_2d"}
+        if extra_keypoints:
+            extras["keypoints_2d"] = extra_keypoints
+        return frame.with_channels(
+            joints_xyz=stabilized,
             all_joints_3d=all_joints,
-            keypoints_2d=keypoints_2d,
+            keypoints_xy=keypoints_xy,
+            keypoints_mask=keypoints_mask,
+            extras=extras,
         )
 
-    def evaluate_frame(self, frame: SkeletonFrame) -> Tuple[str, Dict[str, float]]:
-        frame = self._stabilize_ios_frame(frame)
+    def evaluate_frame(self, frame: AnySkeletonFrame) -> Tuple[str, Dict[str, float]]:
+        frame = self._stabilize_ios_frame(as_array_frame(frame))
         metrics = self._extract_metrics(frame)
         if frame.arm_head_distance_m is not None:
             metrics["arm_head_distance_m"] = float(frame.arm_head_distance_m)
@@ -441,106 +401,31 @@ class ExercisePipeline:
         if frame.arm_head_state in {"near", "mid", "far"}:
             state_index = {"near": 0.0, "mid": 1.0, "far": 2.0}[frame.arm_head_state]
             metrics["arm_head_state_idx"] = state_index
-        metrics.update(self.body_part_distance_tracker.update(frame))
-        metrics.update(self.arm_depth_motion_detector.update(frame))
+        distances = _joint_distances_m(frame)
+        metrics.update(self.body_part_distance_tracker.update(frame, distances))
+        metrics.update(self.arm_depth_motion_detector.update(frame, distances))
         feedback = self._compare_with_template(frame.exercise, metrics)
         self._log_session(frame, metrics, feedback)
         self.frame_index += 1
         return feedback, metrics
 
-    def process_frame(self, frame: SkeletonFrame) -> str:
+    def process_frame(self, frame: AnySkeletonFrame) -> str:
         feedback, _ = self.evaluate_frame(frame)
         return feedback
 
-    def _extract_metrics(self, frame: SkeletonFrame) -> Dict[str, float]:
-        joints = frame.joints_3d
-        metrics: Dict[str, float] = {}
-
-        if all(key in joints for key in ("left_hip", "left_knee", "left_ankle")):
-            metrics["left_knee_angle_deg"] = _angle_3d(
-                joints["left_hip"], joints["left_knee"], joints["left_ankle"]
-            )
+    def _extract_metrics(self, frame: ArraySkeletonFrame) -> Dict[str, float]:
+        return self._metric_table(frame.exercise).frame_metrics(frame.joints_xyz, frame.joints_mask)
 
-        if all(key in joints for key in ("right_hip", "right_knee", "right_ankle")):
-            metrics["right_knee_angle_deg"] = _angle_3d(
-                joints["right_hip"], joints["right_knee"], joints["right_ankle"]
-            )
-
-        if all(key in joints for key in ("left_shoulder", "left_hip", "left_knee")):
-            metrics["left_hip_angle_deg"] = _angle_3d(
-                joints["left_shoulder"], joints["left_hip"], joints["left_knee"]
-            )
-
-        if all(key in joints for key in ("right_shoulder", "right_hip", "right_knee")):
-            metrics["right_hip_angle_deg"] = _angle_3d(
-                joints["right_shoulder"], joints["right_hip"], joints["right_knee"]
-            )
-
-        if all(key in joints for key in ("left_shoulder", "left_elbow", "left_wrist")):
-            metrics["left_elbow_angle_deg"] = _angle_3d(
-                joints["left_shoulder"], joints["left_elbow"], joints["left_wrist"]
-            )
-
-        if all(key in joints for key in ("right_shoulder", "right_elbow", "right_wrist")):
-            metrics["right_elbow_angle_deg"] = _angle_3d(
-                joints["right_shoulder"], joints["right_elbow"], joints["right_wrist"]
-            )
-
-        if all(key in joints for key in ("left_shoulder", "right_shoulder", "root")):
-            shoulder_center = (
-                (joints["left_shoulder"][0] + joints["right_shoulder"][0]) / 2.0,
-                (joints["left_shoulder"][1] + joints["right_shoulder"][1]) / 2.0,
-                (joints["left_shoulder"][2] + joints["right_shoulder"][2]) / 2.0,
-            )
-            root = joints["root"]
-            metrics["torso_forward_offset_m"] = shoulder_center[2] - root[2]
-
-        if all(key in joints for key in ("left_shoulder", "right_shoulder")):
-            ls, rs = joints["left_shoulder"], joints["right_shoulder"]
-            metrics["shoulder_width_m"] = math.sqrt(
-                ((ls[0] - rs[0]) ** 2) + ((ls[1] - rs[1]) ** 2) + ((ls[2] - rs[2]) ** 2)
-            )
-
-        if all(key in joints for key in ("left_hip", "right_hip")):
-            lh, rh = joints["left_hip"], joints["right_hip"]
-            metrics["hip_width_m"] = math.sqrt(
-                ((lh[0] - rh[0]) ** 2) + ((lh[1] - rh[1]) ** 2) + ((lh[2] - rh[2]) ** 2)
-            )
-
-        if all(key in joints for key in ("left_ankle", "right_ankle")):
-            la, ra = joints["left_ankle"], joints["right_ankle"]
-            metrics["stance_width_m"] = _distance_3d(la, ra)
-
-        if all(key in joints for key in ("left_knee", "left_ankle", "left_foot_index")):
-            metrics["left_ankle_angle_deg"] = _angle_3d(
-                joints["left_knee"], joints["left_ankle"], joints["left_foot_index"]
-            )
-
-        if all(key in joints for key in ("right_knee", "right_ankle", "right_foot_index")):
-            metrics["right_ankle_angle_deg"] = _angle_3d(
-                joints["right_knee"], joints["right_ankle"], joints["right_foot_index"]
-            )
-
-        distance_pairs = (
-            ("left_upper_arm_length_m", "left_shoulder", "left_elbow"),
-            ("right_upper_arm_length_m", "right_shoulder", "right_elbow"),
-            ("left_forearm_length_m", "left_elbow", "left_wrist"),
-            ("right_forearm_length_m", "right_elbow", "right_wrist"),
-            ("left_thigh_length_m", "left_hip", "left_knee"),
-            ("right_thigh_length_m", "right_hip", "right_knee"),
-            ("left_shin_length_m", "left_knee", "left_ankle"),
-            ("right_shin_length_m", "right_knee", "right_ankle"),
-            ("left_side_body_length_m", "left_shoulder", "left_hip"),
-            ("right_side_body_length_m", "right_shoulder", "right_hip"),
-            ("left_foot_length_m", "left_heel", "left_foot_index"),
-            ("right_foot_length_m", "right_heel", "right_foot_index"),
-            ("head_to_neck_m", "nose", "neck"),
-        )
-        for metric_name, start_joint, end_joint in distance_pairs:
-            if start_joint in joints and end_joint in joints:
-                metrics[metric_name] = _distance_3d(joints[start_joint], joints[end_joint])
-
-        return metrics
+    def _metric_table(self, exercise: str) -> MetricTable:
+        table = self.metric_tables.get(exercise)
+        if table is None:
+            try:
+                table = metric_table_for_template(self._load_template(exercise))
+            except ValueError as error:
+                print(f"[Metrics] Ignoring custom metrics of template '{exercise}': {error}")
+                table = DEFAULT_METRIC_TABLE
+            self.metric_tables[exercise] = table
+        return table
 
     def _compare_with_template(self, exercise: str, metrics: Dict[str, float]) -> str:
         if not metrics:
@@ -622,21 +507,18 @@ class ExercisePipeline:
         self.templates_cache[exercise] = doc
         return doc
 
-    def _log_session(self, frame: SkeletonFrame, metrics: Dict[str, float], feedback: str) -> None:
-        if self.sessions_collection is None:
+    def _log_session(self, frame: ArraySkeletonFrame, metrics: Dict[str, float], feedback: str) -> None:
+        if self.session_writer is None:
             return
         if (self.frame_index % config.LOG_EVERY_N_FRAMES) != 0:
             return
+        # Serialized to a Mongo record on the writer thread
+        self.session_writer.submit((frame, metrics, feedback))
 
-        record = {
-            "timestamp": frame.timestamp,
-            "exercise": frame.exercise,
-            "source": frame.source,
-            "metrics": metrics,
-            "feedback": feedback,
-            "skeleton": to_pipeline_payload(frame),
-        }
-        self.sessions_collection.insert_one(record)
+    def close(self) -> None:
+        if self.session_writer is not None:
+            self.session_writer.close(timeout_sec=config.SESSION_LOG_CLOSE_TIMEOUT_SEC)
+            self.session_writer = None
 
 
 class MediaPipeFusionEngine:
@@ -740,61 +622,118 @@ class MediaPipeFusionEngine:
 
 
 def _fuse_ios_and_mediapipe(
-    ios_frame: SkeletonFrame,
+    ios_frame: ArraySkeletonFrame,
     mediapipe_joints: Mapping[str, Mapping[str, float]],
-) -> SkeletonFrame:
-    fused_keypoints = dict(ios_frame.keypoints_2d)
-    lidar_depth_joints = set(ios_frame.point_depths_m.keys())
-
+) -> ArraySkeletonFrame:
+    indices: List[int] = []
+    points: List[Tuple[float, float]] = []
     for joint_name, mp_joint in mediapipe_joints.items():
-        visibility = float(mp_joint.get("visibility", 0.0))
-        if visibility < config.MEDIAPIPE_FUSION_VISIBILITY_MIN:
+        index = JOINT_INDEX.get(joint_name)
+        if index is None or float(mp_joint.get("visibility", 0.0)) < config.MEDIAPIPE_FUSION_VISIBILITY_MIN:
             continue
+        indices.append(index)
+        points.append((float(mp_joint["x"]), float(mp_joint["y"])))
+    mp_xy = np.zeros((NUM_JOINTS, 2))
+    mp_visible = np.zeros(NUM_JOINTS, dtype=bool)
+    if indices:
+        mp_xy[indices] = points
+        mp_visible[indices] = True
+
+    # Keep LiDAR-projected keypoints authoritative wherever a valid depth sample exists.
+    candidates = mp_visible & ~ios_frame.depths_mask
+    ios_xy, ios_mask = ios_frame.keypoints_xy, ios_frame.keypoints_mask
+    offset = mp_xy - ios_xy
+    delta = np.hypot(offset[:, 0], offset[:, 1])
+    alpha = config.MEDIAPIPE_FUSION_WEIGHT
+    if config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA > 1e-6:
+        alpha = alpha * np.maximum(0.0, 1.0 - (delta / config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA))
+    blend = candidates & ios_mask & (delta <= config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA) & (alpha > 0.0)
+    weight = np.asarray(alpha)[..., None]
+    blended = ((1.0 - weight) * ios_xy) + (weight * mp_xy)
+    # MediaPipe fills joints iOS did not project and blends into nearby ones
+    fused_keypoints = np.where(
+        blend[:, None], blended, np.where((candidates & ~ios_mask)[:, None], mp_xy, ios_xy)
+    )
+    fused_mask = ios_mask | candidates
+
+    reconstructed_xyz, reconstructed_mask = reconstruct_camera_xyz(
+        fused_keypoints,
+        fused_mask,
+        ios_frame.depths_m,
+        ios_frame.depths_mask,
+        ios_frame.camera_intrinsics,
+        ios_frame.camera_resolution,
+    )
+    # Do not overwrite LiDAR-sourced camera points.
+    fill = reconstructed_mask & ~ios_frame.camera_mask
+    fused_camera_xyz = np.where(fill[:, None], reconstructed_xyz, ios_frame.camera_xyz)
+
+    return ios_frame.with_channels(
+        keypoints_xy=fused_keypoints,
+        keypoints_mask=fused_mask,
+        camera_xyz=fused_camera_xyz,
+        camera_mask=ios_frame.camera_mask | fill,
+        source="ios_lidar+mediapipe",
+    )
 
-        # Keep LiDAR-projected keypoints authoritative wherever a valid depth sample exists.
-        if joint_name in lidar_depth_joints:
-            continue
 
-        mp_x = float(mp_joint["x"])
-        mp_y = float(mp_joint["y"])
-        if joint_name not in fused_keypoints:
-            fused_keypoints[joint_name] = (mp_x, mp_y)
+@dataclass
+class IOSStreamItem:
+    """One iOS payload as it moves through the decode -> fusion -> metrics -> present stages."""
+
+    frame: ArraySkeletonFrame
+    waiting_for_depth: bool = False
+    mp_joints: Optional[Dict[str, Dict[str, float]]] = None
+    feedback: str = ""
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+
+def _print_ios_metrics(frame: ArraySkeletonFrame, metrics: Mapping[str, float], feedback: str) -> None:
+    arm_parts = []
+    left_arm_distance = metrics.get("left_arm_distance_m")
+    right_arm_distance = metrics.get("right_arm_distance_m")
+    left_leg_distance = metrics.get("left_leg_distance_m")
+    right_leg_distance = metrics.get("right_leg_distance_m")
+    arm_head_distance = metrics.get("arm_head_distance_m")
+    arm_head_quality = metrics.get("arm_head_quality")
+    if left_arm_distance is not None:
+        arm_parts.append(f"L_arm_dist={float(left_arm_distance):.3f}m")
+    if right_arm_distance is not None:
+        arm_parts.append(f"R_arm_dist={float(right_arm_distance):.3f}m")
+    if left_leg_distance is not None:
+        arm_parts.append(f"L_leg_dist={float(left_leg_distance):.3f}m")
+    if right_leg_distance is not None:
+        arm_parts.append(f"R_leg_dist={float(right_leg_distance):.3f}m")
+    if arm_head_distance is not None:
+        arm_parts.append(f"arm_head={float(arm_head_distance):.3f}m")
+    if frame.arm_head_state is not None:
+        arm_parts.append(f"arm_head_state={frame.arm_head_state}")
+    if arm_head_quality is not None:
+        arm_parts.append(f"arm_head_q={float(arm_head_quality):.2f}")
+    if frame.arm_head_source is not None:
+        arm_parts.append(f"arm_head_src={frame.arm_head_source}")
+    joint_distance_parts = []
+    for metric_name in sorted(metrics.keys()):
+        if not metric_name.endswith("_distance_m"):
             continue
-        ios_x, ios_y = fused_keypoints[joint_name]
-        delta = math.hypot(mp_x - ios_x, mp_y - ios_y)
-        if delta > config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA:
+        if metric_name in {"left_arm_distance_m", "right_arm_distance_m", "arm_head_distance_m"}:
             continue
-        alpha = config.MEDIAPIPE_FUSION_WEIGHT
-        if config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA > 1e-6:
-            distance_weight = max(
-                0.0,
-                1.0 - (delta / config.MEDIAPIPE_FUSION_MAX_JOINT_DELTA),
-            )
-            alpha *= distance_weight
-        if alpha <= 0.0:
+        value = metrics.get(metric_name)
+        if value is None:
             continue
-        fused_keypoints[joint_name] = (
-            ((1.0 - alpha) * ios_x) + (alpha * mp_x),
-            ((1.0 - alpha) * ios_y) + (alpha * mp_y),
-        )
-
-    reconstructed_camera_points = reconstruct_camera_points_3d(
-        keypoints_2d=fused_keypoints,
-        point_depths_m=ios_frame.point_depths_m,
-        camera_intrinsics=ios_frame.camera_intrinsics,
-        camera_resolution=ios_frame.camera_resolution,
-    )
-    fused_camera_points_3d = dict(ios_frame.camera_points_3d)
-    for joint_name, coords in reconstructed_camera_points.items():
-        # Do not overwrite LiDAR-sourced camera points.
-        if joint_name not in fused_camera_points_3d:
-            fused_camera_points_3d[joint_name] = coords
-
-    return replace(
-        ios_frame,
-        keypoints_2d=fused_keypoints,
-        camera_points_3d=fused_camera_points_3d,
-        source="ios_lidar+mediapipe",
+        joint_distance_parts.append(f"{metric_name}={float(value):.3f}m")
+    if joint_distance_parts:
+        preview_count = 8
+        distance_preview = ", ".join(joint_distance_parts[:preview_count])
+        if len(joint_distance_parts) > preview_count:
+            distance_preview += f", +{len(joint_distance_parts) - preview_count} more"
+        arm_parts.append(f"joint_distances[{len(joint_distance_parts)}]={distance_preview}")
+    if not arm_parts:
+        arm_parts.append("arm_distance=NA")
+    print(
+        f"[iOS stream] {frame.exercise} | depth_pts={len(frame.point_depths_m)} | "
+        + " | ".join(arm_parts)
+        + f" | {feedback}"
     )
 
 
@@ -815,6 +754,7 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
         )
 
     last_log_at = 0.0
+    last_waiting_log_at = 0.0
     warned_missing_ios_video = False
     warned_missing_depth_samples = False
     consecutive_missing_video_frames = 0
@@ -822,7 +762,6 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
     consecutive_no_depth_frames = 0
     no_depth_warmup_frames = 12
     warned_running_without_depth = False
-    active_processing_task: Optional[asyncio.Task] = None
     dropped_payloads = 0
     last_drop_log_at = 0.0
     received_payloads = 0
@@ -868,7 +807,7 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
     if not config.IOS_INCLUDE_ALL_JOINTS:
         print("[iOS stream] Using MediaPipe-mapped LiDAR joints only (full all_joints disabled).")
     if config.IOS_DROP_PAYLOADS_IF_BUSY:
-        print("[iOS stream] Overflow mode: drop incoming payloads while processing current frame")
+        print("[iOS stream] Overflow mode: each stage keeps only the newest frame while busy")
     else:
         print("[iOS stream] Overflow mode: process every payload (may increase latency)")
     preview = (
@@ -884,31 +823,17 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
         else None
     )
 
-    async def process_payload(payload: Dict[str, object]) -> None:
-        nonlocal last_log_at, preview, warned_missing_ios_video, warned_missing_depth_samples
-        nonlocal consecutive_missing_video_frames, last_missing_video_warning_at
+    def decode_payload(payload: Dict[str, object]) -> Optional[IOSStreamItem]:
+        nonlocal last_waiting_log_at, warned_missing_depth_samples
         nonlocal consecutive_no_depth_frames, warned_running_without_depth
-        nonlocal last_processed_at, rate_limited_count, last_rate_limit_log_at
-        now_perf = time.perf_counter()
-        if frame_interval_sec > 0.0 and (now_perf - last_processed_at) < frame_interval_sec:
-            rate_limited_count += 1
-            if (now_perf - last_rate_limit_log_at) >= 2.0:
-                last_rate_limit_log_at = now_perf
-                print(
-                    "[iOS stream] Throttle active. "
-                    f"Skipped frames due to FPS cap: {rate_limited_count}"
-                )
-            return
-        last_processed_at = now_perf
-
         try:
-            frame = adapt_ios_payload(
+            frame = adapt_ios_payload_arrays(
                 payload,
                 decode_video_frame=config.IOS_ENABLE_VIDEO_FRAME_STREAM,
             )
         except ValueError as error:
             print(f"[iOS stream] Ignoring invalid payload: {error}")
-            return
+            return None
 
         depth_mode = (frame.depth_mode or "none").lower()
         depth_expected = depth_mode not in {"none", "body_only"}
@@ -921,22 +846,13 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
                     f"depth_mode={depth_mode}"
                 )
             if depth_expected and consecutive_no_depth_frames <= no_depth_warmup_frames:
-                feedback = "Waiting for LiDAR depth points..."
-                if preview is not None and not preview.render(
-                    frame,
-                    feedback,
-                    {},
-                    background_frame=frame.video_frame_bgr,
-                    mediapipe_joints=None,
-                ):
-                    preview = None
                 now = time.time()
-                if now - last_log_at >= 0.5:
-                    last_log_at = now
+                if now - last_waiting_log_at >= 0.5:
+                    last_waiting_log_at = now
                     print(
                         f"[iOS stream] {frame.exercise} | depth_pts=0 | status=waiting_for_lidar_depth"
                     )
-                return
+                return IOSStreamItem(frame, waiting_for_depth=True)
 
             if depth_expected and not warned_running_without_depth:
                 warned_running_without_depth = True
@@ -951,125 +867,124 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
 
         # Keep runtime lightweight by default: only retain the MediaPipe-mapped LiDAR joints.
         if frame.source.startswith("ios") and not config.IOS_INCLUDE_ALL_JOINTS:
-            frame = replace(frame, all_joints_3d=dict(frame.joints_3d))
+            frame = frame.with_channels(all_joints_3d=frame.joints_3d.to_dict())
+        return IOSStreamItem(frame)
 
-        mp_joints = None
-        if mediapipe_fusion is not None:
-            if frame.video_frame_bgr is None:
-                consecutive_missing_video_frames += 1
-                if config.WARN_IF_IOS_VIDEO_MISSING:
-                    now_warn = time.monotonic()
-                    if (
-                        consecutive_missing_video_frames >= 3
-                        and (now_warn - last_missing_video_warning_at) >= 2.0
-                    ):
-                        last_missing_video_warning_at = now_warn
-                        warned_missing_ios_video = True
-                        print(
-                            "[iOS stream] Missing iPhone video frames in payload. "
-                            f"consecutive_missing={consecutive_missing_video_frames}. "
-                            "Distance metrics continue from LiDAR/camera pose."
-                        )
-            else:
-                if warned_missing_ios_video and consecutive_missing_video_frames > 0:
+    def fuse_frame(item: IOSStreamItem) -> IOSStreamItem:
+        nonlocal warned_missing_ios_video
+        nonlocal consecutive_missing_video_frames, last_missing_video_warning_at
+        if item.waiting_for_depth or mediapipe_fusion is None:
+            return item
+        frame = item.frame
+        if frame.video_frame_bgr is None:
+            consecutive_missing_video_frames += 1
+            if config.WARN_IF_IOS_VIDEO_MISSING:
+                now_warn = time.monotonic()
+                if (
+                    consecutive_missing_video_frames >= 3
+                    and (now_warn - last_missing_video_warning_at) >= 2.0
+                ):
+                    last_missing_video_warning_at = now_warn
+                    warned_missing_ios_video = True
                     print(
-                        "[iOS stream] iPhone video stream resumed. "
-                        f"previous_missing={consecutive_missing_video_frames}"
+                        "[iOS stream] Missing iPhone video frames in payload. "
+                        f"consecutive_missing={consecutive_missing_video_frames}. "
+                        "Distance metrics continue from LiDAR/camera pose."
                     )
-                warned_missing_ios_video = False
-                consecutive_missing_video_frames = 0
-                mp_joints = mediapipe_fusion.capture(frame.video_frame_bgr)
-
-        if mp_joints is not None:
-            frame = _fuse_ios_and_mediapipe(frame, mp_joints)
-
-        feedback, metrics = pipeline.evaluate_frame(frame)
+            return item
+        if warned_missing_ios_video and consecutive_missing_video_frames > 0:
+            print(
+                "[iOS stream] iPhone video stream resumed. "
+                f"previous_missing={consecutive_missing_video_frames}"
+            )
+        warned_missing_ios_video = False
+        consecutive_missing_video_frames = 0
+        item.mp_joints = mediapipe_fusion.capture(frame.video_frame_bgr)
+        if item.mp_joints is not None:
+            item.frame = _fuse_ios_and_mediapipe(frame, item.mp_joints)
+        return item
+
+    def evaluate_item(item: IOSStreamItem) -> IOSStreamItem:
+        if item.waiting_for_depth:
+            item.feedback = "Waiting for LiDAR depth points..."
+            return item
+        item.feedback, item.metrics = pipeline.evaluate_frame(item.frame)
+        return item
+
+    def present_item(item: IOSStreamItem) -> None:
+        # Runs on the event loop: OpenCV windows must stay on the main thread
+        nonlocal last_log_at, preview
         if preview is not None and not preview.render(
-            frame,
-            feedback,
-            metrics,
-            background_frame=frame.video_frame_bgr,
-            mediapipe_joints=mp_joints,
+            item.frame,
+            item.feedback,
+            item.metrics,
+            background_frame=item.frame.video_frame_bgr,
+            mediapipe_joints=item.mp_joints,
         ):
             preview = None
+        if item.waiting_for_depth:
+            return None
         now = time.time()
         if now - last_log_at >= 0.5:
             last_log_at = now
-            arm_parts = []
-            left_arm_distance = metrics.get("left_arm_distance_m")
-            right_arm_distance = metrics.get("right_arm_distance_m")
-            left_leg_distance = metrics.get("left_leg_distance_m")
-            right_leg_distance = metrics.get("right_leg_distance_m")
-            arm_head_distance = metrics.get("arm_head_distance_m")
-            arm_head_quality = metrics.get("arm_head_quality")
-            if left_arm_distance is not None:
-                arm_parts.append(f"L_arm_dist={float(left_arm_distance):.3f}m")
-            if right_arm_distance is not None:
-                arm_parts.append(f"R_arm_dist={float(right_arm_distance):.3f}m")
-            if left_leg_distance is not None:
-                arm_parts.append(f"L_leg_dist={float(left_leg_distance):.3f}m")
-            if right_leg_distance is not None:
-                arm_parts.append(f"R_leg_dist={float(right_leg_distance):.3f}m")
-            if arm_head_distance is not None:
-                arm_parts.append(f"arm_head={float(arm_head_distance):.3f}m")
-            if frame.arm_head_state is not None:
-                arm_parts.append(f"arm_head_state={frame.arm_head_state}")
-            if arm_head_quality is not None:
-                arm_parts.append(f"arm_head_q={float(arm_head_quality):.2f}")
-            if frame.arm_head_source is not None:
-                arm_parts.append(f"arm_head_src={frame.arm_head_source}")
-            joint_distance_parts = []
-            for metric_name in sorted(metrics.keys()):
-                if not metric_name.endswith("_distance_m"):
-                    continue
-                if metric_name in {"left_arm_distance_m", "right_arm_distance_m", "arm_head_distance_m"}:
-                    continue
-                value = metrics.get(metric_name)
-                if value is None:
-                    continue
-                joint_distance_parts.append(f"{metric_name}={float(value):.3f}m")
-            if joint_distance_parts:
-                preview_count = 8
-                distance_preview = ", ".join(joint_distance_parts[:preview_count])
-                if len(joint_distance_parts) > preview_count:
-                    distance_preview += f", +{len(joint_distance_parts) - preview_count} more"
-                arm_parts.append(f"joint_distances[{len(joint_distance_parts)}]={distance_preview}")
-            if not arm_parts:
-                arm_parts.append("arm_distance=NA")
-            print(
-                f"[iOS stream] {frame.exercise} | depth_pts={len(frame.point_depths_m)} | "
-                + " | ".join(arm_parts)
-                + f" | {feedback}"
-            )
+            _print_ios_metrics(item.frame, item.metrics, item.feedback)
+        return None
+
+    drop_when_busy = config.IOS_DROP_PAYLOADS_IF_BUSY
+    queue_size = config.IOS_PIPELINE_QUEUE_SIZE
+    present_stage = PipelineStage("present", present_item, maxsize=queue_size, drop_when_full=drop_when_busy, on_loop=True)
+    metrics_stage = PipelineStage("metrics", evaluate_item, maxsize=queue_size, downstream=present_stage, drop_when_full=drop_when_busy)
+    fusion_stage = PipelineStage("fusion", fuse_frame, maxsize=queue_size, downstream=metrics_stage, drop_when_full=drop_when_busy)
+    decode_stage = PipelineStage("decode", decode_payload, maxsize=queue_size, downstream=fusion_stage, drop_when_full=drop_when_busy)
+    stages = [decode_stage, fusion_stage, metrics_stage, present_stage]
 
     async def on_payload(payload: Dict[str, object]) -> None:
-        nonlocal active_processing_task, dropped_payloads, last_drop_log_at, last_payload_received_at
+        nonlocal dropped_payloads, last_drop_log_at, last_payload_received_at
         nonlocal received_payloads, last_receive_log_at
+        nonlocal last_processed_at, rate_limited_count, last_rate_limit_log_at
         last_payload_received_at = time.monotonic()
         received_payloads += 1
         now = time.time()
         if (now - last_receive_log_at) >= 2.0:
             last_receive_log_at = now
             print(f"[iOS stream] Incoming payloads: {received_payloads}")
-        if config.IOS_DROP_PAYLOADS_IF_BUSY:
-            if active_processing_task is not None and not active_processing_task.done():
+
+        now_perf = time.perf_counter()
+        if frame_interval_sec > 0.0 and (now_perf - last_processed_at) < frame_interval_sec:
+            rate_limited_count += 1
+            if (now_perf - last_rate_limit_log_at) >= 2.0:
+                last_rate_limit_log_at = now_perf
+                print(
+                    "[iOS stream] Throttle active. "
+                    f"Skipped frames due to FPS cap: {rate_limited_count}"
+                )
+            return
+        last_processed_at = now_perf
+
+        # Only enqueues: decoding and inference run in the stage executors
+        if drop_when_busy:
+            if not decode_stage.offer(payload):
                 dropped_payloads += 1
                 if (now - last_drop_log_at) >= 2.0:
                     last_drop_log_at = now
                     print(
-                        "[iOS stream] Dropping incoming frames while busy. "
+                        "[iOS stream] Dropping stale frames while busy. "
                         f"dropped={dropped_payloads}"
                     )
-                return
-            active_processing_task = asyncio.create_task(process_payload(payload))
             return
 
-        await process_payload(payload)
+        await decode_stage.submit(payload)
 
     async def stream_health_monitor() -> None:
         nonlocal last_stall_log_at
+        last_stats_log_at = time.monotonic()
         while True:
             await asyncio.sleep(1.0)
+            if (time.monotonic() - last_stats_log_at) >= 5.0 and decode_stage.stats.processed:
+                last_stats_log_at = time.monotonic()
+                print(f"[iOS stream] stages: {format_stage_stats(stages)}")
+                if pipeline.session_writer is not None:
+                    print(f"[iOS stream] {pipeline.session_writer.format_stats()}")
             idle_sec = time.monotonic() - last_payload_received_at
             if idle_sec < 3.0:
                 continue
@@ -1082,6 +997,8 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
                 f"{idle_sec:.1f}s. Check phone connection/path and IOS_STREAM_HOST."
             )
 
+    for stage in stages:
+        stage.start()
     monitor_task = asyncio.create_task(stream_health_monitor())
     try:
         try:
@@ -1099,9 +1016,8 @@ async def run_ios_stream_pipeline(pipeline: ExercisePipeline) -> None:
             monitor_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await monitor_task
-            if active_processing_task is not None:
-                with contextlib.suppress(asyncio.CancelledError):
-                    await active_processing_task
+            for stage in stages:
+                await stage.stop()
     finally:
         if mediapipe_fusion is not None:
             mediapipe_fusion.close()
@@ -1182,10 +1098,14 @@ def run_webcam_pipeline(pipeline: ExercisePipeline) -> None:
 
 def main() -> None:
     pipeline = ExercisePipeline()
-    if config.USE_IOS_STREAM:
-        asyncio.run(run_ios_stream_pipeline(pipeline))
-    else:
-        run_webcam_pipeline(pipeline)
+    try:
+        if config.USE_IOS_STREAM:
+            asyncio.run(run_ios_stream_pipeline(pipeline))
+        else:
+            run_webcam_pipeline(pipeline)
+    finally:
+        # Flush buffered session records before exit
+        pipeline.close()
 
 
 if __name__ == "__main__":
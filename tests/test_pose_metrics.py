@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Tests for the declarative metric table (backend/pose_metrics.py)."""
+
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.pose_metrics import (
+    DEFAULT_METRIC_TABLE,
+    DEFAULT_METRICS,
+    MetricSpec,
+    MetricTable,
+    metric_table_for_template,
+    session_metrics,
+)
+from backend.session_chunks import SessionChunkBuilder, read_session_chunks
+from backend.skeleton_adapter import JOINT_INDEX, MEDIAPIPE_INDEX_BY_JOINT, adapt_ios_payload_arrays
+
+
+def _angle(a, b, c):
+    ba = [a[i] - b[i] for i in range(3)]
+    bc = [c[i] - b[i] for i in range(3)]
+    norm_ba, norm_bc = math.sqrt(sum(x * x for x in ba)), math.sqrt(sum(x * x for x in bc))
+    if norm_ba < 1e-6 or norm_bc < 1e-6:
+        return 0.0
+    cosine = max(min(sum(x * y for x, y in zip(ba, bc)) / (norm_ba * norm_bc), 1.0), -1.0)
+    return math.degrees(math.acos(cosine))
+
+
+def _reference(joints, specs=DEFAULT_METRICS):
+    """Scalar, one-metric-at-a-time version of the table."""
+    metrics = {}
+    for spec in specs:
+        if not all(name in joints for name in spec.joints):
+            continue
+        points = [joints[name] for name in spec.joints]
+        if spec.kind == "angle":
+            metrics[spec.name] = _angle(*points)
+        elif spec.kind == "distance":
+            metrics[spec.name] = math.dist(*points)
+        else:
+            metrics[spec.name] = ((points[0][2] + points[1][2]) / 2.0) - points[2][2]
+    return metrics
+
+
+def _frame(seed, drop=0.2):
+    rng = np.random.default_rng(seed)
+    names = [name for name in MEDIAPIPE_INDEX_BY_JOINT if rng.random() >= drop]
+    payload = {
+        "device": "ios_lidar",
+        "timestamp": seed / 30.0,
+        "exercise": "squat",
+        "joints": {name: rng.uniform(-1, 1, 3).tolist() for name in names},
+    }
+    return adapt_ios_payload_arrays(payload, decode_video_frame=False)
+
+
+class TestMetricTable:
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_scalar_reference(self, seed):
+        frame = _frame(seed)
+        metrics = DEFAULT_METRIC_TABLE.frame_metrics(frame.joints_xyz, frame.joints_mask)
+        expected = _reference(frame.joints_3d.to_dict())
+        assert list(metrics) == list(expected)
+        for name, value in expected.items():
+            assert metrics[name] == pytest.approx(value, abs=1e-9), name
+
+    def test_zero_length_segment_gives_zero_angle(self):
+        xyz = np.zeros((len(DEFAULT_METRIC_TABLE.joints), 3))
+        mask = np.ones(len(xyz), dtype=bool)
+        xyz[JOINT_INDEX["left_ankle"]] = (0.0, -0.5, 0.0)
+        metrics = DEFAULT_METRIC_TABLE.frame_metrics(xyz, mask)
+        assert metrics["left_knee_angle_deg"] == 0.0
+        assert metrics["left_shin_length_m"] == pytest.approx(0.5)
+
+    def test_batch_matches_frames(self):
+        frames = [_frame(seed) for seed in range(6)]
+        xyz = np.stack([np.where(f.joints_mask[:, None], f.joints_xyz, np.nan) for f in frames])
+        batch = DEFAULT_METRIC_TABLE.evaluate_batch(xyz)
+        assert list(batch) == list(DEFAULT_METRIC_TABLE.names)
+        for i, frame in enumerate(frames):
+            metrics = DEFAULT_METRIC_TABLE.frame_metrics(frame.joints_xyz, frame.joints_mask)
+            for name, column in batch.items():
+                if name in metrics:
+                    assert column[i] == pytest.approx(metrics[name], abs=1e-9)
+                else:
+                    assert np.isnan(column[i])
+
+    def test_replays_stored_session(self):
+        frames = [_frame(seed) for seed in range(40)]
+        builder = SessionChunkBuilder("replay", chunk_seconds=0.5)
+        docs = [doc for frame in frames if (doc := builder.add(frame, {}, "")) is not None]
+        docs.append(builder.finish())
+        replayed = session_metrics(read_session_chunks(docs))
+        for i in (0, 17, 39):
+            metrics = DEFAULT_METRIC_TABLE.frame_metrics(frames[i].joints_xyz, frames[i].joints_mask)
+            for name, value in metrics.items():
+                # Chunks store positions as float32
+                assert replayed[name][i] == pytest.approx(value, rel=1e-4, abs=1e-3)
+
+    def test_template_adds_and_overrides_metrics(self):
+        template = {
+            "exercise": "arm_abduction",
+            "metricAngles": {"left_shoulder_abduction_deg": ["left_hip", "left_shoulder", "left_elbow"]},
+            "metric_distances": {"wrist_gap_m": ["left_wrist", "right_wrist"], "hip_width_m": ["left_knee", "right_knee"]},
+        }
+        table = metric_table_for_template(template)
+        assert table.names[: len(DEFAULT_METRICS)] == DEFAULT_METRIC_TABLE.names
+        assert table.names[-2:] == ("left_shoulder_abduction_deg", "wrist_gap_m")
+        frame = _frame(3, drop=0.0)
+        metrics = table.frame_metrics(frame.joints_xyz, frame.joints_mask)
+        joints = frame.joints_3d
+        assert metrics["wrist_gap_m"] == pytest.approx(math.dist(joints["left_wrist"], joints["right_wrist"]))
+        assert metrics["hip_width_m"] == pytest.approx(math.dist(joints["left_knee"], joints["right_knee"]))
+        assert metric_table_for_template({"targetRangesDeg": {}}) is DEFAULT_METRIC_TABLE
+        assert metric_table_for_template(None) is DEFAULT_METRIC_TABLE
+
+    def test_rejects_bad_specs(self):
+        with pytest.raises(ValueError):
+            metric_table_for_template({"metricAngles": {"bad_deg": ["left_hip", "left_knee"]}})
+        with pytest.raises(ValueError):
+            metric_table_for_template({"metricDistances": {"bad_m": ["left_hip", "tail"]}})
+        with pytest.raises(ValueError):
+            MetricSpec("bad", "velocity", ("left_hip",))
+        with pytest.raises(ValueError):
+            MetricTable(DEFAULT_METRICS + DEFAULT_METRICS[:1])
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests for columnar session chunks (SessionChunkBuilder / read_session_chunks)."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.session_chunks import (
+    SESSION_JOINTS,
+    SessionChunkBuilder,
+    SessionChunkEncoder,
+    load_session,
+    read_session_chunks,
+)
+from backend.session_writer import SessionLogWriter
+from backend.skeleton_adapter import adapt_ios_payload
+
+JOINTS = ("left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_hip", "right_hip", "left_knee")
+
+
+def _frame(t: float, seed: int, exercise: str = "arm_abduction", drop: str = ""):
+    rng = np.random.default_rng(seed)
+    joints = {name: rng.uniform(-1, 1, 3).tolist() for name in JOINTS if name != drop}
+    payload = {
+        "device": "ios_lidar",
+        "timestamp": t,
+        "exercise": exercise,
+        "joints": joints,
+        "all_joints": {f"arkit_{k}": rng.uniform(-1, 1, 3).tolist() for k in range(5 + seed % 3)},
+        "keypoints_2d": {name: rng.uniform(0, 1, 2).tolist() for name in joints},
+        "point_depths_m": {name: float(rng.uniform(1, 3)) for name in joints},
+        "camera_intrinsics": [1400.0, 1400.0, 960.0, 720.0],
+        "camera_width": 1920,
+        "camera_height": 1440,
+        "arm_head_state": "near" if seed % 2 else None,
+    }
+    return adapt_ios_payload(payload, decode_video_frame=False)
+
+
+def _log(builder, frames):
+    docs = []
+    for i, frame in enumerate(frames):
+        metrics = {"left_knee_angle_deg": float(i), "shoulder_width_m": 0.4}
+        if i % 3 == 0:
+            metrics["arm_head_distance_m"] = 0.1 * i
+        doc = builder.add(frame, metrics, "Good form" if i % 2 else "Waiting")
+        if doc is not None:
+            docs.append(doc)
+    last = builder.finish()
+    return docs + ([last] if last is not None else [])
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.docs = []
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+    def find(self, query):
+        return [doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())]
+
+
+class TestSessionChunks:
+    def test_round_trip(self):
+        frames = [_frame(i / 30.0, i, drop="left_knee" if i == 4 else "") for i in range(90)]
+        docs = _log(SessionChunkBuilder("s1", chunk_seconds=1.0), frames)
+        assert [doc["frame_count"] for doc in docs] == [30, 30, 30]
+        assert all(isinstance(doc["channels"]["joints_3d"]["data"], bytes) for doc in docs)
+
+        session = read_session_chunks(reversed(docs))
+        np.testing.assert_array_equal(session.timestamps, [f.timestamp for f in frames])
+        assert session.channels["joints_3d"].shape == (90, len(SESSION_JOINTS), 3)
+        for i in (0, 4, 61):
+            for name in JOINTS:
+                expected = frames[i].joints_3d.get(name, (np.nan,) * 3)
+                np.testing.assert_allclose(session.joint(name)[i], expected, rtol=1e-6)
+                if name in frames[i].camera_points_3d:
+                    np.testing.assert_allclose(
+                        session.joint(name, "camera_points_3d")[i], frames[i].camera_points_3d[name], rtol=1e-6
+                    )
+            for name, coords in frames[i].all_joints_3d.items():
+                np.testing.assert_allclose(session.joint(name, "all_joints_3d")[i], coords, rtol=1e-6)
+        assert np.isnan(session.joint("nose")).all()
+        # root is derived from the hips on every frame
+        assert not np.isnan(session.joint("root")).any()
+        assert session.metric("left_knee_angle_deg").tolist() == [float(i) for i in range(90)]
+        distance = session.metric("arm_head_distance_m")
+        assert np.isnan(distance[1]) and distance[3] == pytest.approx(0.3)
+        assert session.labels["feedback"][:2] == ["Waiting", "Good form"]
+        assert session.labels["arm_head_state"][:2] == [None, "near"]
+
+    def test_new_chunk_when_exercise_changes(self):
+        frames = [_frame(i / 30.0, i, exercise="squat" if i >= 10 else "arm_abduction") for i in range(20)]
+        docs = _log(SessionChunkBuilder("s2", chunk_seconds=60.0), frames)
+        assert [(doc["exercise"], doc["frame_count"]) for doc in docs] == [("arm_abduction", 10), ("squat", 10)]
+        session = read_session_chunks(docs)
+        assert session.exercise == ["arm_abduction"] * 10 + ["squat"] * 10
+
+    def test_writer_stores_chunks(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, encode=SessionChunkEncoder("s3", chunk_seconds=1.0), batch_size=8)
+        for i in range(45):
+            writer.submit((_frame(i / 30.0, i), {"left_knee_angle_deg": float(i)}, "Good form"))
+        writer.close()
+        assert [doc["chunk_index"] for doc in collection.docs] == [0, 1]
+        assert writer.stats.written == 45 and writer.stats.documents == 2
+        session = load_session(collection, "s3")
+        assert len(session.timestamps) == 45
+
+    def test_writer_counts_entries_once_their_chunk_is_stored(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, encode=SessionChunkEncoder("s5", chunk_seconds=1.0), batch_size=8)
+        for i in range(45):
+            writer.submit((_frame(i / 30.0, i), {}, "Good form"))
+        assert writer.flush(2.0)
+        # Entries 30-44 are still in the encoder's open chunk
+        assert [doc["frame_count"] for doc in collection.docs] == [30]
+        assert writer.stats.written == 30 and writer.stats.failed == 0
+        writer.close()
+        assert [doc["frame_count"] for doc in collection.docs] == [30, 15]
+        assert writer.stats.written == 45 and writer.stats.documents == 2
+
+    def test_writer_counts_failed_chunks(self):
+        class FailingCollection(MemoryCollection):
+            def insert_many(self, docs, ordered=True):
+                raise RuntimeError("server unavailable")
+
+        writer = SessionLogWriter(FailingCollection(), encode=SessionChunkEncoder("s6", chunk_seconds=1.0), batch_size=8)
+        for i in range(45):
+            writer.submit((_frame(i / 30.0, i), {}, "Good form"))
+        writer.close()
+        # Both chunks, including the one stored by finish() on close
+        assert writer.stats.failed == 45 and writer.stats.written == 0 and writer.stats.documents == 0
+
+    def test_rejects_unknown_format(self):
+        doc = _log(SessionChunkBuilder("s4"), [_frame(0.0, 0)])[0]
+        doc["format"] = "columnar-v0"
+        with pytest.raises(ValueError):
+            read_session_chunks([doc])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Tests for the batched background session log writer."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.session_writer import SessionLogWriter
+
+
+class MemoryCollection:
+    """In-memory stand-in for a pymongo collection; `gate` holds writes to mimic a slow server."""
+
+    def __init__(self, fail: bool = False):
+        self.docs = []
+        self.batches = []
+        self.fail = fail
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def insert_many(self, docs, ordered=True):
+        self.gate.wait()
+        if self.fail:
+            raise RuntimeError("server unavailable")
+        self.batches.append(len(docs))
+        self.docs.extend(docs)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class TestSessionLogWriter:
+    def test_flushes_full_batches(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, batch_size=4, flush_interval_sec=60.0)
+        for i in range(8):
+            assert writer.submit({"i": i})
+        _wait_for(lambda: writer.stats.written == 8)
+        assert collection.batches == [4, 4]
+        assert [doc["i"] for doc in collection.docs] == list(range(8))
+        writer.close()
+
+    def test_flushes_partial_batch_after_interval(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, batch_size=100, flush_interval_sec=0.05)
+        writer.submit({"i": 0})
+        writer.submit({"i": 1})
+        _wait_for(lambda: collection.batches == [2])
+        writer.close()
+
+    def test_close_flushes_pending_records(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, batch_size=100, flush_interval_sec=60.0)
+        for i in range(5):
+            writer.submit({"i": i})
+        writer.close()
+        assert len(collection.docs) == 5 and writer.pending() == 0
+        assert not writer.submit({"i": 5})
+        assert writer.stats.dropped == 1
+
+    def test_flush_waits_for_writes(self):
+        collection = MemoryCollection()
+        writer = SessionLogWriter(collection, batch_size=100, flush_interval_sec=60.0)
+        writer.submit({"i": 0})
+        assert writer.flush(timeout_sec=2.0)
+        assert collection.docs == [{"i": 0}]
+        writer.close()
+
+    def test_encode_runs_on_writer_thread(self):
+        collection = MemoryCollection()
+        threads = []
+
+        def encode(item):
+            threads.append(threading.current_thread().name)
+            return {"value": item * 2}
+
+        writer = SessionLogWriter(collection, encode=encode, batch_size=2)
+        writer.submit(1)
+        writer.submit(2)
+        writer.close()
+        assert collection.docs == [{"value": 2}, {"value": 4}]
+        assert threads == ["session-writer"] * 2
+
+    def test_drop_when_full(self):
+        collection = MemoryCollection()
+        collection.gate.clear()
+        writer = SessionLogWriter(collection, batch_size=2, flush_interval_sec=0.0, max_queue=4, overflow="drop")
+        writer.submit({"i": 0})
+        _wait_for(lambda: writer._in_flight == 1)  # first batch stuck in insert_many
+        accepted = [writer.submit({"i": i}) for i in range(1, 11)]
+        assert accepted == [True] * 4 + [False] * 6
+        assert writer.stats.dropped == 6 and writer.stats.sampled_out == 0
+        collection.gate.set()
+        writer.close()
+        assert [doc["i"] for doc in collection.docs] == [0, 1, 2, 3, 4]
+
+    def test_sample_when_half_full(self):
+        collection = MemoryCollection()
+        collection.gate.clear()
+        writer = SessionLogWriter(
+            collection, batch_size=1, flush_interval_sec=0.0, max_queue=8, overflow="sample", sample_every=3
+        )
+        writer.submit({"i": -1})
+        _wait_for(lambda: writer._in_flight == 1)
+        accepted = [writer.submit({"i": i}) for i in range(16)]
+        # Four queue freely, then every third record until the buffer fills
+        assert accepted[:4] == [True] * 4
+        assert accepted[4:16] == [False, False, True] * 4
+        assert writer.stats.sampled_out == 8 and writer.stats.dropped == 0
+        collection.gate.set()
+        writer.close()
+        assert len(collection.docs) == 9
+
+    def test_failed_writes_are_counted(self):
+        collection = MemoryCollection(fail=True)
+        writer = SessionLogWriter(collection, batch_size=3)
+        for i in range(3):
+            writer.submit({"i": i})
+        writer.close()
+        assert writer.stats.failed == 3 and writer.stats.written == 0
+        snapshot = writer.snapshot()
+        assert snapshot["batches"] == 1 and snapshot["max_flush_ms"] >= 0.0
+
+    def test_rejects_unknown_overflow(self):
+        with pytest.raises(ValueError):
+            SessionLogWriter(MemoryCollection(), overflow="block")
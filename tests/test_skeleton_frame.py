@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for the array-backed ArraySkeletonFrame and its dict-compatible views."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.session_chunks import SessionChunkBuilder, read_session_chunks
+from backend.skeleton_adapter import (
+    JOINT_INDEX,
+    JOINT_NAMES,
+    MEDIAPIPE_INDEX_BY_JOINT,
+    ArraySkeletonFrame,
+    adapt_ios_payload,
+    adapt_ios_payload_arrays,
+    as_array_frame,
+    to_pipeline_payload,
+)
+
+NAMES = list(MEDIAPIPE_INDEX_BY_JOINT) + ["head", "left_hand", "custom_joint"]
+CHANNELS = ("joints_3d", "keypoints_2d", "point_depths_m", "camera_points_3d", "all_joints_3d")
+
+
+def _payload(seed: int, intrinsics: bool = True) -> dict:
+    rng = np.random.default_rng(seed)
+    names = [name for name in NAMES if rng.random() < 0.8]
+    payload = {
+        "device": "ios_lidar",
+        "timestamp": 1.5,
+        "exercise": "arm_abduction",
+        "joints": {name: rng.uniform(-1, 1, 3).tolist() for name in names},
+        "keypoints_2d": {name: rng.uniform(0, 1, 2).tolist() for name in names if rng.random() < 0.5},
+        "point_depths_m": {name: float(rng.uniform(0.5, 3)) for name in names if rng.random() < 0.7},
+        "camera_position": [0.0, 1.0, -0.5],
+    }
+    if intrinsics:
+        payload.update(camera_intrinsics=[1400.0, 1400.0, 960.0, 720.0], camera_width=1920, camera_height=1440)
+    return payload
+
+
+class TestArraySkeletonFrame:
+    def test_slots_follow_mediapipe_indices(self):
+        for name, index in MEDIAPIPE_INDEX_BY_JOINT.items():
+            assert JOINT_INDEX[name] == index and JOINT_NAMES[index] == name
+        assert len(set(JOINT_NAMES)) == len(JOINT_NAMES)
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_dict_adapter(self, seed):
+        payload = _payload(seed, intrinsics=seed % 2 == 0)
+        legacy = adapt_ios_payload(payload, decode_video_frame=False)
+        frame = adapt_ios_payload_arrays(payload, decode_video_frame=False)
+        for channel in CHANNELS:
+            assert dict(getattr(frame, channel)) == getattr(legacy, channel), channel
+        assert frame.mediapipe_pose_like == legacy.mediapipe_pose_like
+        # Same payload; only the joint key order differs (slot order vs insertion order)
+        assert to_pipeline_payload(frame) == to_pipeline_payload(legacy)
+
+    def test_views_and_masks(self):
+        frame = adapt_ios_payload_arrays(_payload(3), decode_video_frame=False)
+        view = frame.joints_3d
+        index = JOINT_INDEX["left_shoulder"]
+        assert ("left_shoulder" in view) == bool(frame.joints_mask[index])
+        assert "nose_tip" not in view and view.get("nose_tip") is None
+        # root is derived from the hips when the payload has both
+        if "left_hip" in view and "right_hip" in view:
+            np.testing.assert_allclose(view["root"], (np.add(view["left_hip"], view["right_hip"])) / 2.0)
+        assert len(view) == int(frame.joints_mask.sum()) + len(frame.extras.get("joints_3d", {}))
+        assert view["custom_joint"] == frame.extras["joints_3d"]["custom_joint"]
+        with pytest.raises(KeyError):
+            frame.keypoints_2d["left_eye"]
+        assert isinstance(frame.point_depths_m[next(iter(frame.point_depths_m))], float)
+
+    def test_round_trip(self):
+        legacy = adapt_ios_payload(_payload(4), decode_video_frame=False)
+        frame = as_array_frame(legacy)
+        assert as_array_frame(frame) is frame
+        back = frame.to_skeleton_frame()
+        for channel in CHANNELS:
+            assert getattr(back, channel) == getattr(legacy, channel)
+        assert back.mediapipe_pose_like == legacy.mediapipe_pose_like
+
+    def test_session_chunk_fast_path_matches_views(self):
+        frames = [_payload(seed) for seed in range(5)]
+        for seed, payload in enumerate(frames):
+            payload["timestamp"] = seed / 30.0
+        array_doc = SessionChunkBuilder("a")
+        dict_doc = SessionChunkBuilder("b")
+        for payload in frames:
+            array_doc.add(adapt_ios_payload_arrays(payload, decode_video_frame=False), {}, "")
+            dict_doc.add(adapt_ios_payload(payload, decode_video_frame=False), {}, "")
+        fast, slow = read_session_chunks([array_doc.finish()]), read_session_chunks([dict_doc.finish()])
+        for channel in ("joints_3d", "keypoints_2d", "point_depths_m", "camera_points_3d"):
+            np.testing.assert_array_equal(fast.channels[channel], slow.channels[channel])
+        assert isinstance(adapt_ios_payload_arrays(frames[0], decode_video_frame=False), ArraySkeletonFrame)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Tests for the executor-backed pipeline stages (backend/stream_stages.py)."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.stream_stages import PipelineStage, format_stage_stats
+
+
+def _collector(results):
+    """Stage function recording what reaches it; returns None so nothing is forwarded."""
+
+    def collect(item):
+        results.append(item)
+
+    return collect
+
+
+async def _settle(*stages, timeout=2.0):
+    for stage in stages:
+        await asyncio.wait_for(stage.queue.join(), timeout)
+
+
+class TestPipelineStage:
+    def test_offer_drops_oldest_when_full(self):
+        async def scenario():
+            results = []
+            stage = PipelineStage("sink", _collector(results), maxsize=2)
+            assert [stage.offer(item) for item in (1, 2, 3, 4)] == [True, True, False, False]
+            assert stage.stats.dropped == 2 and stage.queue.qsize() == 2
+            stage.start()
+            # join() returns only if every dropped item was also marked done
+            await _settle(stage)
+            await stage.stop()
+            return results, stage.snapshot()
+
+        results, snapshot = asyncio.run(scenario())
+        assert results == [3, 4]
+        assert snapshot["processed"] == 2 and snapshot["dropped"] == 2 and snapshot["queue"] == 0
+
+    def test_submit_waits_for_room_without_dropping(self):
+        async def scenario():
+            results = []
+            stage = PipelineStage("sink", _collector(results), maxsize=1, drop_when_full=False)
+            await stage.submit(1)
+            pending = asyncio.create_task(stage.submit(2))
+            await asyncio.sleep(0.05)
+            blocked = not pending.done()
+            stage.start()
+            await asyncio.wait_for(pending, 2.0)
+            await _settle(stage)
+            await stage.stop()
+            return blocked, results, stage.stats.dropped
+
+        blocked, results, dropped = asyncio.run(scenario())
+        assert blocked
+        assert results == [1, 2] and dropped == 0
+
+    def test_errors_are_counted_and_the_stage_keeps_running(self):
+        async def scenario():
+            results = []
+
+            def fn(item):
+                if item == 2:
+                    raise ValueError("bad frame")
+                results.append(item)
+
+            stage = PipelineStage("flaky", fn, maxsize=4).start()
+            for item in (1, 2, 3):
+                await stage.submit(item)
+            await _settle(stage)
+            await stage.stop()
+            return results, stage.stats
+
+        results, stats = asyncio.run(scenario())
+        assert results == [1, 3]
+        assert stats.errors == 1 and stats.processed == 2
+
+    def test_results_flow_downstream(self):
+        async def scenario():
+            results = []
+            sink = PipelineStage("present", _collector(results), maxsize=8, on_loop=True).start()
+            # Odd items stop at the first stage (None is not forwarded)
+            double = PipelineStage(
+                "double", lambda x: x * 2 if x % 2 == 0 else None, maxsize=8, downstream=sink, drop_when_full=False
+            ).start()
+            for item in range(6):
+                await double.submit(item)
+            await _settle(double, sink)
+            await double.stop()
+            await sink.stop()
+            return results, double, sink
+
+        results, double, sink = asyncio.run(scenario())
+        assert results == [0, 4, 8]
+        assert double.stats.processed == 6 and sink.stats.processed == 3
+        assert "double q=0" in format_stage_stats([double, sink])
+
+    def test_stop_waits_for_the_item_in_flight(self):
+        async def scenario():
+            started, release = threading.Event(), threading.Event()
+            results = []
+
+            def slow(item):
+                started.set()
+                release.wait(2.0)
+                results.append(item)
+
+            stage = PipelineStage("slow", slow).start()
+            stage.offer("frame")
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 2.0)
+            stopping = asyncio.create_task(stage.stop())
+            await asyncio.sleep(0.05)
+            waited = not stopping.done()
+            release.set()
+            await asyncio.wait_for(stopping, 2.0)
+            # A stopped stage accepts no more work from its executor
+            try:
+                stage._executor.submit(lambda: None)
+                shut_down = False
+            except RuntimeError:
+                shut_down = True
+            return waited, results, shut_down, stage
+
+        waited, results, shut_down, stage = asyncio.run(scenario())
+        assert waited and shut_down
+        assert results == ["frame"]
+        assert stage._task is None
+
+    def test_stop_drains_queued_items(self):
+        async def scenario():
+            results = []
+            stage = PipelineStage("sink", _collector(results), maxsize=4).start()
+            for item in range(4):
+                stage.offer(item)
+            await stage.stop(drain_timeout_sec=2.0)
+            return results
+
+        assert asyncio.run(scenario()) == [0, 1, 2, 3]
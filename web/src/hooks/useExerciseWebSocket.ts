@@ -21,6 +21,7 @@ interface PainStatus {
   mar?: number;
   pspi_score?: number | null;
   calibrated?: boolean;
+  inference_hz?: number | null;
 }
 
 export interface PoseLandmark {